@@ -0,0 +1,20 @@
+"""
+Builds the binary atmosphere lookup used by atlast_sc from the AM output
+files, writing am_ACT_annual.npy and its am_ACT_annual.json header.
+Run from this directory; copy both files to ``atlast_sc/static/lookups``.
+"""
+from atlast_sc.atmosphere import tables_from_am_output, write_lookup
+
+weather = [5, 25, 50, 75, 95]
+
+am_output_files = {pwv: f"output/ACT_30_1000_GHz_el90_annual_{pwv:02d}.txt"
+                   for pwv in weather}
+
+T_atm_table, tau_atm_table = tables_from_am_output(am_output_files)
+
+header = write_lookup("am_ACT_annual.npy", T_atm_table, tau_atm_table,
+                      weather, site="ACT",
+                      sources=am_output_files.values())
+
+print(f"Wrote am_ACT_annual.npy ({header['frequency']['count']} frequencies, "
+      f"sha256 {header['sha256']})")
@@ -0,0 +1,487 @@
+import hashlib
+import json
+import threading
+from pathlib import Path
+from scipy.interpolate import RegularGridInterpolator
+import numpy as np
+
+
+class AtmosphereTables:
+    """
+    Process-wide, read-only store of the atmospheric lookup tables.
+
+    The AM model grids of T_atm and tau_atm (see am_code/README.md) are
+    parsed the first time they are requested and then shared by every
+    AtmosphereParams object (and therefore every Calculator and
+    ParameterSetup) in the process. The tables are marked read-only so that
+    no consumer can modify the shared copy.
+
+    Use :meth:`reload` to re-read the files from disk, or :meth:`invalidate`
+    to drop the loaded tables so that they are re-read on next use.
+    """
+
+    _STATIC_DATA_PATH = Path(__file__).resolve().parents[0] / "static"
+
+    WEATHER = (5, 25, 50, 75, 95)
+    # Binary lookup (see write_lookup); used in preference to the text
+    # tables when present. It is generated from the text tables when the
+    # package is built (see build_lookup) and is not kept in git
+    LOOKUP_PATH = _STATIC_DATA_PATH / "lookups" / "am_ACT_annual.npy"
+    T_ATM_PATH = _STATIC_DATA_PATH / "lookups" / "am_ACT_T_annual.txt"
+    TAU_ATM_PATH = _STATIC_DATA_PATH / "lookups" / "am_ACT_tau_annual.txt"
+
+    _lock = threading.Lock()
+    _tables = None
+    # Number of times the lookup files have been parsed in this process
+    _load_count = 0
+
+    def __init__(self, T_atm_table, tau_atm_table, weather, header=None):
+        """
+        :param T_atm_table: frequency (GHz) in the first column followed by
+            one column of atmospheric temperature (K) per weather percentile
+        :type T_atm_table: numpy.ndarray
+        :param tau_atm_table: frequency (GHz) in the first column followed by
+            one column of zenith opacity per weather percentile
+        :type tau_atm_table: numpy.ndarray
+        :param weather: the weather percentiles of the table columns
+        :type weather: tuple[float]
+        :param header: the header of the binary lookup the tables were read
+            from, if any
+        :type header: dict
+        """
+        T_atm_table.setflags(write=False)
+        tau_atm_table.setflags(write=False)
+
+        self.T_atm_table = T_atm_table
+        self.tau_atm_table = tau_atm_table
+        self.weather = tuple(weather)
+        self.header = header
+        # Fingerprint of the table contents. Taken from the header when
+        # available, so that memory-mapped tables are not read in full.
+        self.content_hash = header['sha256'] if header \
+            else _content_hash(T_atm_table, tau_atm_table)
+
+        self.interp_T_atm = make_interpolator(T_atm_table[:, 0],
+                                              self.weather,
+                                              T_atm_table[:, 1:])
+        self.interp_tau_atm = make_interpolator(tau_atm_table[:, 0],
+                                                self.weather,
+                                                tau_atm_table[:, 1:])
+
+    @classmethod
+    def get(cls):
+        """
+        Return the shared atmosphere tables, loading them on first use.
+
+        :return: the shared atmosphere tables
+        :rtype: AtmosphereTables
+        """
+        tables = cls._tables
+        if tables is None:
+            with cls._lock:
+                # Another thread may have loaded the tables while this one
+                # was waiting for the lock
+                if cls._tables is None:
+                    cls._tables = cls._load()
+                tables = cls._tables
+
+        return tables
+
+    @classmethod
+    def reload(cls):
+        """
+        Re-read the lookup files from disk and replace the shared tables.
+
+        :return: the newly loaded atmosphere tables
+        :rtype: AtmosphereTables
+        """
+        with cls._lock:
+            cls._tables = cls._load()
+            return cls._tables
+
+    @classmethod
+    def invalidate(cls):
+        """
+        Drop the shared tables. They will be re-read on next use.
+        """
+        with cls._lock:
+            cls._tables = None
+
+    @classmethod
+    def load_count(cls):
+        """
+        The number of times the lookup files have been parsed in this
+        process.
+
+        :return: number of loads
+        :rtype: int
+        """
+        return cls._load_count
+
+    @classmethod
+    def build_lookup(cls, path=None):
+        """
+        Convert the text tables to the binary lookup (see
+        :func:`write_lookup`). Run when the package is built, by the
+        ``buildlookup`` target of the makefile.
+
+        :param path: path of the `.npy` file to write. Optional. Defaults to
+            the lookup read by the package
+        :type path: str or pathlib.Path
+        :return: the header of the lookup
+        :rtype: dict
+        """
+        T_atm_table = np.genfromtxt(cls.T_ATM_PATH)
+        tau_atm_table = np.genfromtxt(cls.TAU_ATM_PATH)
+        _rescale_T_atm(T_atm_table, tau_atm_table)
+
+        return write_lookup(cls.LOOKUP_PATH if path is None else path,
+                            T_atm_table, tau_atm_table, cls.WEATHER,
+                            site='ACT',
+                            sources=(cls.T_ATM_PATH.name,
+                                     cls.TAU_ATM_PATH.name))
+
+    @classmethod
+    def _load(cls):
+        """
+        Read the lookup tables. Must be called with the lock held.
+        """
+        if cls.LOOKUP_PATH.exists():
+            T_atm_table, tau_atm_table, header = read_lookup(cls.LOOKUP_PATH)
+            tables = cls(T_atm_table, tau_atm_table, header['weather'],
+                         header)
+        else:
+            # Rayleigh-Jeans sky brightness temperature at zenith
+            T_atm_table = np.genfromtxt(cls.T_ATM_PATH)
+            # Sky opacity at zenith
+            tau_atm_table = np.genfromtxt(cls.TAU_ATM_PATH)
+            _rescale_T_atm(T_atm_table, tau_atm_table)
+            tables = cls(T_atm_table, tau_atm_table, cls.WEATHER)
+
+        cls._load_count += 1
+
+        return tables
+
+
+class UniformGridInterpolator:
+    """
+    Bilinear interpolator over a 2D table whose first axis (frequency) is
+    uniformly sampled, as the AM grids are.
+
+    The cell along the uniform axis is found arithmetically rather than by
+    a binary search, and the short second axis (weather) is searched
+    directly. Points are evaluated in a single batch. The results match
+    those of scipy's linear RegularGridInterpolator to floating point
+    precision.
+
+    Use :func:`make_interpolator` to fall back to RegularGridInterpolator
+    for tables that are not uniformly sampled.
+    """
+
+    def __init__(self, x, y, values):
+        """
+        :param x: the uniformly spaced grid points of the first axis
+        :type x: numpy.ndarray
+        :param y: the grid points of the second axis, in ascending order
+        :type y: numpy.ndarray
+        :param values: the table values, of shape (len(x), len(y))
+        :type values: numpy.ndarray
+        """
+        self._x = np.asarray(x, dtype=float)
+        self._y = np.asarray(y, dtype=float)
+        self._values = np.asarray(values, dtype=float)
+        self._x0 = self._x[0]
+        self._dx = (self._x[-1] - self._x[0]) / (len(self._x) - 1)
+
+        # Gathering from a flat view of the table is much faster than 2D
+        # fancy indexing. The view is taken over the table's own memory, so
+        # a column slice of a (memory-mapped) lookup is not copied.
+        self._flat_values, self._row_stride, self._col_stride = \
+            UniformGridInterpolator._flat_view(self._values)
+
+    def __call__(self, points):
+        """
+        Interpolate the table at the given points.
+
+        :param points: the points to interpolate at, of shape (..., 2)
+        :type points: numpy.ndarray
+        :return: the interpolated values, of shape points.shape[:-1]
+        :rtype: numpy.ndarray
+        """
+        points = np.asarray(points, dtype=float)
+        if points.ndim == 1:
+            return np.asarray(self._interpolate_point(points[0], points[1]))
+
+        x = points[..., 0]
+        y = points[..., 1]
+
+        for dimension, (grid, values) in enumerate(((self._x, x),
+                                                    (self._y, y))):
+            if np.any((values < grid[0]) | (values > grid[-1])):
+                raise ValueError(f'One of the requested xi is out of bounds '
+                                 f'in dimension {dimension}')
+
+        # Locate the cell along the uniform axis arithmetically, then
+        # correct for rounding so that the cell agrees with the grid points
+        n_x = len(self._x)
+        i = np.clip(((x - self._x0) / self._dx).astype(np.intp), 0, n_x - 2)
+        i -= (x < self._x[i]) & (i > 0)
+        i += (x > self._x[i + 1]) & (i < n_x - 2)
+
+        # The second axis is short, so count the grid points below each
+        # value rather than searching
+        j = np.zeros_like(i)
+        for y_grid in self._y[1:-1]:
+            j += y >= y_grid
+
+        x_lo = self._x[i]
+        y_lo = self._y[j]
+        t_x = (x - x_lo) / (self._x[i + 1] - x_lo)
+        t_y = (y - y_lo) / (self._y[j + 1] - y_lo)
+
+        lo = i * self._row_stride + j * self._col_stride
+        hi = lo + self._row_stride
+        flat_values = self._flat_values
+        return (1 - t_x) * (1 - t_y) * flat_values.take(lo) \
+            + t_x * (1 - t_y) * flat_values.take(hi) \
+            + (1 - t_x) * t_y * flat_values.take(lo + self._col_stride) \
+            + t_x * t_y * flat_values.take(hi + self._col_stride)
+
+    def _interpolate_point(self, x, y):
+        """
+        Interpolate the table at a single point, avoiding the overhead of
+        array operations.
+        """
+        x_grid = self._x
+        y_grid = self._y
+        if not x_grid[0] <= x <= x_grid[-1]:
+            raise ValueError('One of the requested xi is out of bounds '
+                             'in dimension 0')
+        if not y_grid[0] <= y <= y_grid[-1]:
+            raise ValueError('One of the requested xi is out of bounds '
+                             'in dimension 1')
+
+        n_x = len(x_grid)
+        i = min(max(int((x - self._x0) / self._dx), 0), n_x - 2)
+        if x < x_grid[i] and i > 0:
+            i -= 1
+        elif x > x_grid[i + 1] and i < n_x - 2:
+            i += 1
+
+        j = 0
+        while j < len(y_grid) - 2 and y >= y_grid[j + 1]:
+            j += 1
+
+        x_lo, x_hi = x_grid[i], x_grid[i + 1]
+        y_lo, y_hi = y_grid[j], y_grid[j + 1]
+        t_x = (x - x_lo) / (x_hi - x_lo)
+        t_y = (y - y_lo) / (y_hi - y_lo)
+
+        lo_row = self._values[i]
+        hi_row = self._values[i + 1]
+        return (1 - t_x) * (1 - t_y) * lo_row[j] \
+            + t_x * (1 - t_y) * hi_row[j] \
+            + (1 - t_x) * t_y * lo_row[j + 1] \
+            + t_x * t_y * hi_row[j + 1]
+
+    @staticmethod
+    def _flat_view(values):
+        """
+        Return a flat view of a 2D array together with the row and column
+        strides (in elements) needed to index it.
+        """
+        itemsize = values.itemsize
+        strides = values.strides
+        if any(stride <= 0 or stride % itemsize for stride in strides):
+            values = np.ascontiguousarray(values)
+            strides = values.strides
+
+        row_stride, col_stride = (stride // itemsize for stride in strides)
+        extent = (values.shape[0] - 1) * row_stride \
+            + (values.shape[1] - 1) * col_stride + 1
+        flat_values = np.lib.stride_tricks.as_strided(
+            values, shape=(extent,), strides=(itemsize,), writeable=False)
+
+        return flat_values, row_stride, col_stride
+
+    @staticmethod
+    def is_uniform(x, rtol=1e-6):
+        """
+        Check whether the grid points are uniformly spaced.
+
+        :param x: the grid points
+        :type x: numpy.ndarray
+        :param rtol: relative tolerance on the spacing. Optional. Defaults
+            to 1e-6
+        :type rtol: float
+        :return: True if the grid points are uniformly spaced
+        :rtype: bool
+        """
+        steps = np.diff(np.asarray(x, dtype=float))
+        if len(steps) == 0 or np.any(steps <= 0):
+            return False
+        return bool(np.allclose(steps, steps.mean(), rtol=rtol, atol=0))
+
+
+def make_interpolator(x, y, values):
+    """
+    Create a linear interpolator over a 2D table, using
+    :class:`UniformGridInterpolator` when the first axis is uniformly
+    sampled and scipy's RegularGridInterpolator otherwise.
+
+    :param x: the grid points of the first axis
+    :type x: numpy.ndarray
+    :param y: the grid points of the second axis
+    :type y: numpy.ndarray
+    :param values: the table values, of shape (len(x), len(y))
+    :type values: numpy.ndarray
+    :return: an interpolator taking points of shape (..., 2)
+    :rtype: UniformGridInterpolator or RegularGridInterpolator
+    """
+    if UniformGridInterpolator.is_uniform(x) and len(y) > 1:
+        return UniformGridInterpolator(x, y, values)
+
+    return RegularGridInterpolator((x, y), values)
+
+
+def tables_from_am_output(am_output_files):
+    """
+    Build the T_atm and tau_atm tables from the output of the AM model
+    (one file per weather percentile, each with columns frequency (GHz),
+    tau (nepers) and T (K); see am_code/README.md). The T_atm values are
+    rescaled by the zenith opacity.
+
+    :param am_output_files: AM output file for each weather percentile
+    :type am_output_files: dict[float, str or pathlib.Path]
+    :return: the T_atm table and the tau_atm table
+    :rtype: tuple(numpy.ndarray, numpy.ndarray)
+    """
+    weather = sorted(am_output_files)
+    am_outputs = [np.genfromtxt(am_output_files[pwv]) for pwv in weather]
+
+    frequencies = am_outputs[0][:, 0]
+    for am_output in am_outputs[1:]:
+        if not np.array_equal(am_output[:, 0], frequencies):
+            raise ValueError('The AM output files must share the same '
+                             'frequency grid')
+
+    tau_atm_table = np.column_stack(
+        [frequencies] + [am_output[:, 1] for am_output in am_outputs])
+    T_atm_table = np.column_stack(
+        [frequencies] + [am_output[:, 2] for am_output in am_outputs])
+    _rescale_T_atm(T_atm_table, tau_atm_table)
+
+    return T_atm_table, tau_atm_table
+
+
+def write_lookup(path, T_atm_table, tau_atm_table, weather, site,
+                 sources=()):
+    """
+    Write the atmosphere tables to the binary lookup format: a `.npy` file
+    holding both tables in a single (2, n_freq, 1 + n_weather) array
+    (T_atm first, then tau_atm), and a `.json` header of the same name
+    recording the frequency grid, weather percentiles, site and a SHA-256
+    hash of the array contents.
+
+    The T_atm table is expected to have already been rescaled by the
+    zenith opacity (see :func:`tables_from_am_output`).
+
+    :param path: path of the `.npy` file to write
+    :type path: str or pathlib.Path
+    :param T_atm_table: the T_atm table
+    :type T_atm_table: numpy.ndarray
+    :param tau_atm_table: the tau_atm table
+    :type tau_atm_table: numpy.ndarray
+    :param weather: the weather percentiles of the table columns
+    :type weather: list[float]
+    :param site: name of the site the AM model was run for
+    :type site: str
+    :param sources: names of the files the tables were built from
+    :type sources: list[str]
+    :return: the header
+    :rtype: dict
+    """
+    path = Path(path)
+    data = np.ascontiguousarray(np.stack((T_atm_table, tau_atm_table)),
+                                dtype=np.float64)
+    frequencies = data[0, :, 0]
+
+    header = {
+        'format_version': _LOOKUP_FORMAT_VERSION,
+        'site': site,
+        'frequency': {
+            'unit': 'GHz',
+            'start': float(frequencies[0]),
+            'stop': float(frequencies[-1]),
+            'step': float((frequencies[-1] - frequencies[0])
+                          / (len(frequencies) - 1)),
+            'count': len(frequencies),
+        },
+        'weather': [float(pwv) for pwv in weather],
+        'tables': ['T_atm', 'tau_atm'],
+        'T_atm_rescaled': True,
+        'sha256': _content_hash(data[0], data[1]),
+        'sources': [str(source) for source in sources],
+    }
+
+    np.save(path, data)
+    with open(_header_path(path), 'w') as f:
+        json.dump(header, f, indent=2)
+
+    return header
+
+
+def read_lookup(path, mmap=True, verify=False):
+    """
+    Read an atmosphere lookup written by :func:`write_lookup`. By default
+    the tables are memory-mapped read-only, so opening the lookup is almost
+    free and the pages are shared between processes through the OS cache.
+
+    :param path: path of the `.npy` file
+    :type path: str or pathlib.Path
+    :param mmap: True to memory-map the tables. Optional. Defaults to True
+    :type mmap: bool
+    :param verify: True to check the table contents against the hash in
+        the header. Note this reads the tables in full. Optional. Defaults
+        to False
+    :type verify: bool
+    :return: the T_atm table, the tau_atm table and the header
+    :rtype: tuple(numpy.ndarray, numpy.ndarray, dict)
+    """
+    path = Path(path)
+    with open(_header_path(path)) as f:
+        header = json.load(f)
+
+    if header['format_version'] != _LOOKUP_FORMAT_VERSION:
+        raise ValueError(f'Unsupported atmosphere lookup format version '
+                         f'{header["format_version"]}')
+
+    data = np.load(path, mmap_mode='r' if mmap else None)
+    T_atm_table, tau_atm_table = data[0], data[1]
+
+    if verify and \
+            _content_hash(T_atm_table, tau_atm_table) != header['sha256']:
+        raise ValueError(f'The contents of the atmosphere lookup {path} '
+                         f'do not match the hash in its header')
+
+    return T_atm_table, tau_atm_table, header
+
+
+_LOOKUP_FORMAT_VERSION = 1
+
+
+def _header_path(path):
+    return path.with_suffix('.json')
+
+
+def _content_hash(T_atm_table, tau_atm_table):
+    sha256 = hashlib.sha256()
+    for table in (T_atm_table, tau_atm_table):
+        sha256.update(np.ascontiguousarray(table, dtype=np.float64).data)
+    return sha256.hexdigest()
+
+
+def _rescale_T_atm(T_atm_table, tau_atm_table):
+    # the temperature values obtained by interpolating over the ATM tables are rescaled by the opacity at zenith to obtain T_atm (see the discussion around Eq. 7-9 in the ALMA Memo 602 (https://library.nrao.edu/public/memos/alma/main/memo602.pdf))
+    T_atm_table[:, 1:] = \
+        T_atm_table[:, 1:] / (1.00 - np.exp(-tau_atm_table[:, 1:]))
@@ -0,0 +1,684 @@
+"""
+Caches of calculation results.
+
+:class:`DerivedParamsCache` is a process-wide, bounded cache of the derived
+parameters, consulted by :class:`atlast_sc.parameter_setup.ParameterSetup`
+before calculating them. Its keys are the unit-normalised inputs of the
+calculation together with a fingerprint of the atmosphere tables and the
+instrument definitions, so that entries calculated with other tables or
+instruments are never used. The instrument is identified by its name and
+a hash of its parameters, so that calculators whose instruments have been
+modified do not share entries.
+
+The in-memory cache can be backed by a persistent cache in a SQLite file
+(:class:`SQLiteCache`), shared by several processes and kept across
+restarts. It is enabled by setting the ``ATLAST_SC_CACHE_PATH``
+environment variable to the path of the file (and, optionally,
+``ATLAST_SC_CACHE_SIZE`` to its maximum number of entries), or with
+:meth:`DerivedParamsCache.set_persistent`.
+"""
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+import numpy as np
+import astropy.units as u
+
+import atlast_sc
+from atlast_sc import kernel
+from atlast_sc.models import DerivedParams
+from atlast_sc.atmosphere import AtmosphereTables
+from atlast_sc.instruments.config import InstrumentRegistry
+
+
+@dataclass(frozen=True)
+class CacheStats:
+    """
+    Statistics of a cache
+    """
+    # Number of lookups that found an entry
+    hits: int
+    # Number of lookups that did not find an entry
+    misses: int
+    # Number of entries dropped to keep the cache within its size
+    evictions: int
+    # Number of entries in the cache
+    size: int
+    # Maximum number of entries
+    maxsize: int
+    # Number of entries dropped because they were older than the time to live
+    expirations: int = 0
+
+
+class LRUCache:
+    """
+    Thread-safe dictionary of at most `maxsize` entries. When it is full,
+    the least recently used entry is evicted to make room for a new one.
+    If `ttl` is given, entries older than `ttl` seconds are dropped when
+    they are next looked up.
+
+    :param maxsize: maximum number of entries. 0 disables the cache
+    :type maxsize: int
+    :param ttl: time to live of the entries, in seconds. Optional. By default
+        the entries do not expire
+    :type ttl: float
+    """
+    def __init__(self, maxsize=1024, ttl=None):
+        if maxsize < 0:
+            raise ValueError('The maximum size of a cache must not be negative')
+        if ttl is not None and ttl <= 0:
+            raise ValueError('The time to live of a cache must be positive')
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._entries = OrderedDict()
+        # Time at which each entry expires, if there is a time to live
+        self._expiries = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    @property
+    def maxsize(self):
+        """
+        Maximum number of entries
+        """
+        return self._maxsize
+
+    @property
+    def ttl(self):
+        """
+        Time to live of the entries, in seconds, or None
+        """
+        return self._ttl
+
+    def get(self, key, default=None):
+        """
+        Returns the value stored for `key`, marking it as recently used, or
+        `default` if there is none (or it has expired).
+        """
+        with self._lock:
+            if self._expired(key):
+                self._remove(key)
+                self._expirations += 1
+            try:
+                value = self._entries[key]
+            except KeyError:
+                self._misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def put(self, key, value):
+        """
+        Stores `value` for `key`, evicting the least recently used entries if
+        the cache is full.
+        """
+        with self._lock:
+            if self._maxsize == 0:
+                return
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if self._ttl is not None:
+                self._expiries[key] = time.monotonic() + self._ttl
+            self._evict()
+
+    def resize(self, maxsize):
+        """
+        Changes the maximum number of entries, evicting the least recently
+        used entries if there are too many.
+        """
+        if maxsize < 0:
+            raise ValueError('The maximum size of a cache must not be negative')
+        with self._lock:
+            self._maxsize = maxsize
+            self._evict()
+
+    def clear(self):
+        """
+        Removes all the entries. The statistics are kept.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._expiries.clear()
+
+    def stats(self):
+        """
+        :return: the statistics of the cache
+        :rtype: CacheStats
+        """
+        with self._lock:
+            return CacheStats(hits=self._hits, misses=self._misses,
+                              evictions=self._evictions, size=len(self._entries),
+                              maxsize=self._maxsize, expirations=self._expirations)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries and not self._expired(key)
+
+    def _expired(self, key):
+        """
+        Whether the entry for `key` has outlived the time to live.
+        """
+        expiry = self._expiries.get(key)
+        return expiry is not None and expiry <= time.monotonic()
+
+    def _remove(self, key):
+        """
+        Removes the entry for `key`. Must be called with the lock held.
+        """
+        del self._entries[key]
+        self._expiries.pop(key, None)
+
+    def _evict(self):
+        """
+        Drops the least recently used entries beyond the maximum size. Must
+        be called with the lock held.
+        """
+        while len(self._entries) > self._maxsize:
+            key, _ = self._entries.popitem(last=False)
+            self._expiries.pop(key, None)
+            self._evictions += 1
+
+
+class SQLiteCache:
+    """
+    Persistent cache stored in a SQLite file, which can be shared by several
+    processes (e.g. web workers) and survives restarts. When the cache holds
+    more than `maxsize` entries, the least recently used entries are
+    evicted.
+
+    The values are stored as JSON, not pickled, so that reading a file
+    written by someone else cannot run code. They may be made of numbers,
+    strings, None, lists, tuples (read back as lists), dictionaries with
+    string keys, numpy arrays and astropy Quantities. Other values are not
+    stored.
+
+    So that reads do not take the write lock of the database, the time an
+    entry was last used is only updated when it is older than
+    `recency_resolution` seconds, and entries used within that time of each
+    other may be evicted in either order. Entries are counted only when this
+    process has added enough entries to fill the cache (or a tenth of it),
+    and are then evicted down to 90% of `maxsize`, so that most writes do
+    not count or evict entries. The file may therefore briefly hold more
+    than `maxsize` entries when several processes write to it.
+
+    Errors reading or writing the file (e.g. a full disk, or a database
+    locked for longer than `timeout`) are not raised: a failed read is a
+    miss and a failed write is skipped, so that the cache never stops a
+    calculation.
+
+    :param path: path of the SQLite file, created if it does not exist
+    :type path: str or pathlib.Path
+    :param maxsize: maximum number of entries
+    :type maxsize: int
+    :param timeout: time to wait for another process to release the
+        database, in seconds
+    :type timeout: float
+    :param recency_resolution: minimum time between two updates of the time
+        an entry was last used, in seconds
+    :type recency_resolution: float
+    """
+    def __init__(self, path, maxsize=100000, timeout=10.0, recency_resolution=60.0):
+        if maxsize < 0:
+            raise ValueError('The maximum size of a cache must not be negative')
+        self._path = str(path)
+        self._maxsize = maxsize
+        self._timeout = timeout
+        self._recency_resolution = recency_resolution
+        # Number of entries evicted at once beyond the maximum size, and
+        # number of writes between two counts of the entries
+        self._headroom = maxsize // 10
+        # sqlite3 connections cannot be shared between threads
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+        with self._connection() as connection:
+            # Write-ahead logging lets readers and one writer use the file
+            # at the same time
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('CREATE TABLE IF NOT EXISTS entries ('
+                               'key TEXT PRIMARY KEY, value TEXT NOT NULL, '
+                               'last_used REAL NOT NULL)')
+            connection.execute('CREATE INDEX IF NOT EXISTS entries_last_used '
+                               'ON entries (last_used)')
+
+        # Upper estimate of the number of entries, counting the writes of
+        # this process since the entries were last counted
+        self._size_estimate = len(self)
+        self._writes_since_count = 0
+
+    @property
+    def path(self):
+        """
+        Path of the SQLite file
+        """
+        return self._path
+
+    @property
+    def maxsize(self):
+        """
+        Maximum number of entries
+        """
+        return self._maxsize
+
+    def get(self, key, default=None):
+        """
+        Returns the value stored for `key`, marking it as recently used, or
+        `default` if there is none.
+        """
+        try:
+            with self._connection() as connection:
+                row = connection.execute('SELECT value, last_used FROM entries WHERE key = ?',
+                                         (key,)).fetchone()
+                # Only write when the recorded use is not recent
+                now = time.time()
+                if row is not None and now - row[1] >= self._recency_resolution:
+                    connection.execute('UPDATE entries SET last_used = ? WHERE key = ?',
+                                       (now, key))
+            value = default if row is None else _decode(json.loads(row[0]))
+        except (sqlite3.Error, ValueError, TypeError, KeyError):
+            row = None
+            value = default
+
+        with self._lock:
+            if row is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+        return value
+
+    def put(self, key, value):
+        """
+        Stores `value` for `key`, evicting the least recently used entries if
+        the cache is full.
+        """
+        if self._maxsize == 0:
+            return
+        try:
+            data = json.dumps(_encode(value))
+            with self._connection() as connection:
+                connection.execute('INSERT OR REPLACE INTO entries (key, value, last_used) '
+                                   'VALUES (?, ?, ?)', (key, data, time.time()))
+        except (sqlite3.Error, ValueError, TypeError):
+            return
+
+        with self._lock:
+            self._size_estimate += 1
+            self._writes_since_count += 1
+            count_due = self._size_estimate > self._maxsize or \
+                self._writes_since_count > self._headroom
+        if count_due:
+            self._evict()
+
+    def clear(self):
+        """
+        Removes all the entries. The statistics are kept.
+        """
+        try:
+            with self._connection() as connection:
+                connection.execute('DELETE FROM entries')
+        except sqlite3.Error:
+            pass
+
+    def stats(self):
+        """
+        :return: the statistics of the cache, as seen by this process
+        :rtype: CacheStats
+        """
+        with self._lock:
+            return CacheStats(hits=self._hits, misses=self._misses,
+                              evictions=self._evictions, size=len(self),
+                              maxsize=self._maxsize)
+
+    def __len__(self):
+        # 0 if the file cannot be read
+        try:
+            with self._connection() as connection:
+                return connection.execute('SELECT count(*) FROM entries').fetchone()[0]
+        except sqlite3.Error:
+            return 0
+
+    def _evict(self):
+        """
+        Counts the entries and, if there are more than the maximum size,
+        evicts the least recently used ones down to 90% of it.
+        """
+        try:
+            with self._connection() as connection:
+                size = connection.execute('SELECT count(*) FROM entries').fetchone()[0]
+                evicted = 0
+                if size > self._maxsize:
+                    evicted = connection.execute(
+                        'DELETE FROM entries WHERE key IN (SELECT key FROM entries '
+                        'ORDER BY last_used LIMIT ?)',
+                        (size - self._maxsize + self._headroom,)).rowcount
+        except sqlite3.Error:
+            return
+
+        with self._lock:
+            self._size_estimate = size - evicted
+            self._writes_since_count = 0
+            self._evictions += evicted
+
+    def _connection(self):
+        """
+        Returns the connection of the current thread. Used as a context
+        manager, it commits the changes made in the block, or rolls them
+        back if an exception is raised.
+        """
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self._path, timeout=self._timeout)
+            self._local.connection = connection
+        return connection
+
+
+def _encode(value):
+    """
+    Converts a value to be stored by :class:`SQLiteCache` to plain JSON
+    types. Arrays and Quantities are stored as tagged dictionaries.
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, u.Quantity):
+        return {'__quantity__': _encode(value.value), 'unit': value.unit.to_string()}
+    if isinstance(value, np.ndarray):
+        return {'__array__': value.tolist(), 'dtype': value.dtype.str}
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (list, tuple)):
+        return [_encode(item) for item in value]
+    if isinstance(value, dict) and all(isinstance(key, str) for key in value):
+        return {key: _encode(item) for key, item in value.items()}
+    raise TypeError(f'Values of type {type(value).__name__} cannot be stored in '
+                    f'the persistent cache')
+
+
+def _decode(value):
+    """
+    Converts a value read by :class:`SQLiteCache` back from plain JSON
+    types.
+    """
+    if isinstance(value, list):
+        return [_decode(item) for item in value]
+    if isinstance(value, dict):
+        if '__quantity__' in value:
+            return u.Quantity(_decode(value['__quantity__']), u.Unit(value['unit']))
+        if '__array__' in value:
+            return np.array(value['__array__'], dtype=np.dtype(value['dtype']))
+        return {key: _decode(item) for key, item in value.items()}
+    return value
+
+
+class DerivedParamsCache:
+    """
+    Process-wide LRU cache of the derived parameters, shared by all the
+    calculators.
+
+    Each entry holds the derived parameters and the values recorded on the
+    instrument by its system temperature calculation (``T_sys`` and, for
+    heterodynes, ``T_rx``), which are restored on a hit. The entries are
+    dropped when the atmosphere tables or the instrument definitions
+    change.
+
+    Use :meth:`configure` to change the maximum number of entries (0
+    disables the cache) and :meth:`stats` to get the hit, miss and eviction
+    counts.
+
+    Calculations not found in memory are looked up in the persistent cache,
+    if one is set (see :meth:`set_persistent`). Its keys also hold a
+    fingerprint of the package version, source and data files, so that
+    entries written by another version of the calculator are not used.
+    """
+    DEFAULT_MAXSIZE = 1024
+
+    # Environment variables setting the persistent cache
+    PERSISTENT_PATH_ENV = 'ATLAST_SC_CACHE_PATH'
+    PERSISTENT_SIZE_ENV = 'ATLAST_SC_CACHE_SIZE'
+    DEFAULT_PERSISTENT_MAXSIZE = 100000
+
+    # Values recorded on the instrument by calculate_system_temperature
+    INSTRUMENT_STATE = ('T_sys', 'T_rx')
+
+    _lock = threading.Lock()
+    _cache = LRUCache(DEFAULT_MAXSIZE)
+    # Fingerprint of the tables and instruments the entries were
+    # calculated with
+    _fingerprint = None
+    # Persistent cache, set from the environment on first use
+    _persistent = None
+    _persistent_configured = False
+    # Hash of the package source and data files
+    _package_hash = None
+
+    @classmethod
+    def key(cls, inputs):
+        """
+        Builds the cache key of a calculation.
+
+        :param inputs: dictionary of the calculation inputs, as used by
+            ``ParameterSetup._calculate_derived_parameters``, with the chosen
+            instrument under 'instrument'
+        :type inputs: dict
+        :return: hashable key, made of the inputs in canonical units (see
+            :mod:`atlast_sc.kernel`) and the fingerprint of the atmosphere
+            tables and instrument definitions, or None if the calculation
+            cannot be cached
+        :rtype: tuple or None
+        """
+        values = []
+        for name, value in sorted(inputs.items()):
+            if name == 'instrument':
+                value = cls.instrument_key(value)
+                if value is None:
+                    return None
+            elif name != 'finetune':
+                value = float(kernel.to_canonical(name, value))
+            values.append((name, value))
+
+        return cls.fingerprint(), tuple(values)
+
+    @classmethod
+    def instrument_key(cls, instrument):
+        """
+        Identifies an instrument by its name and a hash of its parameters,
+        leaving out the values recorded by its calculations.
+
+        :return: name and hash of the instrument, or None if its parameters
+            cannot be hashed
+        :rtype: tuple(str, str) or None
+        """
+        recorded = {name for state in cls.INSTRUMENT_STATE for name in (state, '_' + state)}
+        parameters = {name: value for name, value in vars(instrument).items()
+                      if name not in recorded}
+        try:
+            digest = hashlib.sha1(pickle.dumps(parameters)).hexdigest()
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return None
+
+        return instrument.name, digest
+
+    @staticmethod
+    def fingerprint():
+        """
+        Fingerprint of the atmosphere tables and the instrument definitions
+        the calculations use.
+
+        :return: content hash of the atmosphere tables and number of times
+            the instrument definitions have been loaded
+        :rtype: tuple
+        """
+        return AtmosphereTables.get().content_hash, InstrumentRegistry.load_count()
+
+    @classmethod
+    def get(cls, key):
+        """
+        Returns the entry stored for `key`, or None.
+
+        :return: derived parameters and instrument state, or None
+        :rtype: tuple(atlast_sc.models.DerivedParams, dict) or None
+        """
+        if key is None:
+            return None
+        cls._check_fingerprint(key[0])
+        entry = cls._cache.get(key)
+
+        persistent = cls.persistent()
+        if entry is None and persistent is not None:
+            stored = persistent.get(cls._persistent_key(key))
+            if stored is not None:
+                entry = (DerivedParams(**stored['derived_params']),
+                         stored['instrument_state'])
+                cls._cache.put(key, entry)
+
+        return entry
+
+    @classmethod
+    def put(cls, key, derived_params, instrument):
+        """
+        Stores the derived parameters of a calculation, and the values
+        recorded on its instrument.
+
+        :param key: key of the calculation (see :meth:`key`)
+        :type key: tuple
+        :param derived_params: derived parameters
+        :type derived_params: atlast_sc.models.DerivedParams
+        :param instrument: the instrument used for the calculation
+        :type instrument: atlast_sc.instrument.Instrument
+        """
+        if key is None:
+            return
+        cls._check_fingerprint(key[0])
+        instrument_state = {name: getattr(instrument, name)
+                            for name in cls.INSTRUMENT_STATE if hasattr(instrument, name)}
+        cls._cache.put(key, (derived_params, instrument_state))
+
+        persistent = cls.persistent()
+        if persistent is not None:
+            persistent.put(cls._persistent_key(key),
+                           {'derived_params': dict(derived_params),
+                            'instrument_state': instrument_state})
+
+    @classmethod
+    def configure(cls, maxsize):
+        """
+        Changes the maximum number of entries. 0 disables the cache.
+
+        :param maxsize: maximum number of entries
+        :type maxsize: int
+        """
+        cls._cache.resize(maxsize)
+
+    @classmethod
+    def persistent(cls):
+        """
+        Returns the persistent cache. On first use, it is set from the
+        ``ATLAST_SC_CACHE_PATH`` and ``ATLAST_SC_CACHE_SIZE`` environment
+        variables.
+
+        :return: the persistent cache, or None if there is none
+        :rtype: SQLiteCache or None
+        """
+        if not cls._persistent_configured:
+            with cls._lock:
+                if not cls._persistent_configured:
+                    path = os.environ.get(cls.PERSISTENT_PATH_ENV)
+                    if path:
+                        maxsize = int(os.environ.get(cls.PERSISTENT_SIZE_ENV,
+                                                     cls.DEFAULT_PERSISTENT_MAXSIZE))
+                        cls._persistent = SQLiteCache(path, maxsize)
+                    cls._persistent_configured = True
+
+        return cls._persistent
+
+    @classmethod
+    def set_persistent(cls, path, maxsize=DEFAULT_PERSISTENT_MAXSIZE):
+        """
+        Sets the SQLite file of the persistent cache, replacing the one set
+        from the environment.
+
+        :param path: path of the SQLite file, or None for no persistent cache
+        :type path: str or pathlib.Path
+        :param maxsize: maximum number of entries
+        :type maxsize: int
+        :return: the persistent cache, or None
+        :rtype: SQLiteCache or None
+        """
+        with cls._lock:
+            cls._persistent = None if path is None else SQLiteCache(path, maxsize)
+            cls._persistent_configured = True
+            return cls._persistent
+
+    @classmethod
+    def package_fingerprint(cls):
+        """
+        Fingerprint of the calculator version, its source and instrument
+        files, and the atmosphere tables, identifying the results of this
+        version of the calculator in the persistent cache.
+
+        :return: hex digest
+        :rtype: str
+        """
+        if cls._package_hash is None:
+            package_dir = Path(atlast_sc.__file__).parent
+            digest = hashlib.sha256(atlast_sc.__version__.encode())
+            for path in sorted(package_dir.rglob('*')):
+                if path.suffix in ('.py', '.yaml') and path.is_file():
+                    digest.update(str(path.relative_to(package_dir)).encode())
+                    digest.update(path.read_bytes())
+            cls._package_hash = digest.hexdigest()
+
+        return hashlib.sha256((cls._package_hash + AtmosphereTables.get().content_hash)
+                              .encode()).hexdigest()
+
+    @classmethod
+    def clear(cls):
+        """
+        Removes all the entries from memory. The persistent cache is not
+        changed.
+        """
+        cls._cache.clear()
+
+    @classmethod
+    def stats(cls):
+        """
+        :return: the statistics of the cache
+        :rtype: CacheStats
+        """
+        return cls._cache.stats()
+
+    @classmethod
+    def _persistent_key(cls, key):
+        """
+        Key of a calculation in the persistent cache: a digest of the inputs
+        and instrument, and of the package fingerprint. The in-memory
+        fingerprint is not used, as the registry load count is only
+        meaningful within a process.
+        """
+        return hashlib.sha256(repr((cls.package_fingerprint(), key[1])).encode()).hexdigest()
+
+    @classmethod
+    def _check_fingerprint(cls, fingerprint):
+        """
+        Drops the entries if the atmosphere tables or the instrument
+        definitions have changed since they were calculated.
+        """
+        if fingerprint != cls._fingerprint:
+            with cls._lock:
+                if fingerprint != cls._fingerprint:
+                    cls._cache.clear()
+                    cls._fingerprint = fingerprint
@@ -1,4 +1,4 @@
-import warnings, yaml, re
+import warnings, yaml
 import astropy.units as u
 import numpy as np
 from atlast_sc.utils import DataHelper, Decorators
@@ -6,7 +6,10 @@ from atlast_sc.exceptions import CalculatedValueInvalidWarning
 from atlast_sc.exceptions import ValueOutOfRangeException
 from atlast_sc.exceptions import InstrumentNotApplicableException
 
+from atlast_sc import core
 from atlast_sc.parameter_setup import ParameterSetup
+from atlast_sc.instrument import parse_ranges
+from atlast_sc.sweep import run_sweep, spectrum_frequencies
 from atlast_sc.parameters.user_input_parameters import UserInputParameters
 from atlast_sc.parameters.telescope_and_environment_parameters import TelescopeAndEnvironmentParameters
 from atlast_sc.parameters.derived_parameters import DerivedParameters
@@ -22,18 +25,28 @@ class Calculator:
     :param instrument_setup: Dictionary containing instrument setup parameters.
      **NB: usage not tested, and may not be supported in future.**
     :type instrument_setup: dict
+    :param finetune: If True, the SEFD is integrated across the bandwidth
+     using the atmospheric parameters of each narrow channel (see
+     broadband sensitivity in the documentation)
+    :type finetune: bool
     """
-    def __init__(self, user_input={}):
+    def __init__(self, user_input={}, finetune=False):
         
         if user_input:
-            self._param_setup = ParameterSetup(user_input=user_input)
+            self._param_setup = ParameterSetup(user_input=user_input, finetune=finetune)
             # self.calculator = self._create_calculator(self.param_setup)
         else: # use the default values
-            self._param_setup = ParameterSetup()
+            self._param_setup = ParameterSetup(finetune=finetune)
             # self.calculator = self._create_calculator(self.param_setup)
 
         # Parameter setup class that contains models with default values
         # self._param_setup = self.param_setup
+        self._create_parameter_interfaces()
+
+    def _create_parameter_interfaces(self):
+        """
+        Creates the interfaces to the parameters held by the parameter setup.
+        """
         # Special classes for customisation of models
         self._user_input = UserInputParameters(self._param_setup)
         self._telescope_and_environment = TelescopeAndEnvironmentParameters(self._param_setup)
@@ -139,6 +152,15 @@ class Calculator:
                   'the list of instruments.')
         
 
+    @property
+    def inputs(self):
+        """
+        Immutable record of the current input parameters, which can be
+        evaluated with the functions in :mod:`atlast_sc.core`, e.g. from
+        another thread
+        """
+        return core.Inputs.from_calculation_input(self._param_setup.calculation_inputs)
+
     @property
     def loaded_instruments(self):
         """
@@ -166,16 +188,23 @@ class Calculator:
         Calculates the telescope sensitivity (mJy) for a
         given integration time `t_int`.
 
+        `t_int` may also be an array of integration times, in which case an
+        array of sensitivities is returned in a single unit, and the
+        calculator is not updated.
+
         :param t_int: integration time. Optional. Defaults to the internally
             stored value
         :type t_int: astropy.units.Quantity
         :param update_calculator: True if the calculator should be updated with
             the specified integration time and calculated sensitivity.
-            Optional. Defaults to True
+            Optional. Defaults to True. Ignored if `t_int` is an array
         :type update_calculator: bool
         :return: sensitivity in mJy
         :rtype: astropy.units.Quantity
         """
+        if np.ndim(t_int) > 0:
+            update_calculator = False
+
         if t_int is not None:
             if update_calculator:
                 self.user_input.t_int = t_int
@@ -184,18 +213,11 @@ class Calculator:
         else:
             t_int = self.user_input.t_int
 
-        sensitivity_result = \
-            self.derived_parameters.sefd / \
-            (self.derived_parameters.eta_s * np.sqrt(self.user_input.n_pol * self.user_input.bandwidth * t_int))
+        sensitivity_result = core.calculate_sensitivity(
+            self.derived_parameters.sefd, self.derived_parameters.eta_s,
+            self.user_input.n_pol, self.user_input.bandwidth, t_int)
 
-        # Convert the output to the most convenient units
-        sensitivity_result = sensitivity_result.to(u.mJy)
-        if  sensitivity_result < 1*u.mJy:
-            sensitivity_result = sensitivity_result.to(u.uJy)
-        elif (sensitivity_result >= 1*u.mJy) & (sensitivity_result < 1000*u.mJy):
-            sensitivity_result = sensitivity_result.to(u.mJy)
-        elif sensitivity_result >= 1000*u.mJy:
-            sensitivity_result = sensitivity_result.to(u.Jy)
+        sensitivity_result = Calculator.sensitivity_in_convenient_units(sensitivity_result)
 
         # Try to update the sensitivity stored in the calculator
         if update_calculator:
@@ -218,16 +240,22 @@ class Calculator:
         Calculates the integration time required for a given `sensitivity`
         to be reached.
 
+        `sensitivity` may also be an array of sensitivities, in which case an
+        array of integration times is returned in a single unit, and the
+        calculator is not updated.
+
         :param sensitivity: required sensitivity. Optional. Defaults
             to the internally stored value
         :type sensitivity: astropy.units.Quantity
         :param update_calculator: True if the calculator should be updated with
             the specified sensitivity and calculated integration time.
-            Optional. Defaults to True
+            Optional. Defaults to True. Ignored if `sensitivity` is an array
         :type update_calculator: bool
         :return: integration time in seconds
         :rtype: astropy.units.Quantity
         """
+        if np.ndim(sensitivity) > 0:
+            update_calculator = False
 
         if sensitivity is not None:
             if update_calculator:
@@ -237,17 +265,11 @@ class Calculator:
         else:
             sensitivity = self.user_input.sensitivity
         
-        t_int_result = (self.derived_parameters.sefd / (sensitivity * self.derived_parameters.eta_s)) ** 2 \
-                / (self.user_input.n_pol * self.user_input.bandwidth)
-
-        # Convert the output to the most convenient units
-        t_int_result = t_int_result.to(u.s)
-        if  t_int_result < 60*u.s:
-            t_int_result = t_int_result.to(u.s)
-        elif (t_int_result >= 60*u.s) & (t_int_result < 3600*u.s):
-            t_int_result = t_int_result.to(u.min)
-        elif t_int_result >= 3600*u.s:
-            t_int_result = t_int_result.to(u.h)
+        t_int_result = core.calculate_t_integration(
+            self.derived_parameters.sefd, self.derived_parameters.eta_s,
+            self.user_input.n_pol, self.user_input.bandwidth, sensitivity)
+
+        t_int_result = Calculator.t_int_in_convenient_units(t_int_result)
         # Try to update the integration time stored in the calculator
         if update_calculator:
             try:
@@ -257,10 +279,204 @@ class Calculator:
                 warnings.warn(message, CalculatedValueInvalidWarning)
         return t_int_result
 
+    def sweep(self, obs_freq=None, bandwidth=None, weather=None, elevation=None,
+              n_pol=None, target='sensitivity', t_int=None, sensitivity=None,
+              instrument=None):
+        """
+        Calculates the sensitivity or integration time at every combination
+        of the given parameter values, without updating the calculator.
+
+        Each swept parameter becomes one dimension of the result, in the
+        order obs_freq, bandwidth, weather, elevation, n_pol; parameters that
+        are not swept take their current value. Combinations that are
+        outside the permitted range of a parameter, or not covered by the
+        requested instrument, are masked rather than raising an error.
+
+        Example::
+
+            result = calculator.sweep(obs_freq=np.linspace(100, 800, 50) * u.GHz,
+                                      weather=[10, 25, 50, 75, 90])
+            result.sensitivity[result.valid]
+
+        :param obs_freq: observing frequencies. Optional
+        :type obs_freq: astropy.units.Quantity
+        :param bandwidth: bandwidths. Optional
+        :type bandwidth: astropy.units.Quantity
+        :param weather: weather (PWV percentiles). Optional
+        :type weather: list or numpy.ndarray
+        :param elevation: elevations. Optional
+        :type elevation: astropy.units.Quantity
+        :param n_pol: numbers of polarisations. Optional
+        :type n_pol: list or numpy.ndarray
+        :param target: 'sensitivity' or 't_int'. Optional. Defaults to
+            'sensitivity'
+        :type target: str
+        :param t_int: integration time used to calculate the sensitivity.
+            Optional. Defaults to the internally stored value
+        :type t_int: astropy.units.Quantity
+        :param sensitivity: sensitivity used to calculate the integration
+            time. Optional. Defaults to the internally stored value
+        :type sensitivity: astropy.units.Quantity
+        :param instrument: name of the instrument to use. Optional. By
+            default the instrument is chosen for each combination, as when
+            the user inputs are updated
+        :type instrument: str
+        :return: the sweep result (sensitivity in mJy, integration time in s)
+        :rtype: atlast_sc.sweep.SweepResult
+        """
+        swept = {'obs_freq': obs_freq, 'bandwidth': bandwidth, 'weather': weather,
+                 'elevation': elevation, 'n_pol': n_pol}
+        axes = {name: values for name, values in swept.items() if values is not None}
+
+        return run_sweep(self._param_setup, axes, target=target, t_int=t_int,
+                         sensitivity=sensitivity, instrument=instrument)
+
+    def sensitivity_spectrum(self, f_min=None, f_max=None, resolution=None,
+                             instrument=None, target='sensitivity', t_int=None,
+                             sensitivity=None):
+        """
+        Calculates the sensitivity (or integration time) versus observing
+        frequency across the range of an instrument, without updating the
+        calculator. By default the frequencies are those of the atmosphere
+        tables (10 MHz apart), and all of them are evaluated at once. The
+        other parameters, including the bandwidth, take their current value.
+
+        Frequencies that the instrument does not cover (e.g. between its
+        frequency ranges) are masked, as in :meth:`sweep`.
+
+        Example::
+
+            spectrum = calculator.sensitivity_spectrum(instrument='Sepia')
+            plt.plot(spectrum.axes['obs_freq'], spectrum.sensitivity)
+
+        :param f_min: lowest frequency. Optional. Defaults to the lowest
+            frequency of the instrument
+        :type f_min: astropy.units.Quantity
+        :param f_max: highest frequency. Optional. Defaults to the highest
+            frequency of the instrument
+        :type f_max: astropy.units.Quantity
+        :param resolution: spacing of the frequencies. Optional. Defaults to
+            the resolution of the atmosphere tables
+        :type resolution: astropy.units.Quantity
+        :param instrument: name of the instrument. Optional. Defaults to the
+            chosen instrument
+        :type instrument: str
+        :param target: 'sensitivity' or 't_int'. Optional. Defaults to
+            'sensitivity'
+        :type target: str
+        :param t_int: integration time used to calculate the sensitivity.
+            Optional. Defaults to the internally stored value
+        :type t_int: astropy.units.Quantity
+        :param sensitivity: sensitivity used to calculate the integration
+            time. Optional. Defaults to the internally stored value
+        :type sensitivity: astropy.units.Quantity
+        :return: the spectrum, as a sweep result over obs_freq (sensitivity
+            in mJy, integration time in s)
+        :rtype: atlast_sc.sweep.SweepResult
+        """
+        instrument = instrument or self.chosen_instrument
+        obs_freq_ranges = self._param_setup.loaded_instruments[instrument.capitalize()] \
+            .obs_freq_ranges
+        f_min = obs_freq_ranges.min() * u.GHz if f_min is None else f_min
+        f_max = obs_freq_ranges.max() * u.GHz if f_max is None else f_max
+        obs_freq = spectrum_frequencies(f_min, f_max, resolution)
+
+        return run_sweep(self._param_setup, {'obs_freq': obs_freq}, target=target,
+                         t_int=t_int, sensitivity=sensitivity, instrument=instrument)
+
+    def calculate_channels(self, instrument=None, t_int=None, sensitivity=None):
+        """
+        Calculates the system temperature, SEFD, sensitivity and integration
+        time of every channel of a spectroscopic instrument (e.g. the TIFUUN
+        filterbank), without updating the calculator. Each channel is
+        observed at its centre frequency with its width as the bandwidth;
+        the other parameters take their current value.
+
+        Example::
+
+            channels = calculator.calculate_channels('Tifuun', t_int=1 * u.h)
+            channels.obs_freq, channels.sensitivity
+
+        :param instrument: name of the instrument. Optional. Defaults to the
+            chosen instrument
+        :type instrument: str
+        :param t_int: integration time used to calculate the sensitivity.
+            Optional. Defaults to the internally stored value
+        :type t_int: astropy.units.Quantity
+        :param sensitivity: sensitivity used to calculate the integration
+            time. Optional. Defaults to the internally stored value
+        :type sensitivity: astropy.units.Quantity
+        :return: the result for each channel (sensitivity in mJy,
+            integration time in s)
+        :rtype: atlast_sc.core.ChannelResult
+        """
+        changes = {}
+        if t_int is not None:
+            changes['t_int'] = t_int
+        if sensitivity is not None:
+            changes['sensitivity'] = sensitivity
+        inputs = self.inputs.replace(**changes)
+
+        return core.evaluate_channels(inputs, instrument or self.chosen_instrument)
+
     ###################
     # Utility methods #
     ###################
 
+    def batch_update(self):
+        """
+        Context manager for updating several parameters at once. The
+        instrument is selected and the derived parameters are recalculated
+        only once, when the context exits. If an exception is raised inside
+        the context, the parameters are restored to their previous values.
+
+        Example::
+
+            with calculator.batch_update():
+                calculator.user_input.obs_freq = 300 * u.GHz
+                calculator.user_input.bandwidth = 100 * u.MHz
+        """
+        return self._param_setup.batch_update()
+
+    def clone(self, **overrides):
+        """
+        Creates a new calculator from this one, with some user input
+        parameters changed. This is much cheaper than creating a calculator
+        from scratch: the inputs are not validated again, the instruments are
+        copied from this calculator's, sharing their parsed values and range
+        index, rather than populated, and the derived parameters are only
+        recalculated if they depend on an overridden parameter. Creating many
+        scenarios from one prototype calculator is therefore dominated by
+        the calculations themselves.
+
+        The new calculator is independent of this one. Its initial values,
+        restored by :meth:`reset`, are the current values of this calculator
+        with the overrides applied. The calculated sensitivity and
+        integration time are not copied.
+
+        Example::
+
+            prototype = Calculator()
+            scenarios = [prototype.clone(weather=weather, elevation=elevation)
+                         for weather in (10, 50, 90)
+                         for elevation in (30, 60) * u.deg]
+
+        :param overrides: new user input values, keyed by parameter name (see
+            ``user_input.update``)
+        :return: new calculator
+        :rtype: Calculator
+        """
+        calculator = Calculator.__new__(Calculator)
+        # The original inputs are saved once the overrides are applied
+        calculator._param_setup = self._param_setup.clone(
+            save_original_inputs=not overrides)
+        calculator._create_parameter_interfaces()
+        if overrides:
+            calculator.user_input.update(**overrides)
+            calculator._param_setup.save_original_inputs()
+
+        return calculator
+
     def reset(self):
         """
         Resets all calculator parameters to their initial values.
@@ -281,57 +497,23 @@ class Calculator:
         :return: applicability of requested instrument
         :rtype: boolean
         """
-        inst_applicable = False
-        obs_freq_applicable = False
-        bandwidth_applicable = False
+        range_index = self._param_setup.instrument_range_index
 
         # See if the requested instrument fits the existent user input values
-        user_obs_freq = self.user_input.obs_freq
-        # Check if obs_freq units are the same 
-        user_obs_freq_unit = str(self.user_input.obs_freq.unit)
-        requested_inst_obs_freq_unit = self.loaded_instruments[requested_inst_name]['obs_freq']['unit']
-        # If the units are not the same, convert user input obs_freq to the unit
-        # of the requested instrument obs_freq ranges
-        if user_obs_freq_unit != requested_inst_obs_freq_unit:
-            user_obs_freq = user_obs_freq.to(u.Unit(requested_inst_obs_freq_unit))
-        user_obs_freq = user_obs_freq.value
-            
-        # Convert bandwidth value to Hz
-        user_bandwidth = self.user_input.bandwidth
-        user_bandwidth = user_bandwidth.to(u.Hz)
-        user_bandwidth = user_bandwidth.value
-
-        # Requested instrument ranges
-        instrument_obs_freqs = \
-            self.loaded_instruments[requested_inst_name]['obs_freq']['ranges']
-        instrument_bandw_vals = \
-            self.loaded_instruments[requested_inst_name]['bandwidth']['ranges']
-        
-        # Check if user inputted observing frequency value falls in 
-        # the range of the requested instrument ranges
-        for range in instrument_obs_freqs:
-            range = re.findall(r"[\d.]+", range)
-            min_freq = float(range[0])
-            max_freq = float(range[1])
-            if user_obs_freq >= min_freq and user_obs_freq <= max_freq:
-                obs_freq_applicable = True
+        obs_freq_applicable = range_index.obs_freq_applicable(
+            self.user_input.obs_freq)[range_index.names.index(requested_inst_name)]
 
         # Check if user inputted bandwidth value falls in the range of 
         # the requested instrument ranges
         if requested_inst_name != 'Default':
-            for range in instrument_bandw_vals:
-                range = re.findall(r"[\d.]+", range)
-                min_bandw = float(range[0])
-                max_bandw = float(range[1])
-                if user_bandwidth >= min_bandw and user_bandwidth <= max_bandw:
-                    bandwidth_applicable = True
+            bandwidth_applicable = range_index.bandwidth_applicable(
+                self.user_input.bandwidth)[range_index.names.index(requested_inst_name)]
         else: # If the requested instrument is Default
             bandwidth_applicable = True
 
         # If both user inputted parameters fall in the requested
         # instrument range
-        if obs_freq_applicable and bandwidth_applicable:
-            inst_applicable = True
+        inst_applicable = bool(obs_freq_applicable and bandwidth_applicable)
         return inst_applicable
 
     def list_instruments(self):
@@ -385,17 +567,8 @@ class Calculator:
             return bandwidth_ranges, bandwidth_unit
         
         # Determine the appropriate unit based on max values
-        max_val = 0
-        if isinstance(bandwidth_ranges, list):
-            for range_str in bandwidth_ranges:
-                matches = re.findall(r"[\d.]+", range_str)
-                if len(matches) >= 2:
-                    val = float(matches[1])
-                    max_val = max(max_val, val)
-        else:
-            matches = re.findall(r"[\d.]+", str(bandwidth_ranges))
-            if len(matches) >= 2:
-                max_val = float(matches[1])
+        limits = parse_ranges(bandwidth_ranges)
+        max_val = limits[:, 1].max(initial=0)
         
         # Determine display unit
         if max_val >= 1e6:
@@ -410,26 +583,71 @@ class Calculator:
         
         # Convert ranges if needed
         if divisor != 1:
-            formatted_ranges = []
+            formatted_ranges = [f"({min_val}-{max_val})" for min_val, max_val in limits / divisor]
             if isinstance(bandwidth_ranges, list):
-                for range_str in bandwidth_ranges:
-                    matches = re.findall(r"[\d.]+", range_str)
-                    if len(matches) >= 2:
-                        min_val = float(matches[0]) / divisor
-                        max_val = float(matches[1]) / divisor
-                        formatted_ranges.append(f"({min_val}-{max_val})")
-                    else:
-                        formatted_ranges.append(range_str)
                 return formatted_ranges, display_unit
             else:
-                matches = re.findall(r"[\d.]+", str(bandwidth_ranges))
-                if len(matches) >= 2:
-                    min_val = float(matches[0]) / divisor
-                    max_val = float(matches[1]) / divisor
-                    return f"({min_val}-{max_val})", display_unit
+                return formatted_ranges[0], display_unit
         
         return bandwidth_ranges, bandwidth_unit
 
+    @staticmethod
+    def sensitivity_in_convenient_units(sensitivity):
+        """
+        Converts a sensitivity to the most convenient units (uJy, mJy or Jy).
+        An array is converted to the units most convenient for its median
+        value.
+
+        :param sensitivity: sensitivity
+        :type sensitivity: astropy.units.Quantity
+        :return: sensitivity in the most convenient units
+        :rtype: astropy.units.Quantity
+        """
+        typical_sensitivity = Calculator._typical_value(sensitivity)
+        if  typical_sensitivity < 1*u.mJy:
+            sensitivity = sensitivity.to(u.uJy)
+        elif (typical_sensitivity >= 1*u.mJy) & (typical_sensitivity < 1000*u.mJy):
+            sensitivity = sensitivity.to(u.mJy)
+        elif typical_sensitivity >= 1000*u.mJy:
+            sensitivity = sensitivity.to(u.Jy)
+        return sensitivity
+
+    @staticmethod
+    def t_int_in_convenient_units(t_int):
+        """
+        Converts an integration time to the most convenient units (s, min or
+        h). An array is converted to the units most convenient for its
+        median value.
+
+        :param t_int: integration time
+        :type t_int: astropy.units.Quantity
+        :return: integration time in the most convenient units
+        :rtype: astropy.units.Quantity
+        """
+        typical_t_int = Calculator._typical_value(t_int)
+        if  typical_t_int < 60*u.s:
+            t_int = t_int.to(u.s)
+        elif (typical_t_int >= 60*u.s) & (typical_t_int < 3600*u.s):
+            t_int = t_int.to(u.min)
+        elif typical_t_int >= 3600*u.s:
+            t_int = t_int.to(u.h)
+        return t_int
+
+    @staticmethod
+    def _typical_value(result):
+        """
+        The value used to choose the units of a calculated result: the
+        result itself, or the median of an array of results.
+
+        :param result: the calculated result
+        :type result: astropy.units.Quantity
+        :return: the typical value of the result
+        :rtype: astropy.units.Quantity
+        """
+        if result.ndim == 0:
+            return result
+        return np.nanmedian(result)
+
     @staticmethod
     def _calculated_value_error_msg(calculated_value, validation_error):
         """
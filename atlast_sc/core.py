@@ -0,0 +1,534 @@
+"""
+Stateless core of the sensitivity calculation.
+
+The functions in this module take immutable input records and return
+immutable result records. They do not modify their arguments, the shared
+atmosphere tables or the shared instruments, so a single set of tables and
+instruments can be used to evaluate many calculations at once, e.g. from a
+thread pool::
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    inputs = [core.Inputs(obs_freq=f * u.GHz) for f in (100, 200, 300)]
+    with ThreadPoolExecutor() as executor:
+        results = list(executor.map(core.evaluate, inputs))
+
+The calculation itself runs on plain floats in canonical units (see
+:mod:`atlast_sc.kernel`); Quantities are only created for the returned
+records.
+
+:class:`atlast_sc.calculator.Calculator` is a stateful facade over these
+functions: it stores the parameters, the chosen instrument and the latest
+results.
+"""
+import dataclasses
+import threading
+from dataclasses import dataclass, field
+from types import MappingProxyType
+
+import numpy as np
+import astropy.units as u
+from astropy.units import Quantity, Unit
+
+from atlast_sc import kernel
+from atlast_sc.data import Data, Validator
+from atlast_sc.derived_groups import Efficiencies
+from atlast_sc.exceptions import InstrumentNotApplicableException
+from atlast_sc.instrument import InstrumentRangeIndex
+from atlast_sc.instruments.config import InstrumentRegistry
+
+
+def _default(key):
+    """
+    Factory for the default value of a parameter, with its default units
+    if it has any.
+    """
+    data_type = Data.param_data_type_dicts[key]
+    if data_type.default_unit is None:
+        return lambda: float(data_type.default_value)
+    return lambda: data_type.default_value * Unit(data_type.default_unit)
+
+
+@dataclass(frozen=True)
+class Inputs:
+    """
+    Immutable set of input parameters for a calculation. Parameters that
+    are not given take their default values. All the values are validated
+    when the record is created.
+    """
+    t_int: Quantity = field(default_factory=_default('t_int'))
+    sensitivity: Quantity = field(default_factory=_default('sensitivity'))
+    bandwidth: Quantity = field(default_factory=_default('bandwidth'))
+    obs_freq: Quantity = field(default_factory=_default('obs_freq'))
+    n_pol: float = field(default_factory=_default('n_pol'))
+    weather: float = field(default_factory=_default('weather'))
+    elevation: Quantity = field(default_factory=_default('elevation'))
+    surface_rms: Quantity = field(default_factory=_default('surface_rms'))
+    dish_radius: Quantity = field(default_factory=_default('dish_radius'))
+    T_amb: Quantity = field(default_factory=_default('T_amb'))
+    T_cmb: Quantity = field(default_factory=_default('T_cmb'))
+    eta_eff: float = field(default_factory=_default('eta_eff'))
+    eta_ill: float = field(default_factory=_default('eta_ill'))
+    eta_spill: float = field(default_factory=_default('eta_spill'))
+    eta_block: float = field(default_factory=_default('eta_block'))
+    eta_pol: float = field(default_factory=_default('eta_pol'))
+
+    def __post_init__(self):
+        for parameter in dataclasses.fields(self):
+            value = getattr(self, parameter.name)
+            Validator.validate_field(parameter.name, value)
+            # Keep a read-only copy of Quantities, so that the record cannot
+            # be changed through the object it was created from
+            if isinstance(value, Quantity):
+                value = value.copy()
+                value.flags.writeable = False
+                object.__setattr__(self, parameter.name, value)
+
+        # The values in canonical units are used by every evaluation, so
+        # they are converted once
+        object.__setattr__(self, '_canonical', MappingProxyType(
+            {parameter.name: kernel.to_canonical(parameter.name, getattr(self, parameter.name))
+             for parameter in dataclasses.fields(self)}))
+
+    @classmethod
+    def from_calculation_input(cls, calculation_input):
+        """
+        Creates an input record from the calculation input model of a
+        parameter setup.
+
+        :param calculation_input: calculation input model
+        :type calculation_input: atlast_sc.models.CalculationInput
+        :return: input record
+        :rtype: Inputs
+        """
+        values = {}
+        for model in (calculation_input.user_input,
+                      calculation_input.telescope_and_environment):
+            for name, value in model:
+                values[name] = value.value
+        return cls(**values)
+
+    def canonical(self):
+        """
+        Returns the input values as plain floats in the canonical units of
+        :mod:`atlast_sc.kernel`.
+
+        :return: dictionary of parameter names and values
+        :rtype: dict
+        """
+        return dict(self._canonical)
+
+    def replace(self, **changes):
+        """
+        Returns a copy of the record with some of the values changed. Only
+        the changed values are validated again.
+
+        :return: new input record
+        :rtype: Inputs
+        """
+        inputs = object.__new__(Inputs)
+        values = {parameter.name: getattr(self, parameter.name)
+                  for parameter in dataclasses.fields(self)}
+        canonical = dict(self._canonical)
+        for name, value in changes.items():
+            if name not in values:
+                raise TypeError(f"'{name}' is not an input parameter")
+            Validator.validate_field(name, value)
+            if isinstance(value, Quantity):
+                value = value.copy()
+                value.flags.writeable = False
+            values[name] = value
+            canonical[name] = kernel.to_canonical(name, value)
+
+        for name, value in values.items():
+            object.__setattr__(inputs, name, value)
+        object.__setattr__(inputs, '_canonical', MappingProxyType(canonical))
+        return inputs
+
+
+@dataclass(frozen=True)
+class Derived:
+    """
+    Immutable set of parameters derived from the inputs of a calculation
+    """
+    # Name of the instrument used
+    instrument: str
+    # Atmospheric transmittance
+    transmittance: float
+    # Atmospheric temperature
+    T_atm: Quantity
+    # Dish efficiency
+    eta_a: float
+    # System efficiency
+    eta_s: float
+    # Sky temperature
+    T_sky: Quantity
+    # System temperature
+    T_sys: Quantity
+    # Source equivalent flux density
+    sefd: Quantity
+
+
+@dataclass(frozen=True)
+class Result:
+    """
+    Immutable result of a calculation: the sensitivity reached in the
+    integration time of the inputs, and the integration time needed to reach
+    the sensitivity of the inputs.
+    """
+    inputs: Inputs
+    derived: Derived
+    sensitivity: Quantity
+    t_int: Quantity
+
+
+@dataclass(frozen=True)
+class ChannelResult:
+    """
+    Immutable result of a calculation for every channel of a spectroscopic
+    instrument. Each array has one value per channel.
+    """
+    inputs: Inputs
+    # Name of the instrument used
+    instrument: str
+    # Channel centre frequencies
+    obs_freq: Quantity
+    # Channel widths
+    bandwidth: Quantity
+    # Atmospheric transmittance
+    transmittance: np.ndarray
+    # System temperature
+    T_sys: Quantity
+    # Source equivalent flux density
+    sefd: Quantity
+    # Sensitivity reached in the integration time of the inputs
+    sensitivity: Quantity
+    # Integration time needed to reach the sensitivity of the inputs
+    t_int: Quantity
+
+
+@dataclass(frozen=True)
+class InstrumentSet:
+    """
+    Instruments shared by calculations, with the index of their ranges.
+    Only the methods that do not modify an instrument are used on them.
+    """
+    instruments: MappingProxyType
+    range_index: InstrumentRangeIndex
+
+
+_instrument_set_lock = threading.Lock()
+_instrument_set = None
+
+
+def shared_instruments():
+    """
+    Returns the instruments shared by all calculations in the process. The
+    set is rebuilt when the instrument registry is refreshed.
+
+    :return: shared instruments
+    :rtype: InstrumentSet
+    """
+    global _instrument_set
+
+    definitions = InstrumentRegistry.get()
+    instrument_set = _instrument_set
+    if instrument_set is None or instrument_set[0] is not definitions:
+        with _instrument_set_lock:
+            if _instrument_set is None or _instrument_set[0] is not definitions:
+                instruments = {name: definition.instrument
+                               for name, definition in definitions.items()}
+                _instrument_set = (definitions,
+                                   InstrumentSet(MappingProxyType(instruments),
+                                                 InstrumentRegistry.range_index()))
+            instrument_set = _instrument_set
+
+    return instrument_set[1]
+
+
+def select_instrument(obs_freq, bandwidth, instrument=None, instrument_set=None):
+    """
+    Chooses the instrument for an observing frequency and bandwidth, or
+    checks that the requested instrument covers them. Raises a ValueError if
+    the requested instrument is unknown, and an
+    InstrumentNotApplicableException if it does not cover them.
+
+    :param obs_freq: observing frequency
+    :type obs_freq: astropy.units.Quantity
+    :param bandwidth: bandwidth
+    :type bandwidth: astropy.units.Quantity
+    :param instrument: name of the requested instrument (case insensitive).
+        Optional
+    :type instrument: str
+    :param instrument_set: instruments to choose from. Optional. Defaults to
+        the shared instruments
+    :type instrument_set: InstrumentSet
+    :return: name of the instrument
+    :rtype: str
+    """
+    instrument_set = instrument_set or shared_instruments()
+    range_index = instrument_set.range_index
+    applicable_inst_name = range_index.select(obs_freq, bandwidth)
+    if instrument is None:
+        return applicable_inst_name
+
+    if instrument.capitalize() not in instrument_set.instruments:
+        raise ValueError(f"Unknown instrument '{instrument}'. The available instruments "
+                         f"are {', '.join(range_index.names)}.")
+    inst_name = instrument_set.instruments[instrument.capitalize()].name
+    column = range_index.names.index(inst_name)
+    applicable = range_index.obs_freq_applicable(obs_freq)[column]
+    # The default instrument accepts any bandwidth
+    if inst_name != range_index.DEFAULT_INSTRUMENT:
+        applicable &= range_index.bandwidth_applicable(bandwidth)[column]
+    if not applicable:
+        raise InstrumentNotApplicableException(inst_name, applicable_inst_name)
+
+    return inst_name
+
+
+def dish_efficiency(obs_freq, surface_rms, eta_ill, eta_spill, eta_block, eta_pol):
+    """
+    Calculates the dish efficiency using the Ruze formula.
+
+    :return: dish efficiency
+    :rtype: float or numpy.ndarray
+    """
+    return kernel.dish_efficiency(kernel.to_canonical('obs_freq', obs_freq),
+                                  kernel.to_canonical('surface_rms', surface_rms),
+                                  eta_ill, eta_spill, eta_block, eta_pol)
+
+
+def transmittance(obs_freq, weather, elevation):
+    """
+    Interpolates the atmospheric transmittance.
+
+    :return: transmittance
+    :rtype: float or numpy.ndarray
+    """
+    return kernel.transmittance(kernel.to_canonical('obs_freq', obs_freq),
+                                kernel.to_canonical('weather', weather),
+                                kernel.to_canonical('elevation', elevation))
+
+
+def atmospheric_temperature(obs_freq, weather):
+    """
+    Interpolates the atmospheric temperature.
+
+    :return: atmospheric temperature
+    :rtype: astropy.units.Quantity
+    """
+    return kernel.atmospheric_temperature(kernel.to_canonical('obs_freq', obs_freq),
+                                          kernel.to_canonical('weather', weather)) * u.K
+
+
+def temperatures(instrument, obs_freq, bandwidth, T_cmb, T_amb, eta_eff, T_atm,
+                 transmittance, n_pol):
+    """
+    Calculates the sky temperature and, using the float kernel of the
+    instrument, the system temperature. Nothing is recorded on the
+    instrument.
+
+    :return: sky temperature and system temperature
+    :rtype: tuple(astropy.units.Quantity, astropy.units.Quantity)
+    """
+    obs_freq = kernel.to_canonical('obs_freq', obs_freq)
+    T_sky = kernel.sky_temperature(Quantity(T_atm, u.K).to_value(u.K), transmittance,
+                                   kernel.to_canonical('T_cmb', T_cmb), obs_freq)
+    T_sys = instrument.system_temperature_kernel(obs_freq,
+                                                 kernel.to_canonical('bandwidth', bandwidth),
+                                                 eta_eff, kernel.to_canonical('T_amb', T_amb),
+                                                 T_sky, transmittance, n_pol)
+    return T_sky * u.K, T_sys * u.K
+
+
+def channel_system_temperatures(instrument, obs_freq, bandwidth, weather, elevation,
+                                T_cmb, T_amb, eta_eff, n_pol):
+    """
+    Calculates the system temperature of the narrow channels making up the
+    band, each using the atmospheric parameters at its own frequency. The
+    channels are the frequencies of the atmosphere tables within the band,
+    padded with the band edges.
+
+    :return: channel widths and system temperatures
+    :rtype: tuple(astropy.units.Quantity, astropy.units.Quantity)
+    """
+    obs_band_list, T_sys_list = kernel.channel_system_temperatures(
+        instrument, kernel.to_canonical('obs_freq', obs_freq),
+        kernel.to_canonical('bandwidth', bandwidth), kernel.to_canonical('weather', weather),
+        kernel.to_canonical('elevation', elevation), kernel.to_canonical('T_cmb', T_cmb),
+        kernel.to_canonical('T_amb', T_amb), kernel.to_canonical('eta_eff', eta_eff),
+        kernel.to_canonical('n_pol', n_pol))
+    return obs_band_list * u.Hz, T_sys_list * u.K
+
+
+def calculate_sefd(T_sys, eta_a, dish_radius):
+    """
+    Calculates the source equivalent flux density, SEFD, from the system
+    temperature, T_sys, the dish efficiency eta_A, and the dish area.
+
+    :param T_sys: system temperature
+    :type T_sys: astropy.units.Quantity
+    :param eta_a: the dish efficiency factor
+    :type eta_a: float
+    :param dish_radius: radius of the dish
+    :type dish_radius: astropy.units.Quantity
+    :return: source equivalent flux density
+    :rtype: astropy.units.Quantity
+    """
+    return kernel.sefd(Quantity(T_sys, u.K).to_value(u.K), eta_a,
+                       kernel.to_canonical('dish_radius', dish_radius)) * u.Jy
+
+
+def calculate_effective_sefd(channel_T_sys, eta_a, bandwidth, dish_radius):
+    """
+    Calculates the effective SEFD of the band from the system temperatures
+    of the channels making up the band, sefd_eff =
+    sqrt(dnu/sum(dnu_i/sefd_i**2)).
+
+    :param channel_T_sys: channel widths and system temperatures (see
+        :func:`channel_system_temperatures`)
+    :type channel_T_sys: tuple(astropy.units.Quantity, astropy.units.Quantity)
+    :return: source equivalent flux density
+    :rtype: astropy.units.Quantity
+    """
+    obs_band_list, T_sys_list = channel_T_sys
+    channel_T_sys = (obs_band_list.to_value(u.Hz), T_sys_list.to_value(u.K))
+    return kernel.effective_sefd(None, channel_T_sys, eta_a,
+                                 kernel.to_canonical('bandwidth', bandwidth),
+                                 kernel.to_canonical('dish_radius', dish_radius)) * u.Jy
+
+
+def calculate_sensitivity(sefd, eta_s, n_pol, bandwidth, t_int):
+    """
+    Calculates the sensitivity reached in the integration time `t_int`.
+
+    :return: sensitivity in mJy
+    :rtype: astropy.units.Quantity
+    """
+    return (sefd / (eta_s * np.sqrt(n_pol * bandwidth * t_int))).to(u.mJy)
+
+
+def calculate_t_integration(sefd, eta_s, n_pol, bandwidth, sensitivity):
+    """
+    Calculates the integration time needed to reach the `sensitivity`.
+
+    :return: integration time in seconds
+    :rtype: astropy.units.Quantity
+    """
+    return ((sefd / (sensitivity * eta_s)) ** 2 / (n_pol * bandwidth)).to(u.s)
+
+
+def derive(inputs, instrument=None, finetune=False, instrument_set=None):
+    """
+    Calculates the derived parameters for a set of inputs.
+
+    :param inputs: calculation inputs
+    :type inputs: Inputs
+    :param instrument: name of the instrument to use. Optional. By default
+        the instrument is chosen from the observing frequency and bandwidth
+    :type instrument: str
+    :param finetune: if True, the SEFD is integrated across the bandwidth
+    :type finetune: bool
+    :param instrument_set: instruments to use. Optional. Defaults to the
+        shared instruments
+    :type instrument_set: InstrumentSet
+    :return: derived parameters
+    :rtype: Derived
+    """
+    instrument_set = instrument_set or shared_instruments()
+    inst_name = select_instrument(inputs.obs_freq, inputs.bandwidth, instrument,
+                                  instrument_set)
+
+    # The calculation is done on plain values by the float kernel
+    values = inputs.canonical()
+    derived = kernel.derive(instrument_set.instruments[inst_name], values['obs_freq'],
+                            values['bandwidth'], values['n_pol'], values['weather'],
+                            values['elevation'], values['surface_rms'],
+                            values['dish_radius'], values['T_amb'], values['T_cmb'],
+                            values['eta_eff'], values['eta_ill'], values['eta_spill'],
+                            values['eta_block'], values['eta_pol'], Efficiencies.ETA_S,
+                            finetune)
+
+    return Derived(instrument=inst_name, transmittance=derived['transmittance'],
+                   T_atm=derived['T_atm'] * u.K, eta_a=derived['eta_a'],
+                   eta_s=derived['eta_s'], T_sky=derived['T_sky'] * u.K,
+                   T_sys=derived['T_sys'] * u.K, sefd=derived['sefd'] * u.Jy)
+
+
+def evaluate(inputs, instrument=None, finetune=False, instrument_set=None):
+    """
+    Calculates the derived parameters, the sensitivity reached in the
+    integration time of the inputs and the integration time needed to reach
+    the sensitivity of the inputs.
+
+    :param inputs: calculation inputs
+    :type inputs: Inputs
+    :param instrument: name of the instrument to use. Optional. By default
+        the instrument is chosen from the observing frequency and bandwidth
+    :type instrument: str
+    :param finetune: if True, the SEFD is integrated across the bandwidth
+    :type finetune: bool
+    :param instrument_set: instruments to use. Optional. Defaults to the
+        shared instruments
+    :type instrument_set: InstrumentSet
+    :return: result of the calculation
+    :rtype: Result
+    """
+    derived = derive(inputs, instrument, finetune, instrument_set)
+    values = inputs.canonical()
+    sefd = derived.sefd.to_value(u.Jy)
+    sensitivity = kernel.sensitivity(sefd, derived.eta_s, values['n_pol'],
+                                     values['bandwidth'], values['t_int']) * u.Jy
+    t_int = kernel.t_integration(sefd, derived.eta_s, values['n_pol'],
+                                 values['bandwidth'], values['sensitivity']) * u.s
+
+    return Result(inputs=inputs, derived=derived, sensitivity=sensitivity.to(u.mJy),
+                  t_int=t_int)
+
+
+def evaluate_channels(inputs, instrument, instrument_set=None):
+    """
+    Calculates the system temperature, SEFD, sensitivity and integration
+    time of every channel of a spectroscopic instrument in one vectorised
+    evaluation. Each channel is observed at its centre frequency with its
+    width as the bandwidth; the observing frequency and bandwidth of the
+    inputs are not used.
+
+    :param inputs: calculation inputs
+    :type inputs: Inputs
+    :param instrument: name of the instrument (case insensitive)
+    :type instrument: str
+    :param instrument_set: instruments to use. Optional. Defaults to the
+        shared instruments
+    :type instrument_set: InstrumentSet
+    :return: result for each channel
+    :rtype: ChannelResult
+    """
+    instrument_set = instrument_set or shared_instruments()
+    inst = instrument_set.instruments[instrument.capitalize()]
+    if inst.channels is None:
+        raise ValueError(f'The instrument {inst.name} does not define channels')
+
+    values = inputs.canonical()
+    obs_freq = inst.channels.centres * 1e9
+    bandwidth = inst.channels.widths * 1e9
+    # Channels with no transmission give an infinite system temperature
+    with np.errstate(divide='ignore', over='ignore', invalid='ignore'):
+        derived = kernel.derive(inst, obs_freq, bandwidth, values['n_pol'],
+                                values['weather'], values['elevation'],
+                                values['surface_rms'], values['dish_radius'],
+                                values['T_amb'], values['T_cmb'], values['eta_eff'],
+                                values['eta_ill'], values['eta_spill'], values['eta_block'],
+                                values['eta_pol'], Efficiencies.ETA_S)
+        sensitivity = kernel.sensitivity(derived['sefd'], derived['eta_s'], values['n_pol'],
+                                         bandwidth, values['t_int'])
+        t_int = kernel.t_integration(derived['sefd'], derived['eta_s'], values['n_pol'],
+                                     bandwidth, values['sensitivity'])
+
+    return ChannelResult(inputs=inputs, instrument=inst.name,
+                         obs_freq=inst.channels.centres * u.GHz,
+                         bandwidth=inst.channels.widths * u.GHz,
+                         transmittance=derived['transmittance'],
+                         T_sys=derived['T_sys'] * u.K, sefd=derived['sefd'] * u.Jy,
+                         sensitivity=(sensitivity * u.Jy).to(u.mJy), t_int=t_int * u.s)
@@ -1,5 +1,6 @@
 import math
 from dataclasses import dataclass
+import numpy as np
 import astropy.units as u
 from astropy.units import Unit, Quantity
 from atlast_sc.utils import DataHelper
@@ -292,26 +293,27 @@ class Validator:
             return
 
         # If the lower value is a floor value, make sure the provided value
-        # is greater than this
+        # is greater than this. Arrays of values are valid only if every
+        # value is.
         if data_type.lower_value_is_floor:
-            if value <= data_type.lower_value:
+            if np.any(value <= data_type.lower_value):
                 raise ValueTooLowException(param, data_type.lower_value,
                                            data_type.default_unit)
 
         # Do a special check for infinity (unlikely scenario, but not
         # impossible...)
-        if math.isinf(value):
+        if np.any(np.isinf(value)):
             raise ValueTooHighException(param, data_type.upper_value,
                                         data_type.default_unit)
 
         # If the upper value is a ceiling value, make sure the provided value
         # is less than
         if data_type.upper_value_is_ceil:
-            if value >= data_type.upper_value:
+            if np.any(value >= data_type.upper_value):
                 raise ValueTooHighException(param, data_type.upper_value,
                                             data_type.default_unit)
 
-        if not (data_type.lower_value <= value <= data_type.upper_value):
+        if not np.all((data_type.lower_value <= value) & (value <= data_type.upper_value)):
             raise ValueOutOfRangeException(param,
                                            data_type.lower_value,
                                            data_type.upper_value,
@@ -325,7 +327,7 @@ class Validator:
         if data_type.allowed_values is None:
             return
 
-        if value not in data_type.allowed_values:
+        if not np.all(np.isin(value, data_type.allowed_values)):
             raise ValueNotAllowedException(param,
                                            data_type.allowed_values,
                                            data_type.default_unit)
@@ -0,0 +1,163 @@
+from collections import Counter
+
+import numpy as np
+
+
+class DependencyNode:
+    """
+    A node of the dependency graph. The node value is calculated by calling
+    `function` with the values of its inputs as keyword arguments.
+
+    :param name: name of the node
+    :type name: str
+    :param function: function that calculates the node value
+    :type function: callable
+    :param inputs: names of the graph inputs and/or other nodes the value
+     depends on
+    :type inputs: tuple[str]
+    """
+    def __init__(self, name, function, inputs):
+        self.name = name
+        self.function = function
+        self.inputs = tuple(inputs)
+
+
+class DependencyGraph:
+    """
+    Graph of the dependencies between calculation inputs and the values
+    derived from them. Evaluating the graph only recalculates the nodes with
+    an input that has changed since the previous evaluation, either directly
+    or through another node.
+
+    Nodes must be added after all the nodes they depend on.
+    """
+    def __init__(self):
+        self._nodes = {}
+        self._inputs = {}
+        self._values = {}
+        self._recompute_counts = Counter()
+        self._last_recomputed = ()
+
+    @property
+    def nodes(self):
+        """
+        Names of the nodes, in evaluation order
+        """
+        return tuple(self._nodes)
+
+    @property
+    def values(self):
+        """
+        Values of the nodes calculated by the most recent evaluation
+        """
+        return dict(self._values)
+
+    @property
+    def recompute_counts(self):
+        """
+        Number of times each node has been calculated
+        """
+        return dict(self._recompute_counts)
+
+    @property
+    def last_recomputed(self):
+        """
+        Names of the nodes calculated by the most recent evaluation
+        """
+        return self._last_recomputed
+
+    def add_node(self, name, function, inputs):
+        """
+        Adds a node to the graph.
+
+        :param name: name of the node
+        :type name: str
+        :param function: function that calculates the node value from the
+         values of `inputs`, passed as keyword arguments
+        :type function: callable
+        :param inputs: names of the graph inputs and/or existing nodes the
+         value depends on
+        :type inputs: iterable of str
+        """
+        if name in self._nodes:
+            raise ValueError(f'Node "{name}" already exists')
+        self._nodes[name] = DependencyNode(name, function, inputs)
+
+    def invalidate(self):
+        """
+        Forgets all the node values, so that every node is recalculated on
+        the next evaluation.
+        """
+        self._inputs = {}
+        self._values = {}
+
+    def copy_values(self, other, **inputs):
+        """
+        Copies the node values, and the inputs they were calculated from,
+        from another graph with the same nodes, so that evaluating this graph
+        with the same inputs does not recalculate anything.
+
+        :param other: graph to copy the values from
+        :type other: DependencyGraph
+        :param inputs: input values replacing those of the other graph, for
+         inputs that are equal but not identical (e.g., copied instruments)
+        """
+        if other.nodes != self.nodes:
+            raise ValueError('The graphs do not have the same nodes')
+        self._values = dict(other._values)
+        self._inputs = dict(other._inputs)
+        for name, value in inputs.items():
+            if name in self._inputs:
+                self._inputs[name] = value
+
+    def evaluate(self, inputs):
+        """
+        Evaluates the graph for the given inputs and returns the value of
+        every node.
+
+        :param inputs: dictionary of graph input names and values
+        :type inputs: dict
+        :return: dictionary of node names and values
+        :rtype: dict
+        """
+        changed = {name for name, value in inputs.items()
+                   if name not in self._inputs
+                   or DependencyGraph._has_changed(self._inputs[name], value)}
+
+        recomputed = []
+        for name, node in self._nodes.items():
+            if name in self._values and changed.isdisjoint(node.inputs):
+                continue
+
+            kwargs = {}
+            for input_name in node.inputs:
+                if input_name in self._nodes:
+                    kwargs[input_name] = self._values[input_name]
+                else:
+                    kwargs[input_name] = inputs[input_name]
+            self._values[name] = node.function(**kwargs)
+
+            changed.add(name)
+            recomputed.append(name)
+            self._recompute_counts[name] += 1
+
+        self._inputs = dict(inputs)
+        self._last_recomputed = tuple(recomputed)
+
+        return dict(self._values)
+
+    @staticmethod
+    def _has_changed(old_value, new_value):
+        """
+        Determines whether an input value has changed. Objects that do not
+        support comparison by value (e.g., instruments) are compared by
+        identity.
+        """
+        if old_value is new_value:
+            return False
+        if type(old_value) is not type(new_value):
+            return True
+        try:
+            return not bool(np.all(old_value == new_value))
+        except (TypeError, ValueError):
+            return True
@@ -1,8 +1,7 @@
-from pathlib import Path
-from scipy.interpolate import RegularGridInterpolator
 import numpy as np
 import astropy.units as u
 from astropy import constants
+from atlast_sc.atmosphere import AtmosphereTables
 
 # I'm not sure if this is the best place for this function.
 # It's needed both here and also in the instrument modules. 
@@ -17,6 +16,13 @@ def noise_temperature(temperature, frequency):
     noise_temp = temperature*(ratio/np.expm1(ratio))
     return noise_temp
 
+def sky_temperature(T_atm, transmittance, T_cmb, obs_freq):
+    """
+    Function to calculate the sky temperature seen through the atmosphere.
+    T_atm is already a Rayleigh-Jeans brightness temperature. T_cmb needs to be converted.
+    """
+    return T_atm * (1 - transmittance) + transmittance * noise_temperature(T_cmb, obs_freq)
+
 class AtmosphereParams:
     """
     Class used to retrieve atmospheric parameters from a model.
@@ -25,67 +31,104 @@ class AtmosphereParams:
     (Use of AM model described in am_code/README.md.)
     The code interpolates over the grids to get the correct values for tau_atm
     and T_atm.
-    """
 
-    _STATIC_DATA_PATH = Path(__file__).resolve().parents[0] / "static"
-
-    _WEATHER = [5, 25, 50, 75, 95]
-    _T_ATM_PATH = _STATIC_DATA_PATH / "lookups" / "am_ACT_T_annual.txt"
-    _TAU_ATM_PATH = _STATIC_DATA_PATH / "lookups" / "am_ACT_tau_annual.txt"
+    The grids are loaded once per process and shared between all instances
+    (see :class:`atlast_sc.atmosphere.AtmosphereTables`), so creating an
+    AtmosphereParams object is cheap.
+    """
 
     def __init__(self):
 
-        self.T_atm_table = np.genfromtxt(AtmosphereParams._T_ATM_PATH) # Rayleigh-Jeans sky brightness temperature at zenith
-        self.tau_atm_table = np.genfromtxt(AtmosphereParams._TAU_ATM_PATH) # Sky opacity at zenith
-        # the temperature values obtained by interpolating over the ATM tables are rescaled by the opacity at zenith to obtain T_atm (see the discussion around Eq. 7-9 in the ALMA Memo 602 (https://library.nrao.edu/public/memos/alma/main/memo602.pdf))
-        self.T_atm_table[:,1:] = self.T_atm_table[:,1:] / (1.00 - np.exp(-self.tau_atm_table[:,1:]))
+        tables = AtmosphereTables.get()
 
-        self._interp_T_atm = RegularGridInterpolator((self.T_atm_table[:, 0],
-                                                      AtmosphereParams._WEATHER),
-                                                      self.T_atm_table[:, 1:])
+        self.T_atm_table = tables.T_atm_table # Rayleigh-Jeans sky brightness temperature at zenith, rescaled by the opacity
+        self.tau_atm_table = tables.tau_atm_table # Sky opacity at zenith
 
-        self._interp_tau_atm = RegularGridInterpolator((self.tau_atm_table[:, 0],
-                                                        AtmosphereParams._WEATHER),
-                                                        self.tau_atm_table[:, 1:])
+        self._interp_T_atm = tables.interp_T_atm
+        self._interp_tau_atm = tables.interp_tau_atm
 
     def calculate_atmospheric_temperature(self, obs_freq, weather):
         """
-        Calculate the atmospheric temperature T_atm
-    
-        :param obs_freq: the central observing frequency
-        :type obs_freq: astropy.units.Quantity
+        Calculate the atmospheric temperature T_atm.
+
+        The observing frequency and weather may be scalars or arrays, which
+        are broadcast against each other and evaluated in a single
+        interpolation.
+
+        :param obs_freq: the central observing frequency (GHz if provided
+            without units)
+        :type obs_freq: astropy.units.Quantity or float or numpy.ndarray
         :param weather: the precipitable water vapour
-        :type weather: float
+        :type weather: float or numpy.ndarray
         :return: Atmospheric temperature
         :rtype: astropy.units.Quantity
         """
-        return float(self._interp_T_atm((obs_freq, weather))) * u.K
-    
+        points = AtmosphereParams._interpolation_points(obs_freq, weather)
+        T_atm = self._interp_T_atm(points).reshape(points.shape[:-1])
+
+        return AtmosphereParams._as_scalar_or_array(T_atm) * u.K
+
     def calculate_transmittance(self, obs_freq, weather, elevation):
         """
-        Calculate the atmospheric transmittance
+        Calculate the atmospheric transmittance.
 
-        :param obs_freq: the central observing frequency
-        :type obs_freq: astropy.units.Quantity
+        The observing frequency, weather and elevation may be scalars or
+        arrays, which are broadcast against each other and evaluated in a
+        single interpolation.
+
+        :param obs_freq: the central observing frequency (GHz if provided
+            without units)
+        :type obs_freq: astropy.units.Quantity or float or numpy.ndarray
         :param weather: the precipitable water vapour
-        :type weather: float
-        :param elevation: elevation of the target
-        :type elevation: astropy.units.Quantity
+        :type weather: float or numpy.ndarray
+        :param elevation: elevation of the target (degrees if provided
+            without units)
+        :type elevation: astropy.units.Quantity or float or numpy.ndarray
         :return: Atmospheric transmittance
-        :rtype: astropy.units.Quantity
+        :rtype: float or numpy.ndarray
         """
-        tau_z = self._interp_tau_atm((obs_freq, weather))
-        zenith = 90.0 * u.deg - elevation
-        tau_atm = tau_z / np.cos(zenith)
+        points = AtmosphereParams._interpolation_points(obs_freq, weather)
+        tau_z = self._interp_tau_atm(points).reshape(points.shape[:-1])
+        zenith = 90.0 - _to_value(elevation, u.deg)
+        tau_atm = tau_z / np.cos(np.deg2rad(zenith))
         transmittance = np.exp(-tau_atm)
-        
-        return float(transmittance)
+
+        return AtmosphereParams._as_scalar_or_array(transmittance)
+
+    @staticmethod
+    def _interpolation_points(obs_freq, weather):
+        """
+        Broadcast the observing frequencies (in GHz) and weather values
+        against each other and stack them into interpolation points.
+        """
+        obs_freq, weather = np.broadcast_arrays(_to_value(obs_freq, u.GHz),
+                                                _to_value(weather))
+        return np.stack((obs_freq, weather), axis=-1)
+
+    @staticmethod
+    def _as_scalar_or_array(values):
+        """
+        Return a float for a single value, or the array otherwise.
+        """
+        return float(values) if np.ndim(values) == 0 else values
+
+
+def _to_value(value, unit=None):
+    """
+    Return the value of a Quantity in the given unit, or the plain value
+    as a float array if it has no units.
+    """
+    if isinstance(value, u.Quantity):
+        return value.to_value(unit) if unit is not None else value.value
+    return np.asarray(value, dtype=float)
 
 
 class Efficiencies:
     """
     Calculates efficiency terms
     """
+    # PLACEHOLDER - more/different efficiencies may need to be added
+    ETA_S = 0.99
 
     def __init__(self, obs_freq, surface_rms, eta_ill, eta_spill, eta_block,
                  eta_pol):
@@ -121,8 +164,7 @@ class Efficiencies:
         Get the system efficiency
         """
 
-        # PLACEHOLDER - more/different efficiencies may need to be added
-        return 0.99
+        return Efficiencies.ETA_S
 
     @staticmethod
     def _calculate_eta_a(obs_freq, surface_rms, eta_ill, eta_spill,
@@ -162,8 +204,7 @@ class Temperatures:
     """
 
     def __init__(self, inst_module, obs_freq, bandwidth, T_cmb, T_amb, eta_eff, T_atm, transmittance, n_pol):
-        # T_atm is already a Rayleigh-Jeans brightness temperature. T_cmb needs to be converted.
-        self._T_sky = T_atm * (1 - transmittance) + transmittance * noise_temperature(T_cmb, obs_freq)
+        self._T_sky = sky_temperature(T_atm, transmittance, T_cmb, obs_freq)
         # T_sys is calculated in the selected instrument module.
         self._T_sys = inst_module.calculate_system_temperature(obs_freq, bandwidth, eta_eff, 
                                                                T_amb, self.T_sky,
@@ -1,4 +1,240 @@
+import copy
+import re
+import warnings
+from types import SimpleNamespace
+import numpy as np
+import astropy.units as u
 from atlast_sc.data import Validator, Data
+from atlast_sc import kernel
+
+# A range written in the instrument YAML files, e.g. "(272.0-330.0)" or
+# "(6.1e4-4e9)"
+_NUMBER = r"(\d+(?:\.\d*)?(?:[eE][-+]?\d+)?)"
+_RANGE_PATTERN = re.compile(r"\(\s*" + _NUMBER + r"\s*-\s*" + _NUMBER + r"\s*\)")
+
+
+def _to_value(value, unit=u.dimensionless_unscaled):
+    """
+    Return the value of a Quantity in the given unit, or a plain value
+    unchanged.
+    """
+    return value.to_value(unit) if isinstance(value, u.Quantity) else value
+
+
+def parse_ranges(ranges, unit=None, to_unit=None):
+    """
+    Parses ranges from an instrument YAML file into a numeric array.
+
+    :param ranges: list of ranges, e.g. ['(120.0-210.0)', '(210.0-360.0)']
+    :type ranges: list[str] or str
+    :param unit: the unit of the ranges
+    :type unit: str
+    :param to_unit: the unit to convert the ranges to
+    :type to_unit: str
+    :return: array of shape (number of ranges, 2) holding the lower and upper
+        limit of each range
+    :rtype: numpy.ndarray
+    """
+    if isinstance(ranges, str):
+        ranges = [ranges]
+
+    limits = []
+    for range_str in ranges:
+        match = _RANGE_PATTERN.fullmatch(str(range_str).strip())
+        if match is None:
+            raise ValueError(f'Invalid range "{range_str}". Ranges must be '
+                             f'of the form "(<min>-<max>)"')
+        limits.append([float(match.group(1)), float(match.group(2))])
+
+    limits = np.array(limits, dtype=float).reshape(-1, 2)
+    if to_unit is not None and len(limits):
+        limits = (limits * u.Unit(unit)).to_value(to_unit)
+    limits.flags.writeable = False
+
+    return limits
+
+
+class ReceiverTemperatureCurve:
+    """
+    Tabulated receiver temperature as a function of observing frequency,
+    e.g. a measured curve, evaluated by linear interpolation. Frequencies
+    outside the table use the temperature at the nearest end.
+
+    :param frequencies: observing frequencies of the table, increasing
+    :type frequencies: list[float]
+    :param temperatures: receiver temperature at each frequency
+    :type temperatures: list[float]
+    :param frequency_unit: unit of the frequencies
+    :type frequency_unit: str
+    :param unit: unit of the temperatures
+    :type unit: str
+    """
+    def __init__(self, frequencies, temperatures, frequency_unit='GHz', unit='K'):
+        frequencies = np.array(frequencies, dtype=float)
+        temperatures = np.array(temperatures, dtype=float)
+        if frequencies.ndim != 1 or frequencies.shape != temperatures.shape \
+                or len(frequencies) < 2:
+            raise ValueError('A receiver temperature curve needs the same number '
+                             '(at least two) of frequencies and values')
+        if not (np.all(np.isfinite(frequencies)) and np.all(np.isfinite(temperatures))):
+            raise ValueError('The receiver temperature curve must only contain '
+                             'finite numbers')
+        if np.any(np.diff(frequencies) <= 0):
+            raise ValueError('The frequencies of a receiver temperature curve must '
+                             'be strictly increasing')
+
+        # Stored in GHz and K, the units used by the instrument calculations
+        self._frequencies = (frequencies * u.Unit(frequency_unit)).to_value(u.GHz)
+        self._temperatures = (temperatures * u.Unit(unit)).to_value(u.K)
+        self._frequencies.flags.writeable = False
+        self._temperatures.flags.writeable = False
+
+    @classmethod
+    def from_data(cls, curve):
+        """
+        Creates the curve from the ``receiver_temperature_curve`` block of an
+        instrument YAML file, e.g.::
+
+            receiver_temperature_curve:
+              frequencies: [272.0, 300.0, 330.0, 376.0]
+              frequency_unit: GHz
+              values: [90.0, 85.0, 90.0, 216.5]
+              unit: K
+
+        :param curve: the block read from the YAML file
+        :type curve: dict
+        :return: the receiver temperature curve
+        :rtype: ReceiverTemperatureCurve
+        """
+        return cls(curve['frequencies'], curve['values'],
+                   curve.get('frequency_unit', 'GHz'), curve.get('unit', 'K'))
+
+    @property
+    def frequencies(self):
+        """
+        Frequencies of the table in GHz
+        """
+        return self._frequencies
+
+    @property
+    def temperatures(self):
+        """
+        Receiver temperatures of the table in Kelvin
+        """
+        return self._temperatures
+
+    def __call__(self, obs_freq):
+        """
+        Interpolates the receiver temperature.
+
+        :param obs_freq: observing frequency in GHz, scalar or array
+        :type obs_freq: float or numpy.ndarray
+        :return: receiver temperature in Kelvin
+        :rtype: float or numpy.ndarray
+        """
+        temp = np.interp(obs_freq, self._frequencies, self._temperatures)
+        return float(temp) if np.ndim(temp) == 0 else temp
+
+
+class InstrumentChannels:
+    """
+    Channels of a spectroscopic (spectrometer or filterbank) instrument:
+    the centre frequency and width of each channel.
+
+    :param centres: centre frequencies of the channels
+    :type centres: list[float] or numpy.ndarray
+    :param widths: widths of the channels
+    :type widths: list[float] or numpy.ndarray
+    :param unit: unit of the centres and widths
+    :type unit: str
+    """
+    def __init__(self, centres, widths, unit='GHz'):
+        centres = np.array(centres, dtype=float)
+        widths = np.array(widths, dtype=float)
+        if centres.ndim != 1 or centres.shape != widths.shape or len(centres) == 0:
+            raise ValueError('The channels need the same number (at least one) of '
+                             'centres and widths')
+        if not (np.all(centres > 0) and np.all(widths > 0)):
+            raise ValueError('The channel centres and widths must be positive')
+
+        # Stored in GHz, the unit of the instrument observing frequency ranges
+        self._centres = (centres * u.Unit(unit)).to_value(u.GHz)
+        self._widths = (widths * u.Unit(unit)).to_value(u.GHz)
+        self._centres.flags.writeable = False
+        self._widths.flags.writeable = False
+
+    @classmethod
+    def from_resolution(cls, obs_freq_ranges, spectral_resolution):
+        """
+        Generates logarithmically spaced channels covering the observing
+        frequency ranges, each of width f/R at its centre frequency f, and
+        spaced by one width.
+
+        :param obs_freq_ranges: observing frequency ranges in GHz (see
+            :func:`parse_ranges`)
+        :type obs_freq_ranges: numpy.ndarray
+        :param spectral_resolution: spectral resolution R = f/df
+        :type spectral_resolution: float
+        :return: the channels
+        :rtype: InstrumentChannels
+        """
+        if not spectral_resolution > 0:
+            raise ValueError('The spectral resolution must be positive')
+
+        step = 1 + 1 / spectral_resolution
+        centres = []
+        for low, high in obs_freq_ranges:
+            n_channels = int(np.floor(np.log(high / low) / np.log(step))) + 1
+            centres.append(low * step ** np.arange(n_channels))
+        centres = np.unique(np.concatenate(centres))
+
+        return cls(centres, centres / spectral_resolution)
+
+    @classmethod
+    def from_data(cls, channels, obs_freq_ranges):
+        """
+        Creates the channels from the ``channels`` block of an instrument
+        YAML file, which either lists the channels or gives the spectral
+        resolution from which they are generated, e.g.::
+
+            channels:
+              centres: [100.0, 100.5, 101.0]
+              widths: [0.5, 0.5, 0.5]
+              unit: GHz
+
+        or::
+
+            channels:
+              spectral_resolution: 500
+
+        :param channels: the block read from the YAML file
+        :type channels: dict
+        :param obs_freq_ranges: observing frequency ranges in GHz
+        :type obs_freq_ranges: numpy.ndarray
+        :return: the channels
+        :rtype: InstrumentChannels
+        """
+        if 'spectral_resolution' in channels:
+            return cls.from_resolution(obs_freq_ranges, channels['spectral_resolution'])
+        return cls(channels['centres'], channels['widths'], channels.get('unit', 'GHz'))
+
+    @property
+    def centres(self):
+        """
+        Centre frequencies of the channels in GHz
+        """
+        return self._centres
+
+    @property
+    def widths(self):
+        """
+        Widths of the channels in GHz
+        """
+        return self._widths
+
+    def __len__(self):
+        return len(self._centres)
+
 
 class Instrument():
     def __init__(self, data):
@@ -7,6 +243,36 @@ class Instrument():
         self.obs_freq_ranges_and_unit = self.set_obs_freq_ranges_and_unit(self.data)
         self.bandwidth_ranges_and_unit = self.set_bandwidth_ranges_and_unit(self.data)
         self.receiver_temp_options_and_unit = self.set_receiver_temp_options_and_unit(self.data)
+        # Numeric ranges, parsed once: observing frequency in GHz and
+        # bandwidth in Hz
+        self.obs_freq_ranges = parse_ranges(self.obs_freq_ranges_and_unit['ranges'],
+                                            self.obs_freq_ranges_and_unit['unit'], u.GHz)
+        self.bandwidth_ranges = parse_ranges(self.bandwidth_ranges_and_unit['ranges'],
+                                             self.bandwidth_ranges_and_unit['unit'], u.Hz)
+        # Optional tabulated receiver temperature, replacing the values of
+        # receiver_temperature when given
+        self.receiver_temperature_curve = self.set_receiver_temperature_curve(self.data)
+        # Channels of spectroscopic instruments, None for other instruments
+        self.channels = self.set_channels(self.data)
+
+    def copy(self):
+        """
+        Returns a copy of the instrument that shares its parsed values (the
+        numeric ranges, the receiver temperature curve and the channels,
+        which are read-only), so that the instrument data is not parsed and
+        validated again. Only the dictionaries and the data namespace of the
+        instrument are copied, so that replacing a value in them, or setting
+        an attribute, does not change this instrument; the values read from
+        the YAML file are shared.
+
+        :return: copy of the instrument
+        :rtype: Instrument
+        """
+        instrument = copy.copy(self)
+        for name, value in vars(instrument).items():
+            if isinstance(value, (dict, SimpleNamespace)):
+                vars(instrument)[name] = copy.copy(value)
+        return instrument
 
     def set_name(self, data):
         """Set the name of the instrument."""
@@ -16,24 +282,404 @@ class Instrument():
         # Validate the unit specified in instrument files
         Validator.validate_units(data.allowed_ranges["observing_frequency"]["unit"],
                                  'obs_freq', Data.obs_frequency)
-    
+
         return ( {'ranges': data.allowed_ranges["observing_frequency"]["ranges"],
                   'unit': data.allowed_ranges["observing_frequency"]["unit"]} )
-       
+
     def set_bandwidth_ranges_and_unit(self, data):
         # Validate the unit specified in instrument files
         Validator.validate_units(data.allowed_ranges["bandwidth"]["unit"],
                                  'bandwidth', Data.bandwidth)
-        
+
         return ( {'ranges': data.allowed_ranges["bandwidth"]["ranges"],
                   'unit': data.allowed_ranges["bandwidth"]["unit"]} )
-    
+
     def set_receiver_temp_options_and_unit(self, data):
-        # ASC-76 Currently not validating receiver temp units because 
+        # ASC-76 Currently not validating receiver temp units because
         # values provided directly in the instrument files are temporary.
-        if hasattr(data, 'receiver_temperature'): 
+        if hasattr(data, 'receiver_temperature'):
             # If the instrument YAML file has receiver temperature specified
             return ( {'values': data.receiver_temperature["values"],
                     'unit': data.receiver_temperature["unit"]} )
         else:
-            return None
\ No newline at end of file
+            return None
+
+    def set_receiver_temperature_curve(self, data):
+        if hasattr(data, 'receiver_temperature_curve'):
+            # If the instrument YAML file has a receiver temperature curve
+            return ReceiverTemperatureCurve.from_data(data.receiver_temperature_curve)
+        else:
+            return None
+
+    def set_channels(self, data):
+        if hasattr(data, 'channels'):
+            # If the instrument YAML file describes the instrument channels
+            return InstrumentChannels.from_data(data.channels, self.obs_freq_ranges)
+        else:
+            return None
+
+    def system_temperature(self, obs_freq, bandwidth, eta_eff, T_amb, T_sky,
+                           transmittance, n_pol):
+        """
+        Returns the system temperature without recording anything on the
+        instrument, so that one instrument object can be shared between
+        threads (see :mod:`atlast_sc.core`).
+
+        All the arguments may be arrays, which are broadcast together, and
+        the result has the broadcast shape.
+
+        Instruments should implement the calculation, supporting arrays, in
+        :meth:`system_temperature_kernel`: the arguments are then converted
+        to plain values in the kernel units and passed to it.
+
+        Instruments that only implement a scalar
+        ``calculate_system_temperature`` are evaluated on a copy of the
+        instrument, one combination of the arguments at a time. This slow
+        path is deprecated, and emits a DeprecationWarning.
+
+        :return: system temperature in Kelvin
+        :rtype: astropy.units.Quantity
+        """
+        if type(self).system_temperature_kernel is not Instrument.system_temperature_kernel:
+            system_temp = self.system_temperature_kernel(
+                _to_value(obs_freq, u.Hz), _to_value(bandwidth, u.Hz), _to_value(eta_eff),
+                _to_value(T_amb, u.K), _to_value(T_sky, u.K), _to_value(transmittance),
+                _to_value(n_pol))
+            return system_temp * u.K
+
+        warnings.warn(f'{type(self).__name__} does not implement system_temperature_kernel, '
+                      f'so its system temperature is calculated one point at a time. '
+                      f'Instruments without a system_temperature_kernel are deprecated.',
+                      DeprecationWarning, stacklevel=2)
+        instrument = copy.copy(self)
+        args = (obs_freq, bandwidth, eta_eff, T_amb, T_sky, transmittance, n_pol)
+        if all(np.ndim(arg) == 0 for arg in args):
+            return instrument.calculate_system_temperature(*args)
+
+        args = np.broadcast_arrays(*args, subok=True)
+        temps = [instrument.calculate_system_temperature(*(arg[index] for arg in args))
+                 for index in np.ndindex(args[0].shape)]
+        return u.Quantity(temps, u.K).reshape(args[0].shape)
+
+    def record_system_temperature(self, obs_freq, T_sys):
+        """
+        Records a system temperature calculated for the instrument, and the
+        receiver temperature of instruments that have one, as
+        ``calculate_system_temperature`` does.
+        """
+        if hasattr(self, 'T_rx'):
+            self.T_rx = self.receiver_temperature(obs_freq)
+        self.T_sys = T_sys
+
+    def system_temperature_kernel(self, obs_freq, bandwidth, eta_eff, T_amb, T_sky,
+                                  transmittance, n_pol):
+        """
+        Float kernel of :meth:`system_temperature`, working on plain values:
+        obs_freq and bandwidth in Hz, temperatures in Kelvin (see
+        :mod:`atlast_sc.kernel`).
+
+        Instruments should override this method with a calculation that does
+        not use astropy Quantities; :meth:`system_temperature` then calls it.
+        By default, the values are converted to Quantities and
+        :meth:`system_temperature` is used.
+
+        :return: system temperature in Kelvin
+        :rtype: float or numpy.ndarray
+        """
+        system_temp = self.system_temperature((obs_freq * u.Hz).to(u.GHz), bandwidth * u.Hz,
+                                              eta_eff, T_amb * u.K, T_sky * u.K,
+                                              transmittance, n_pol)
+        return system_temp.to_value(u.K)
+
+
+
+class HeterodyneInstrument(Instrument):
+    """
+    Base class of the heterodyne instruments, whose system temperature is
+    calculated from their receiver temperature (see [doc])::
+
+        T_sys = s / (eta_eff * transmittance) *
+                (T_rx + eta_eff * T_sky + (1 - eta_eff) * T_amb)
+
+    where s is the :attr:`sideband_factor` of the instrument and T_amb is
+    converted to a Rayleigh-Jeans temperature.
+
+    The receiver temperature is interpolated in the
+    ``receiver_temperature_curve`` of the instrument YAML file if it has
+    one, and otherwise calculated from its ``receiver_temperature`` values
+    by :meth:`receiver_temperature_values`. By default, each observing
+    frequency range is assigned the value with the same index (or the last
+    value if there are fewer values than ranges). Frequencies outside all
+    the ranges, e.g. the edges of a broad band in the finetune calculation,
+    use the nearest range, for scalars and arrays alike.
+    """
+    def __init__(self, data):
+        super().__init__(data)
+        self._T_rx = None
+
+    ##################################
+    # Instrument specific parameters #
+    ##################################
+
+    @property
+    def T_rx(self):
+        return self._T_rx
+
+    @T_rx.setter
+    def T_rx(self, value):
+        self._T_rx = value
+
+    @property
+    def T_sys(self):
+        return self._T_sys
+
+    @T_sys.setter
+    def T_sys(self, value):
+        self._T_sys = value
+
+    @property
+    def sideband_factor(self):
+        """
+        Factor applied to the system temperature for the rejected sideband.
+        1 for single sideband receivers
+        """
+        return 1
+
+    ################################################
+    # Additional instrument specific methods below #
+    ################################################
+
+    def system_temperature_kernel(self, obs_freq, bandwidth, eta_eff,
+                                  T_amb, T_sky, transmittance, n_pol):
+        """
+        Returns system temperature, following calculation in [doc],
+        working on plain values: obs_freq and bandwidth in Hz, temperatures
+        in Kelvin. Nothing is recorded on the instrument.
+        :meth:`system_temperature` converts Quantities to these values.
+
+        :return: system temperature in Kelvin
+        :rtype: float or numpy.ndarray
+        """
+        T_rx = self.receiver_temperature_kernel(obs_freq)
+        system_temp = self.sideband_factor / (eta_eff * transmittance) * \
+            (T_rx
+            + (eta_eff * T_sky)
+            + ((1 - eta_eff) * kernel.noise_temperature(T_amb, obs_freq))
+            )
+        return system_temp
+
+    def calculate_system_temperature(self, obs_freq, bandwidth, eta_eff,
+                                     T_amb, T_sky, transmittance, n_pol):
+        """
+        Returns system temperature, following calculation in [doc], and
+        records it and the receiver temperature on the instrument
+
+        :return: system temperature in Kelvin
+        :rtype: astropy.units.Quantity
+        """
+        self.T_rx = self.receiver_temperature(obs_freq)
+        system_temp = self.system_temperature(obs_freq, bandwidth, eta_eff,
+                                              T_amb, T_sky, transmittance, n_pol)
+        self.T_sys = system_temp
+        return system_temp
+
+    def calculate_receiver_temp(self, obs_freq):
+        """
+        Returns receiver temperature, following calculation in [doc], and
+        records it on the instrument
+
+        :return: receiver temperature in Kelvin
+        :rtype: astropy.units.Quantity
+        """
+        temp = self.receiver_temperature(obs_freq)
+        self.T_rx = temp
+        return temp
+
+    def receiver_temperature(self, obs_freq):
+        """
+        Returns receiver temperature, following calculation in [doc].
+        Nothing is recorded on the instrument.
+
+        :return: receiver temperature in Kelvin
+        :rtype: astropy.units.Quantity
+        """
+        return self.receiver_temperature_kernel(_to_value(obs_freq, u.Hz)) * u.K
+
+    def receiver_temperature_kernel(self, obs_freq):
+        """
+        Float kernel of :meth:`receiver_temperature`, with obs_freq in Hz.
+
+        :return: receiver temperature in Kelvin
+        :rtype: float or numpy.ndarray
+        """
+        if self.receiver_temperature_curve is not None:
+            return self.receiver_temperature_curve(obs_freq / 1e9)
+        return self.receiver_temperature_values(obs_freq / 1e9)
+
+    def receiver_temperature_values(self, obs_freq):
+        """
+        Returns the receiver temperature (K) for observing frequencies in
+        GHz, from the ``receiver_temperature`` values of the instrument: the
+        value of the range containing each frequency, or of the nearest
+        range.
+
+        :param obs_freq: observing frequency in GHz, scalar or array
+        :type obs_freq: float or numpy.ndarray
+        :return: receiver temperature in Kelvin
+        :rtype: float or numpy.ndarray
+        """
+        # Extract instrument receiver temperature options
+        temp_options = np.array(self.receiver_temp_options_and_unit['values'], dtype=float)
+        # Instrument observing frequency ranges (GHz)
+        freq_ranges = self.obs_freq_ranges
+
+        # Each range is assigned the temperature option with the same index,
+        # or the last option if there are fewer options than ranges
+        temp_index = np.minimum(np.arange(len(freq_ranges)), len(temp_options) - 1)
+
+        # Find the first range containing each observing frequency, or the
+        # nearest range
+        obs_freq = np.asarray(obs_freq, dtype=float)
+        distance = np.maximum(freq_ranges[:, 0] - obs_freq[..., np.newaxis], 0) + \
+            np.maximum(obs_freq[..., np.newaxis] - freq_ranges[:, 1], 0)
+        temp = temp_options[temp_index[np.argmin(distance, axis=-1)]]
+
+        return float(temp) if temp.ndim == 0 else temp
+
+class InstrumentRangeIndex:
+    """
+    Index of the observing frequency and bandwidth ranges of a set of
+    instruments, used to find the instruments applicable to one or many
+    (observing frequency, bandwidth) combinations at once.
+
+    :param instruments: dictionary of instrument names and instruments
+    :type instruments: dict[str, Instrument]
+    """
+    # Instrument used when no other instrument is applicable
+    DEFAULT_INSTRUMENT = 'Default'
+
+    def __init__(self, instruments):
+        # Instruments are kept in alphabetical order, which determines the
+        # choice when more than one instrument is applicable
+        self._names = np.array(sorted(instruments), dtype=object)
+        obs_freq_ranges = [instruments[name].obs_freq_ranges for name in self._names]
+        bandwidth_ranges = [instruments[name].bandwidth_ranges for name in self._names]
+
+        # Flattened intervals, and the instrument each interval belongs to
+        self._obs_freq_intervals, self._obs_freq_members = \
+            InstrumentRangeIndex._flatten(obs_freq_ranges)
+        self._bandwidth_intervals, self._bandwidth_members = \
+            InstrumentRangeIndex._flatten(bandwidth_ranges)
+
+    @property
+    def names(self):
+        """
+        Names of the indexed instruments, in alphabetical order
+        """
+        return tuple(self._names)
+
+    def obs_freq_applicable(self, obs_freq):
+        """
+        Determines which instruments cover the given observing frequencies.
+
+        :param obs_freq: observing frequency, scalar or array
+        :type obs_freq: astropy.units.Quantity
+        :return: boolean array of shape obs_freq.shape + (number of
+            instruments,), in the order of `names`
+        :rtype: numpy.ndarray
+        """
+        return self._in_intervals(obs_freq.to_value(u.GHz), self._obs_freq_intervals,
+                                  self._obs_freq_members)
+
+    def bandwidth_applicable(self, bandwidth):
+        """
+        Determines which instruments cover the given bandwidths.
+
+        :param bandwidth: bandwidth, scalar or array
+        :type bandwidth: astropy.units.Quantity
+        :return: boolean array of shape bandwidth.shape + (number of
+            instruments,), in the order of `names`
+        :rtype: numpy.ndarray
+        """
+        return self._in_intervals(bandwidth.to_value(u.Hz), self._bandwidth_intervals,
+                                  self._bandwidth_members)
+
+    def applicable(self, obs_freq, bandwidth):
+        """
+        Determines which instruments cover both the given observing
+        frequencies and bandwidths. The inputs are broadcast together.
+
+        :param obs_freq: observing frequency, scalar or array
+        :type obs_freq: astropy.units.Quantity
+        :param bandwidth: bandwidth, scalar or array
+        :type bandwidth: astropy.units.Quantity
+        :return: boolean array of shape (broadcast shape + (number of
+            instruments,)), in the order of `names`
+        :rtype: numpy.ndarray
+        """
+        return self.obs_freq_applicable(obs_freq) & self.bandwidth_applicable(bandwidth)
+
+    def is_applicable(self, name, obs_freq, bandwidth):
+        """
+        Determines whether an instrument covers the given observing frequency
+        and bandwidth.
+
+        :return: applicability of the instrument
+        :rtype: bool or numpy.ndarray
+        """
+        column = self.names.index(name)
+        return self.applicable(obs_freq, bandwidth)[..., column]
+
+    def select(self, obs_freq, bandwidth):
+        """
+        Chooses the instrument used for the given observing frequencies and
+        bandwidths. If more than one instrument is applicable, the second in
+        alphabetical order is chosen; if none are, the default instrument is
+        used.
+
+        :param obs_freq: observing frequency, scalar or array
+        :type obs_freq: astropy.units.Quantity
+        :param bandwidth: bandwidth, scalar or array
+        :type bandwidth: astropy.units.Quantity
+        :return: name of the chosen instrument, or an array of names
+        :rtype: str or numpy.ndarray
+        """
+        applicable = self.applicable(obs_freq, bandwidth)
+        n_applicable = np.count_nonzero(applicable, axis=-1)
+        # TODO: there might be further logic incorporated to choose which
+        # instrument will be defaulted; currently we are choosing the second
+        # applicable instrument
+        target = np.where(n_applicable > 1, 2, 1)
+        chosen = np.argmax(np.cumsum(applicable, axis=-1) >= target[..., np.newaxis], axis=-1)
+        names = np.where(n_applicable > 0, self._names[chosen],
+                         InstrumentRangeIndex.DEFAULT_INSTRUMENT)
+
+        if names.ndim == 0:
+            return str(names)
+        return names
+
+    @staticmethod
+    def _flatten(ranges):
+        """
+        Concatenates the ranges of each instrument, returning the intervals
+        and a boolean matrix of shape (number of intervals, number of
+        instruments) marking the instrument each interval belongs to.
+        """
+        owners = np.concatenate([np.full(len(inst_ranges), i)
+                                 for i, inst_ranges in enumerate(ranges)]).astype(int)
+        intervals = np.concatenate(ranges).reshape(-1, 2)
+        members = np.zeros((len(owners), len(ranges)), dtype=bool)
+        members[np.arange(len(owners)), owners] = True
+        return intervals, members
+
+    @staticmethod
+    def _in_intervals(values, intervals, members):
+        """
+        Determines, for each value, whether it falls in any of each
+        instrument's (closed) intervals.
+        """
+        values = np.asarray(values, dtype=float)[..., np.newaxis]
+        in_interval = (values >= intervals[:, 0]) & (values <= intervals[:, 1])
+        # A boolean matrix product is True where any interval of the
+        # instrument contains the value
+        return in_interval @ members
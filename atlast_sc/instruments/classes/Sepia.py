@@ -1,88 +1,43 @@
-import re
-import astropy.units as u
-from atlast_sc.instrument import Instrument
-from atlast_sc.derived_groups import noise_temperature
+import numpy as np
+from atlast_sc.instrument import HeterodyneInstrument
 
 """
 SEPIA instrument parameters
 """        
-class Sepia(Instrument):
-    def __init__(self, data):
-        super().__init__(data)
-        self._T_rx = None
-
-    ##################################
-    # Instrument specific parameters #
-    ##################################
-        
-    @property 
-    def T_rx(self):
-        return self._T_rx
-    
-    @T_rx.setter
-    def T_rx(self, value):
-        self._T_rx = value
-
-    @property 
-    def T_sys(self):
-        return self._T_sys
-    
-    @T_sys.setter
-    def T_sys(self, value):
-        self._T_sys = value
+class Sepia(HeterodyneInstrument):
+    """
+    SEPIA heterodyne instrument (see
+    :class:`atlast_sc.instrument.HeterodyneInstrument`), whose receiver
+    temperature is constant over the first observing frequency range and
+    rises linearly over the second.
+    """
 
     ################################################
     # Additional instrument specific methods below #
     ################################################
 
-    def calculate_system_temperature(self, obs_freq, bandwidth, eta_eff, 
-                                     T_amb, T_sky, transmittance, n_pol):
-        """
-        Returns system temperature, following calculation in [doc]
-
-        :return: system temperature in Kelvin
-        :rtype: astropy.units.Quantity
+    def receiver_temperature_values(self, obs_freq):
         """
-        self.T_rx = self.calculate_receiver_temp(obs_freq)
-        system_temp = 1 / (eta_eff * transmittance) * \
-            (self.T_rx
-            + (eta_eff * T_sky)
-            + ((1 - eta_eff) * noise_temperature(T_amb, obs_freq))
-            )
-        self.T_sys = system_temp
-        return system_temp
-
-    def calculate_receiver_temp(self, obs_freq):
-        """
-        Returns receiver temperature, following calculation in [doc]
-
-        :return: receiver temperature in Kelvin
-        :rtype: astropy.units.Quantity
+        Returns the receiver temperature (K) for observing frequencies in GHz.
         """
         # Extract instrument receiver temperature options
         temp_options = self.receiver_temp_options_and_unit['values']
         temp_options = [float(temp) for temp in temp_options]
-        # Extract instrument observing frequency ranges
-        freq_options = self.obs_freq_ranges_and_unit['ranges']
-        freq_ranges = []
-        for freq_range in freq_options:
-            range = re.findall(r"[\d.]+", freq_range)
-            range = [float(val) for val in range] # convert to float ranges
-            freq_ranges.append(range) 
+        # Instrument observing frequency ranges (GHz)
+        freq_ranges = self.obs_freq_ranges
 
-        obs_freq = obs_freq.value
         t_rx_low = temp_options[0] # low receiver temp specified in the YAML
         t_rx_high = temp_options[1] # high receiver temp specified in the YAML
         freq_high_min = freq_ranges[1][0] # min freq of second obs_freq range
         freq_high_max = freq_ranges[1][1] # max freq of second obs_freq range
 
-        temp = None
-        # If the observing frequency is in the first range 
-        if obs_freq >= freq_ranges[0][0] and obs_freq <= freq_ranges[0][1]:
-            temp = t_rx_low * u.K
-        # If the observing frequency is in the second range
-        elif obs_freq > freq_ranges[1][0] and obs_freq <= freq_ranges[1][1]:
-            temp = ( t_rx_low + (t_rx_high - t_rx_low) * (obs_freq - freq_high_min) \
-            / (freq_high_max - freq_high_min) ) * u.K
-        self.T_rx = temp
-        return temp
\ No newline at end of file
+        # The first range has a constant temperature, and the temperature
+        # rises linearly over the second range. Frequencies outside the
+        # ranges (e.g. the edges of a broad band in the finetune calculation)
+        # use the temperature at the nearest range edge.
+        obs_freq = np.asarray(obs_freq, dtype=float)
+        temp = np.where(obs_freq <= freq_ranges[0][1], t_rx_low,
+                        np.interp(obs_freq, [freq_high_min, freq_high_max],
+                                  [t_rx_low, t_rx_high]))
+
+        return float(temp) if temp.ndim == 0 else temp
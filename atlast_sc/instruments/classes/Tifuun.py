@@ -1,8 +1,7 @@
 from numpy import expm1, sqrt
 import astropy.units as u
-from astropy import constants
 from atlast_sc.instrument import Instrument
-from atlast_sc.derived_groups import noise_temperature
+from atlast_sc import kernel
 
 """
 TIFUUN instrument parameters
@@ -49,17 +48,23 @@ class Tifuun(Instrument):
         quantity = u.Quantity(value=value, unit=unit)
         return quantity
 
-    def calculate_system_temperature(self, obs_freq, bandwidth, eta_eff, 
-                                     T_amb, T_sky, transmittance, n_pol):
+    def system_temperature_kernel(self, obs_freq, bandwidth, eta_eff,
+                                  T_amb, T_sky, transmittance, n_pol):
         """
-        Returns system temperature, following calculation in [doc]
+        Returns system temperature, following calculation in [doc],
+        working on plain values: obs_freq and bandwidth in Hz, temperatures
+        in Kelvin. Nothing is recorded on the instrument.
+        :meth:`system_temperature` converts Quantities to these values.
 
         :return: system temperature in Kelvin
-        :rtype: astropy.units.Quantity
+        :rtype: float or numpy.ndarray
         """
+        T_co = self.T_co.to_value(u.K)
+        delta_g = self.delta_g.to_value(u.J)
+
         # calculate power spectral density
-        psdkid = constants.k_B * (self.eta_chip * (1 - self.eta_co) * noise_temperature(self.T_co, obs_freq) +
-                self.eta_chip * self.eta_co * (1 - eta_eff) * noise_temperature(T_amb, obs_freq) +
+        psdkid = kernel.K_B * (self.eta_chip * (1 - self.eta_co) * kernel.noise_temperature(T_co, obs_freq) +
+                self.eta_chip * self.eta_co * (1 - eta_eff) * kernel.noise_temperature(T_amb, obs_freq) +
                 self.eta_chip * self.eta_co * eta_eff * T_sky
                 )
 
@@ -67,13 +72,26 @@ class Tifuun(Instrument):
         pkid = (psdkid * n_pol * bandwidth) # assuming small bandwidth
 
         # calculate noise equivalent power
-        nep = (sqrt(2 * pkid * constants.h * obs_freq +
+        nep = (sqrt(2 * pkid * kernel.H * obs_freq +
                     2 * pkid**2 / (n_pol * bandwidth) +
-                    4 * self.delta_g * pkid / self.eta_pb))
+                    4 * delta_g * pkid / self.eta_pb))
 
-        system_temp = (nep / (constants.k_B * eta_eff * transmittance * \
-               self.eta_chip * self.eta_co * \
-               sqrt(2 * n_pol * bandwidth))).to(u.K)
-        
+        system_temp = nep / (kernel.K_B * eta_eff * transmittance *
+               self.eta_chip * self.eta_co *
+               sqrt(2 * n_pol * bandwidth))
+
+        return system_temp
+
+    def calculate_system_temperature(self, obs_freq, bandwidth, eta_eff, 
+                                     T_amb, T_sky, transmittance, n_pol):
+        """
+        Returns system temperature, following calculation in [doc], and
+        records it on the instrument
+
+        :return: system temperature in Kelvin
+        :rtype: astropy.units.Quantity
+        """
+        system_temp = self.system_temperature(obs_freq, bandwidth, eta_eff,
+                                              T_amb, T_sky, transmittance, n_pol)
         self.T_sys = system_temp
         return system_temp
\ No newline at end of file
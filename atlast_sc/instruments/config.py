@@ -1,16 +1,245 @@
-import importlib, inspect, os
+import copyreg
+import importlib
+import inspect
+import os
+import threading
+from dataclasses import dataclass
+from types import MappingProxyType, SimpleNamespace
 from atlast_sc.utils import FileHelper
-from atlast_sc.instrument import Instrument
+from atlast_sc.instrument import Instrument, InstrumentRangeIndex
+
+
+@dataclass(frozen=True)
+class InstrumentDefinition:
+    """
+    Immutable definition of an instrument: its class, the data parsed
+    from its YAML file and the instrument populated from that data. Shared
+    by every calculator in the process; use :meth:`copy_instrument` or
+    :meth:`create_instrument` to get an instrument object that can be
+    modified.
+    """
+    name: str
+    instrument_class: type
+    data: MappingProxyType
+    # Instrument populated from the read-only data. Its parsed ranges,
+    # receiver temperature curve and channels are shared by the copies
+    instrument: Instrument
+
+    def copy_data(self):
+        """
+        Returns a modifiable copy of the instrument data.
+
+        :return: the instrument data, with nested dictionaries and lists
+        :rtype: dict
+        """
+        return _thaw(self.data)
+
+    def copy_instrument(self):
+        """
+        Creates a new instrument object sharing the parsed, read-only values
+        of :attr:`instrument` (see :meth:`Instrument.copy`), so that the
+        instrument data is not parsed and validated again.
+
+        :return: instance of instrument class
+        :rtype: atlast_sc.parameters.Instrument.[module_name]
+        """
+        return self.instrument.copy()
+
+    def create_instrument(self):
+        """
+        Creates a new instrument object populated with a modifiable copy of
+        the instrument data, parsing and validating it again.
+
+        :return: populated instance of instrument class
+        :rtype: atlast_sc.parameters.Instrument.[module_name]
+        """
+        data = SimpleNamespace(**self.copy_data())
+        return self.instrument_class(data=data)
+
+
+def _freeze(value):
+    """
+    Returns a read-only copy of data read from a YAML file: dictionaries
+    become read-only mappings and lists become tuples, at every level.
+    """
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _read_only(mapping):
+    """
+    Returns a read-only mapping of the dictionary, used to copy and pickle
+    the data frozen by :func:`_freeze`.
+    """
+    return MappingProxyType(mapping)
+
+
+# Read-only mappings are copied (e.g., with the calculators that hold them)
+# and pickled (e.g., to hash the instrument parameters) as dictionaries
+copyreg.pickle(MappingProxyType, lambda mapping: (_read_only, (dict(mapping),)))
+
+
+def _thaw(value):
+    """
+    Returns a modifiable copy of data frozen by :func:`_freeze`.
+    """
+    if isinstance(value, MappingProxyType):
+        return {key: _thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(item) for item in value]
+    return value
+
+
+class InstrumentRegistry:
+    """
+    Process-wide registry of the available instruments.
+
+    The instrument modules are imported, their YAML files parsed and the
+    instruments populated the first time the registry is used. Each
+    ParameterSetup then gets its own copies of the shared instruments (see
+    :meth:`InstrumentDefinition.copy_instrument`), without re-reading or
+    re-validating any data, and shares the index of their ranges.
+
+    Use :meth:`refresh` to re-import the instrument modules and re-read the
+    YAML files (e.g., while developing a new instrument), or
+    :meth:`invalidate` to drop the definitions so that they are loaded again
+    on next use.
+    """
+
+    _lock = threading.Lock()
+    # Definitions and range index of the loaded instruments, replaced
+    # together
+    _loaded = None
+    # Number of times the instrument files have been loaded in this process
+    _load_count = 0
+
+    @classmethod
+    def get(cls):
+        """
+        Return the instrument definitions, loading them on first use.
+
+        :return: read-only dictionary of instrument names and definitions
+        :rtype: mappingproxy[str, InstrumentDefinition]
+        """
+        return cls._get_loaded()[0]
+
+    @classmethod
+    def range_index(cls):
+        """
+        Return the index of the observing frequency and bandwidth ranges of
+        the instruments, loading them on first use.
+
+        :return: range index of the instruments
+        :rtype: atlast_sc.instrument.InstrumentRangeIndex
+        """
+        return cls._get_loaded()[1]
+
+    @classmethod
+    def create_instruments(cls):
+        """
+        Creates a new instrument object for each available instrument, as a
+        copy of the shared instrument (see
+        :meth:`InstrumentDefinition.copy_instrument`).
+
+        :return: dictionary of instrument names and instrument objects
+        :rtype: dict
+        """
+        return {name: definition.copy_instrument()
+                for name, definition in cls.get().items()}
+
+    @classmethod
+    def refresh(cls):
+        """
+        Re-import the instrument modules, re-read the YAML files and replace
+        the shared definitions. Calculators created before the refresh keep
+        their instruments.
+
+        :return: the newly loaded instrument definitions
+        :rtype: mappingproxy[str, InstrumentDefinition]
+        """
+        with cls._lock:
+            cls._loaded = cls._load(reload_modules=True)
+            return cls._loaded[0]
+
+    @classmethod
+    def invalidate(cls):
+        """
+        Drop the instrument definitions. They will be loaded on next use.
+        """
+        with cls._lock:
+            cls._loaded = None
+
+    @classmethod
+    def load_count(cls):
+        """
+        The number of times the instrument files have been loaded in this
+        process.
+
+        :return: number of loads
+        :rtype: int
+        """
+        return cls._load_count
+
+    @classmethod
+    def _get_loaded(cls):
+        """
+        Return the definitions and range index, loading them on first use.
+        """
+        loaded = cls._loaded
+        if loaded is None:
+            with cls._lock:
+                # Another thread may have loaded the definitions while this
+                # one was waiting for the lock
+                if cls._loaded is None:
+                    cls._loaded = cls._load()
+                loaded = cls._loaded
+
+        return loaded
+
+    @classmethod
+    def _load(cls, reload_modules=False):
+        """
+        Load the instrument definitions and index their ranges. Must be
+        called with the lock held.
+        """
+        definitions = {}
+        for details in InstrumentConfig.available_instruments():
+            definition = InstrumentConfig.load_instrument_definition(
+                InstrumentConfig.PATH, InstrumentConfig.PYTHON_PACKAGE_DIR,
+                details, reload_modules)
+            definitions[definition.name] = definition
+
+        cls._load_count += 1
+        range_index = InstrumentRangeIndex({name: definition.instrument
+                                            for name, definition in definitions.items()})
+
+        return MappingProxyType(definitions), range_index
+
 
 class InstrumentConfig:
     """
     Class for loading available instrument files for calculator to use.
     """
+    PATH = 'instruments'
+    PYTHON_PACKAGE_DIR = 'classes'
+
     def __init__(self):
+        # The instrument files are only loaded once per process; each
+        # configuration gets its own instrument objects.
+        self._inst_classes = InstrumentRegistry.create_instruments()
 
-        path = 'instruments'
-        python_package_dir = 'classes'
+    @staticmethod
+    def available_instruments():
+        """
+        Details (module and YAML file names) of the instruments available to
+        the calculator.
 
+        :return: list of instrument details
+        :rtype: list[dict]
+        """
         default_instrument = {'class': 'Default.py', 'data': 'Default.yaml'}
         chai_instrument = {'class': 'Chai.py', 'data': 'Chai.yaml'}
         finer_instrument = {'class': 'Finer.py', 'data': 'Finer.yaml'}
@@ -18,7 +247,7 @@ class InstrumentConfig:
         sepia_instrument = {'class': 'Sepia.py', 'data': 'Sepia.yaml'}
         tifuun_instrument = {'class': 'Tifuun.py', 'data': 'Tifuun.yaml'}
         # TODO: Add your custom instrument here.
-        
+
         available_instruments = [
             default_instrument,
             chai_instrument,
@@ -29,15 +258,7 @@ class InstrumentConfig:
             # TODO: Add your custom instrument here.
         ]
 
-        self._inst_classes = {}
-
-        for details in available_instruments:
-            # Load the instrument class and populate it with its relevant details.
-            inst_name, inst_class = self.load_instrument_class(path, python_package_dir, details)
-
-            # Add instrument class to the instrument classes dictionary with the instrument
-            # name as the key.
-            self._inst_classes[inst_name] = inst_class
+        return available_instruments
 
     @property
     def instrument_classes(self):
@@ -58,10 +279,31 @@ class InstrumentConfig:
         :return: tuple of instrument class name and populated instance of instrument
         :rtype: String, atlast_sc.parameters.Instrument.[module_name]
         """
+        definition = self.load_instrument_definition(path, python_package_dir, details)
+
+        return definition.name, definition.create_instrument()
+
+    @staticmethod
+    def load_instrument_definition(path, python_package_dir, details, reload_module=False):
+        """
+        Loads the relative instrument class and the data from its YAML file.
+
+        :param path: path where instrument information live
+        :type path: String
+        :param python_package_dir: path where instrument python modules live
+        :type python_package_dir: String
+        :param details: details of instrument (eg. module name, YAML file name)
+        :type details: dict
+        :param reload_module: if True, re-import the instrument module
+        :type reload_module: bool
+
+        :return: definition of the instrument
+        :rtype: InstrumentDefinition
+        """
 
         module_name = os.path.splitext(details["class"])[0]
         module_dir = 'atlast_sc' + '.' + path + '.' + python_package_dir + '.' + module_name
-        
+
         # If this method is executed in the web client flow, we need to make
         # some changes to the path we supply to the method that will import
         # our instrument classes
@@ -69,16 +311,25 @@ class InstrumentConfig:
             path = 'atlast_sc' + '.' + path
 
         module = importlib.import_module(module_dir)
+        if reload_module:
+            module = importlib.reload(module)
 
         for name, cls in inspect.getmembers(module, inspect.isclass):
-            # This will return all classes belonging to the module. We are
-            # only interested in each child 'Instruments' class.
-            if inspect.isclass(cls) and issubclass(cls, Instrument) and cls.__name__ != 'Instrument':
-                inst_class_name = name 
-                inst_class = self.populate_instrument_class(cls, name)
-
-        return inst_class_name, inst_class
-    
+            # This will return all classes in the module namespace. We are
+            # only interested in the 'Instruments' class defined by the
+            # module, not the base classes it imports.
+            if issubclass(cls, Instrument) and cls.__module__ == module.__name__:
+                inst_class_name = name
+                inst_class = cls
+
+        inst_data = FileHelper.read_instrument_yaml_file(inst_class_name)
+        data = _freeze(vars(inst_data))
+        # Populating the instrument validates the instrument data
+        return InstrumentDefinition(name=inst_class_name,
+                                    instrument_class=inst_class,
+                                    data=data,
+                                    instrument=inst_class(data=SimpleNamespace(**data)))
+
     def populate_instrument_class(self, inst_class_instance, module_name):
         """
         (ASC-79)
@@ -96,4 +347,4 @@ class InstrumentConfig:
         inst_data = FileHelper.read_instrument_yaml_file(module_name)
         inst_class = inst_class_instance(data=inst_data)
 
-        return inst_class
\ No newline at end of file
+        return inst_class
@@ -0,0 +1,320 @@
+"""
+Float kernel of the sensitivity calculation.
+
+The functions in this module work on plain floats or numpy arrays in
+canonical units, avoiding the cost of astropy unit propagation and
+conversions:
+
+- frequencies and bandwidths in Hz
+- temperatures in K
+- lengths in m
+- elevations in degrees
+- times in s
+- flux densities in Jy
+
+Quantities are only handled at the boundary (see :mod:`atlast_sc.core`).
+The calculations follow the Quantity implementations in
+:mod:`atlast_sc.derived_groups` and the instrument modules, which remain the
+reference.
+"""
+import numpy as np
+import astropy.units as u
+from astropy import constants
+
+from atlast_sc.atmosphere import AtmosphereTables
+
+# Physical constants in SI units
+H = constants.h.si.value
+K_B = constants.k_B.si.value
+C = constants.c.si.value
+# One Jansky in W m^-2 Hz^-1
+JY = u.Jy.to(u.W / u.m ** 2 / u.Hz)
+
+# Maximum number of channels evaluated at once by effective_sefds
+MAX_CHANNELS = 2 ** 20
+
+# Units of the values used by the kernel
+CANONICAL_UNITS = {
+    't_int': u.s,
+    'sensitivity': u.Jy,
+    'bandwidth': u.Hz,
+    'obs_freq': u.Hz,
+    'elevation': u.deg,
+    'surface_rms': u.m,
+    'dish_radius': u.m,
+    'T_amb': u.K,
+    'T_cmb': u.K,
+}
+
+
+def to_canonical(name, value):
+    """
+    Converts a parameter value to the canonical units of the kernel.
+
+    :param name: name of the parameter
+    :type name: str
+    :param value: value of the parameter
+    :type value: astropy.units.Quantity or float
+    :return: value in canonical units
+    :rtype: float or numpy.ndarray
+    """
+    if isinstance(value, u.Quantity):
+        return value.to_value(CANONICAL_UNITS.get(name, u.dimensionless_unscaled))
+    return value
+
+
+def noise_temperature(temperature, frequency):
+    """
+    Converts a thermodynamic temperature (K) to a Rayleigh-Jeans brightness
+    temperature (K) at a frequency (Hz).
+    """
+    ratio = (H * frequency) / (K_B * temperature)
+    return temperature * (ratio / np.expm1(ratio))
+
+
+def sky_temperature(T_atm, transmittance, T_cmb, obs_freq):
+    """
+    Calculates the sky temperature (K) seen through the atmosphere.
+    """
+    return T_atm * (1 - transmittance) + transmittance * noise_temperature(T_cmb, obs_freq)
+
+
+def dish_efficiency(obs_freq, surface_rms, eta_ill, eta_spill, eta_block, eta_pol):
+    """
+    Calculates the dish efficiency using the Ruze formula.
+    """
+    wavelength = C / obs_freq
+    return eta_ill * eta_spill * eta_pol * eta_block * \
+        np.exp(-(4 * np.pi * surface_rms / wavelength) ** 2)
+
+
+def atmosphere(obs_freq, weather, elevation):
+    """
+    Interpolates the atmosphere tables.
+
+    :return: transmittance and atmospheric temperature (K)
+    :rtype: tuple
+    """
+    tables = AtmosphereTables.get()
+    points = _interpolation_points(obs_freq, weather)
+    tau_z = tables.interp_tau_atm(points).reshape(points.shape[:-1])
+    T_atm = tables.interp_T_atm(points).reshape(points.shape[:-1])
+    transmittance = np.exp(-tau_z / np.cos(np.deg2rad(90.0 - elevation)))
+
+    return _as_scalar_or_array(transmittance), _as_scalar_or_array(T_atm)
+
+
+def transmittance(obs_freq, weather, elevation):
+    """
+    Interpolates the atmospheric transmittance.
+    """
+    points = _interpolation_points(obs_freq, weather)
+    tau_z = AtmosphereTables.get().interp_tau_atm(points).reshape(points.shape[:-1])
+    return _as_scalar_or_array(np.exp(-tau_z / np.cos(np.deg2rad(90.0 - elevation))))
+
+
+def atmospheric_temperature(obs_freq, weather):
+    """
+    Interpolates the atmospheric temperature (K).
+    """
+    points = _interpolation_points(obs_freq, weather)
+    return _as_scalar_or_array(
+        AtmosphereTables.get().interp_T_atm(points).reshape(points.shape[:-1]))
+
+
+def sefd(T_sys, eta_a, dish_radius):
+    """
+    Calculates the source equivalent flux density (Jy).
+    """
+    return 2 * K_B * T_sys / (eta_a * np.pi * dish_radius ** 2) / JY
+
+
+def band_channels(obs_freq, bandwidth):
+    """
+    Splits bands into the narrow channels used by the finetune calculation:
+    the frequencies of the atmosphere tables within each band, padded with
+    the band edges, delimit the channels.
+
+    :param obs_freq: central frequencies of the bands (Hz)
+    :type obs_freq: numpy.ndarray
+    :param bandwidth: widths of the bands (Hz)
+    :type bandwidth: numpy.ndarray
+    :return: index of the first channel of each band, and the centres and
+        widths (Hz) of the channels of all the bands, band after band
+    :rtype: tuple(numpy.ndarray, numpy.ndarray, numpy.ndarray)
+    """
+    atm_freqs = AtmosphereTables.get().tau_atm_table[:, 0]
+
+    # Band edges and the indices of the table frequencies within them (GHz)
+    obs_freq_low = np.atleast_1d((obs_freq - 0.50 * bandwidth) / 1e9)
+    obs_freq_upp = np.atleast_1d((obs_freq + 0.50 * bandwidth) / 1e9)
+    first = np.searchsorted(atm_freqs, obs_freq_low, side='right')
+    last = np.searchsorted(atm_freqs, obs_freq_upp, side='left')
+    n_edges = np.maximum(last - first, 0) + 2
+
+    # The edges of all the bands in one array: the lower band edge, the
+    # table frequencies and the upper band edge of each band in turn
+    band = np.repeat(np.arange(len(n_edges)), n_edges)
+    band_start = np.cumsum(n_edges) - n_edges
+    position = np.arange(len(band)) - band_start[band]
+    edges = atm_freqs[np.clip(first[band] + position - 1, 0, len(atm_freqs) - 1)]
+    edges[band_start] = obs_freq_low
+    edges[band_start + n_edges - 1] = obs_freq_upp
+    edges *= 1e9
+
+    # Each edge but the last of a band starts a channel
+    lower = np.flatnonzero(position < n_edges[band] - 1)
+    widths = edges[lower + 1] - edges[lower]
+    centres = (edges[lower + 1] + edges[lower]) * 0.50
+
+    return band_start - np.arange(len(n_edges)), centres, widths
+
+
+def channel_system_temperatures(instrument, obs_freq, bandwidth, weather, elevation,
+                                T_cmb, T_amb, eta_eff, n_pol):
+    """
+    Calculates the system temperature (K) of the narrow channels making up
+    the band. See :func:`atlast_sc.core.channel_system_temperatures`.
+
+    :return: channel widths (Hz) and system temperatures (K)
+    :rtype: tuple(numpy.ndarray, numpy.ndarray)
+    """
+    _, obs_freq_list, obs_band_list = band_channels(obs_freq, bandwidth)
+
+    transmittance, T_atm = atmosphere(obs_freq_list, weather, elevation)
+    T_sky = sky_temperature(T_atm, transmittance, T_cmb, obs_freq_list)
+    T_sys = instrument.system_temperature_kernel(obs_freq_list, bandwidth, eta_eff, T_amb,
+                                                 T_sky, transmittance, n_pol)
+
+    return obs_band_list, T_sys
+
+
+def effective_sefds(instrument, obs_freq, bandwidth, weather, elevation, T_cmb, T_amb,
+                    eta_eff, n_pol, eta_a, dish_radius):
+    """
+    Calculates the effective SEFD (Jy) of many bands at once, integrating
+    the SEFD over the channels of each band (see :func:`effective_sefd`).
+    The channels of all the bands are evaluated together, in chunks of at
+    most `MAX_CHANNELS` channels to bound the memory used.
+
+    All the arguments but the instrument may be arrays, which are broadcast
+    together, and the result has the broadcast shape.
+
+    :return: effective SEFD (Jy)
+    :rtype: float or numpy.ndarray
+    """
+    args = np.broadcast_arrays(*(np.asarray(arg, dtype=float) for arg in (
+        obs_freq, bandwidth, weather, elevation, T_cmb, T_amb, eta_eff, n_pol, eta_a,
+        dish_radius)))
+    shape = args[0].shape
+    obs_freq, bandwidth, weather, elevation, T_cmb, T_amb, eta_eff, n_pol, eta_a, \
+        dish_radius = (arg.ravel() for arg in args)
+
+    # Number of channels of each band, to split the bands into chunks
+    atm_freqs = AtmosphereTables.get().tau_atm_table[:, 0]
+    n_channels = np.maximum(
+        np.searchsorted(atm_freqs, (obs_freq + 0.50 * bandwidth) / 1e9, side='left') -
+        np.searchsorted(atm_freqs, (obs_freq - 0.50 * bandwidth) / 1e9, side='right'), 0) + 1
+    ends = np.cumsum(n_channels)
+
+    result = np.empty(len(obs_freq))
+    start = 0
+    while start < len(obs_freq):
+        offset = ends[start] - n_channels[start]
+        stop = max(np.searchsorted(ends, offset + MAX_CHANNELS, side='right'), start + 1)
+        bands = slice(start, stop)
+        first, centres, widths = band_channels(obs_freq[bands], bandwidth[bands])
+
+        def spread(values):
+            # The value of each band for each of its channels
+            return np.repeat(values[bands], n_channels[bands])
+
+        transmittance, T_atm = atmosphere(centres, spread(weather), spread(elevation))
+        T_sky = sky_temperature(T_atm, transmittance, spread(T_cmb), centres)
+        T_sys = instrument.system_temperature_kernel(centres, spread(bandwidth),
+                                                     spread(eta_eff), spread(T_amb), T_sky,
+                                                     transmittance, spread(n_pol))
+        _sefd = sefd(T_sys, spread(eta_a), spread(dish_radius))
+        result[bands] = np.sqrt(bandwidth[bands] /
+                                np.add.reduceat(widths / _sefd ** 2, first))
+        start = stop
+
+    return _as_scalar_or_array(result.reshape(shape))
+
+
+def effective_sefd(T_sys, channel_T_sys, eta_a, bandwidth, dish_radius):
+    """
+    Calculates the SEFD (Jy) at the central frequency or, if the system
+    temperatures of the channels making up the band are given, the effective
+    SEFD of the band.
+    """
+    if channel_T_sys is None:
+        return sefd(T_sys, eta_a, dish_radius)
+
+    obs_band_list, T_sys_list = channel_T_sys
+    _sefd = sefd(T_sys_list, eta_a, dish_radius)
+    return np.sqrt(bandwidth / np.sum(obs_band_list / _sefd ** 2))
+
+
+def sensitivity(sefd, eta_s, n_pol, bandwidth, t_int):
+    """
+    Calculates the sensitivity (Jy) reached in the integration time (s).
+    """
+    return sefd / (eta_s * np.sqrt(n_pol * bandwidth * t_int))
+
+
+def t_integration(sefd, eta_s, n_pol, bandwidth, sensitivity):
+    """
+    Calculates the integration time (s) needed to reach the sensitivity (Jy).
+    """
+    return (sefd / (sensitivity * eta_s)) ** 2 / (n_pol * bandwidth)
+
+
+def derive(instrument, obs_freq, bandwidth, n_pol, weather, elevation, surface_rms,
+           dish_radius, T_amb, T_cmb, eta_eff, eta_ill, eta_spill, eta_block, eta_pol,
+           eta_s, finetune=False):
+    """
+    Calculates the derived parameters, in canonical units, using the float
+    kernel of the instrument.
+
+    :return: dictionary of derived parameter names and values
+    :rtype: dict
+    """
+    eta_a = dish_efficiency(obs_freq, surface_rms, eta_ill, eta_spill, eta_block, eta_pol)
+    transmittance, T_atm = atmosphere(obs_freq, weather, elevation)
+    T_sky = sky_temperature(T_atm, transmittance, T_cmb, obs_freq)
+    T_sys = instrument.system_temperature_kernel(obs_freq, bandwidth, eta_eff, T_amb,
+                                                 T_sky, transmittance, n_pol)
+
+    if finetune:
+        _sefd = effective_sefds(instrument, obs_freq, bandwidth, weather, elevation, T_cmb,
+                                T_amb, eta_eff, n_pol, eta_a, dish_radius)
+    else:
+        _sefd = sefd(T_sys, eta_a, dish_radius)
+
+    return {
+        'transmittance': transmittance,
+        'T_atm': T_atm,
+        'eta_a': eta_a,
+        'eta_s': eta_s,
+        'T_sky': T_sky,
+        'T_sys': T_sys,
+        'sefd': _sefd,
+    }
+
+
+def _interpolation_points(obs_freq, weather):
+    """
+    Return the (frequency in GHz, weather) points at which to interpolate
+    the atmosphere tables.
+    """
+    obs_freq, weather = np.broadcast_arrays(np.asarray(obs_freq, dtype=float) / 1e9,
+                                            np.asarray(weather, dtype=float))
+    return np.stack((obs_freq, weather), axis=-1)
+
+
+def _as_scalar_or_array(values):
+    """
+    Return a float for a single value, or the array otherwise.
+    """
+    return float(values) if np.ndim(values) == 0 else values
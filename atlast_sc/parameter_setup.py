@@ -1,19 +1,18 @@
-import copy, re
+import copy
+from contextlib import contextmanager
 from atlast_sc.models import UserInput
 from atlast_sc.models import CalculationInput
 from atlast_sc.models import CalculationResult
 from atlast_sc.models import TelescopeAndEnvironment
 
-from atlast_sc.instruments.config import InstrumentConfig
+from atlast_sc.instruments.config import InstrumentConfig, InstrumentRegistry
+from atlast_sc.utils import Decorators
 
-from atlast_sc.derived_groups import AtmosphereParams
-from atlast_sc.derived_groups import Temperatures
 from atlast_sc.derived_groups import Efficiencies
 from atlast_sc.models import DerivedParams
-
-import astropy.units as u
-from astropy.constants import k_B
-import numpy as np
+from atlast_sc.dependency_graph import DependencyGraph
+from atlast_sc.cache import DerivedParamsCache
+from atlast_sc import core
 
 class ParameterSetup:
     """
@@ -54,20 +53,22 @@ class ParameterSetup:
         # Get loaded instrument classes
         self._loaded_instruments = inst_config.instrument_classes
         self._chosen_inst = None
+        # Names of the parameters changed during a batch update
+        self._pending_updates = None
 
-        # Create dictionaries of each instrument and their observing frequency
-        # and bandwidth ranges.
-        self.instrument_obs_freqs = {} # Instrument specific observing frequency ranges
-        self.instrument_bandw_vals = {} # Instrument specific bandwidth value ranges
-        for inst_name, inst_module in self.loaded_instruments.items():
-            self.instrument_obs_freqs[inst_name] = inst_module.obs_freq_ranges_and_unit
-            self.instrument_bandw_vals[inst_name] = inst_module.bandwidth_ranges_and_unit
+        # Index of the numeric observing frequency and bandwidth ranges of
+        # each instrument, used for the instrument selection and shared by
+        # all the parameter setups
+        self._instrument_range_index = InstrumentRegistry.range_index()
 
+        # Graph of the derived groups, so that only the groups affected by an
+        # input change are recalculated
+        self._dependency_graph = self._build_dependency_graph()
         self._derived_parameters_model = self._calculate_derived_parameters()
         
         # Make a deep copy of the calculation inputs to enable the
         # calculator to be reset to its initial setup
-        self._original_inputs = copy.deepcopy(self._calculation_inputs)
+        self.save_original_inputs()
 
 
     @property
@@ -77,6 +78,22 @@ class ParameterSetup:
         """
         return self._loaded_instruments
 
+    @property
+    def instrument_range_index(self):
+        """
+        Index of the observing frequency and bandwidth ranges of the loaded
+        instruments
+        """
+        return self._instrument_range_index
+
+    @property
+    def dependency_graph(self):
+        """
+        Graph of the derived parameter calculations, which records the
+        derived groups recalculated by each update
+        """
+        return self._dependency_graph
+
     @property
     def calculation_inputs(self):
         """
@@ -133,6 +150,57 @@ class ParameterSetup:
         """
         self._chosen_inst = instrument
 
+    def clone(self, save_original_inputs=True):
+        """
+        Creates a copy of the parameter setup without validating the inputs,
+        loading the instruments or recalculating the derived parameters
+        again. The copy has its own calculation inputs and instrument objects
+        (see :meth:`atlast_sc.instrument.Instrument.copy`), so that changing
+        them does not change this setup, and shares the instrument range
+        index and the read-only instrument values. The calculation results
+        are not copied.
+
+        The original inputs of the copy, used by :meth:`reset`, are the
+        current inputs of this setup; call :meth:`save_original_inputs` to
+        replace them after changing the copy.
+
+        :param save_original_inputs: if False, the original inputs of the
+            copy are not saved, and :meth:`save_original_inputs` must be
+            called before resetting it. Optional. Defaults to True
+        :type save_original_inputs: bool
+        :return: copy of the parameter setup
+        :rtype: ParameterSetup
+        """
+        setup = ParameterSetup.__new__(ParameterSetup)
+        setup.finetune = self.finetune
+        setup._calculation_inputs = self._calculation_inputs.model_copy(deep=True)
+        setup._calculation_results = CalculationResult()
+
+        setup._loaded_instruments = {name: instrument.copy()
+                                     for name, instrument in self._loaded_instruments.items()}
+        setup._chosen_inst = None if self._chosen_inst is None \
+            else setup._loaded_instruments[self._chosen_inst.name]
+        setup._pending_updates = None
+        setup._instrument_range_index = self._instrument_range_index
+
+        # The derived groups already calculated by this setup hold for the
+        # copy, which has the same inputs and equal instruments
+        setup._dependency_graph = setup._build_dependency_graph()
+        setup._dependency_graph.copy_values(self._dependency_graph,
+                                            instrument=setup._chosen_inst)
+        setup._derived_parameters_model = self._derived_parameters_model.model_copy()
+        setup._original_inputs = setup._calculation_inputs.model_copy(deep=True) \
+            if save_original_inputs else None
+
+        return setup
+
+    def save_original_inputs(self):
+        """
+        Saves a copy of the current calculation inputs, restored by
+        :meth:`reset`.
+        """
+        self._original_inputs = copy.deepcopy(self._calculation_inputs)
+
     def reset(self):
         """
         Resets the calculator configuration parameters (user input and
@@ -141,6 +209,41 @@ class ParameterSetup:
         self._calculation_inputs = \
             self._original_inputs
         
+    @contextmanager
+    def batch_update(self):
+        """
+        Context manager that defers the instrument selection and the
+        recalculation of the derived parameters until all the parameters
+        updated inside the context have been set. If an exception is raised,
+        inside the context or by the recalculation, the calculation inputs
+        and chosen instrument are restored to their values before the batch
+        update.
+        """
+        if self._pending_updates is not None:
+            # Nested batch update: the outermost batch update recalculates
+            yield
+            return
+
+        original_inputs = copy.deepcopy(self._calculation_inputs)
+        original_instrument = self.chosen_instrument
+        self._pending_updates = set()
+        try:
+            try:
+                yield
+            finally:
+                pending_updates = self._pending_updates
+                self._pending_updates = None
+
+            if pending_updates:
+                Decorators.update_derived_params(self, pending_updates)
+        except BaseException:
+            self._calculation_inputs = original_inputs
+            self.chosen_instrument = original_instrument
+            # A failed recalculation may have left some of the derived
+            # groups calculated from the new inputs
+            self._dependency_graph.invalidate()
+            raise
+
     @staticmethod
     def _check_input_param_names(user_input):
         """
@@ -170,167 +273,136 @@ class ParameterSetup:
         user_obs_freq = self.user_input.obs_freq.value
         user_bandwidth = self.user_input.bandwidth.value
         # See which instrument those values correspond to
-        chosen_inst_name = self.find_applicable_instruments(user_obs_freq, user_bandwidth,
-                                                            self.instrument_obs_freqs,
-                                                            self.instrument_bandw_vals)
+        chosen_inst_name = self.find_applicable_instruments(user_obs_freq, user_bandwidth)
         # Get the instrument module according to instrument name
         chosen_inst = self.loaded_instruments[chosen_inst_name]
         return chosen_inst
     
-    def compare_and_modify_bandwidth_units(self, bandwidth, instrument_bandw_vals):
-        """
-        (ASC-108)
-        Compares user inputted bandwidth unit with the instrument 
-        YAML file bandwidth units and converts each to Hz equivalent 
-        value for instrument selection.
-
-        :return: tuple of converted user input bandwidth value and 
-                converted dictionary of instrument bandwidth ranges 
-        :rtype: Quantity
-        """
-        # Convert user input bandwidth value to Hz
-        bandwidth = bandwidth.to(u.Hz)
-
-        for _, bandwidths_and_unit in instrument_bandw_vals.items():
-            bandwidth_ranges = bandwidths_and_unit['ranges']
-            yaml_unit = u.Unit(bandwidths_and_unit['unit'])
-
-            for range in bandwidth_ranges:
-                range_count = 0 # start a counter to find the range of the instrument
-                range = re.findall(r"[\d.e]+", range)
-
-                # Create Quantity object for min and max freq
-                min_freq = u.Quantity(float(range[0]), yaml_unit)
-                max_freq = u.Quantity(float(range[1]), yaml_unit)
-
-                # Convert min and max Quantity to Hz
-                min_freq_hz = min_freq.to(u.Hz)
-                max_freq_hz = max_freq.to(u.Hz)
-
-                # Replace bandwidths_and_unit dict with new Hz values to be 
-                # ready for comparison
-                bandwidths_and_unit['ranges'][range_count] = '(' + str(min_freq_hz.value) + \
-                                                            '-' + str(max_freq_hz.value) + ')'
-                range_count += 1
-
-            # Change unit to Hz in the bandwidths_and_unit dict here to avoid
-            #  unconversion of units where bandwidth ranges are non-existent
-            bandwidths_and_unit['unit'] = str(u.Hz)
-        return bandwidth, instrument_bandw_vals 
-
-    def find_applicable_instruments(self, obs_freq, bandwidth, 
-                                    instrument_obs_freqs, instrument_bandw_vals):
+    def find_applicable_instruments(self, obs_freq, bandwidth):
         """
         Finds what instrument/s the observing frequency and bandwidth values
         inputted by the user correspond to and choose one to do the further
-        calculations. 
-
-        :return: applicable/chosen instrument name
-        :rtype: String
-        """
-        applicable_obs_freq_instruments = []
-        applicable_bandw_instruments = []
-
-        # Compare units of user inputs and instrument YAML file
-        bandwidth, instrument_bandw_vals = \
-                self.compare_and_modify_bandwidth_units(bandwidth, instrument_bandw_vals)
-
-        # Get float value of each parameter to be able to make comparison
-        obs_freq = float(obs_freq.value)
-        bandwidth = float(bandwidth.value)
-
-        # Check what instrument/s the observing frequency value falls in
-        for instrument, obs_freqs in instrument_obs_freqs.items():
-            obs_freq_ranges = obs_freqs['ranges']
-            for range in obs_freq_ranges:
-                range = re.findall(r"[\d.]+", range)
-                min_freq = float(range[0])
-                max_freq = float(range[1])
-                if obs_freq >= min_freq and obs_freq <= max_freq:
-                    applicable_obs_freq_instruments.append(instrument)
-
-        # Check what instrument/s the bandwidth value falls in
-        for instrument, bandw_vals in instrument_bandw_vals.items():
-            bandw_val_ranges = bandw_vals['ranges']
-            for range in bandw_val_ranges:
-                range = re.findall(r"[\d.]+", range)
-                min_bandw = float(range[0])
-                max_bandw = float(range[1])
-                if bandwidth >= min_bandw and bandwidth <= max_bandw:
-                    applicable_bandw_instruments.append(instrument)
-
-        # Create a set of both applicable instruments lists and take the intersection
-        applicable_instruments = list(set(applicable_obs_freq_instruments) & \
-                                      set(applicable_bandw_instruments))
-        # NOTE: Adding this sorting functionality to keep consistency until further
-        # logic on how to choose an instrument if there are multiple applicable
-        # instruments
-        applicable_instruments = sorted(applicable_instruments)
-        # If there are more than 1 applicable instrument
-        if len(applicable_instruments) > 1:
-            # TODO: there might be further logic incorporated to choose which instrument 
-            # will be defaulted currently we are choosing the second applicable instrument
-            return applicable_instruments[1]
-        if len(applicable_instruments) == 1: # If there is only 1 applicable instrument
-            return applicable_instruments[0]
-        else: # If there is no applicable instrument
-            return "Default"
+        calculations. Arrays of observing frequencies and bandwidths are
+        broadcast together and an instrument is chosen for each combination.
+
+        :param obs_freq: observing frequency
+        :type obs_freq: astropy.units.Quantity
+        :param bandwidth: bandwidth
+        :type bandwidth: astropy.units.Quantity
+        :return: applicable/chosen instrument name, or an array of names
+        :rtype: String or numpy.ndarray
+        """
+        return self._instrument_range_index.select(obs_freq, bandwidth)
         
     def _calculate_derived_parameters(self):
         """
         Performs the calculations required to produce the
         set of derived parameters required for the sensitivity
-        calculation.
+        calculation. Derived groups whose inputs have not changed since the
+        previous calculation are not recalculated (see `dependency_graph`).
         """
-        # TODO Technically, it's possible to instantiate each of the
-        # classes below using a different observing frequency for each.
-        # The resulting derived parameters wouldn't make sense under those
-        # circumstances. Although this is an unlikely scenario, the design
-        # would be cleaner if there three classes referenced the
-        # same observing frequency.
-        # Implement a Builder interface to construct all three objects using
-        # the same observing frequency?
-
-        # LDM
-        # ------------------------------------------------------------------
-        # T_atm, transmittance, and the various temps values are not actually used
-        # for computing the sefd, but I kept this part to avoid breaking the
-        # build of DerivedParams below
-        # ------------------------------------------------------------------
-        obs_freq = self.calculation_inputs.user_input.obs_freq.value
-        weather = self.calculation_inputs.user_input.weather.value
-        elevation = self.calculation_inputs.user_input.elevation.value
-        bandwidth = self.calculation_inputs.user_input.bandwidth.value
-        n_pol = self.calculation_inputs.user_input.n_pol.value
-        surface_rms = self.calculation_inputs.telescope_and_environment.surface_rms.value
-        dish_radius = self.calculation_inputs.telescope_and_environment.dish_radius.value
-        eta_eff = self.calculation_inputs.telescope_and_environment.eta_eff.value
-        eta_ill= self.calculation_inputs.telescope_and_environment.eta_ill.value
-        eta_spill= self.calculation_inputs.telescope_and_environment.eta_spill.value
-        eta_block = self.calculation_inputs.telescope_and_environment.eta_block.value
-        T_cmb = self.calculation_inputs.telescope_and_environment.T_cmb.value
-        T_amb = self.calculation_inputs.telescope_and_environment.T_amb.value
-        eta_pol = self.calculation_inputs.telescope_and_environment.eta_pol.value
+        user_input = self.calculation_inputs.user_input
+        telescope_and_environment = self.calculation_inputs.telescope_and_environment
 
         # If chosen instrument is empty, assign an applicable instrument
         if self.chosen_instrument is None:
             chosen_inst = self.get_chosen_instrument_class()        
             self.chosen_instrument = chosen_inst
 
-        # Perform efficiencies calculations
-        eta = Efficiencies(obs_freq , surface_rms, eta_ill,
-                            eta_spill, eta_block, eta_pol)
+        inputs = {
+            'obs_freq': user_input.obs_freq.value,
+            'weather': user_input.weather.value,
+            'elevation': user_input.elevation.value,
+            'bandwidth': user_input.bandwidth.value,
+            'n_pol': user_input.n_pol.value,
+            'surface_rms': telescope_and_environment.surface_rms.value,
+            'dish_radius': telescope_and_environment.dish_radius.value,
+            'eta_eff': telescope_and_environment.eta_eff.value,
+            'eta_ill': telescope_and_environment.eta_ill.value,
+            'eta_spill': telescope_and_environment.eta_spill.value,
+            'eta_block': telescope_and_environment.eta_block.value,
+            'T_cmb': telescope_and_environment.T_cmb.value,
+            'T_amb': telescope_and_environment.T_amb.value,
+            'eta_pol': telescope_and_environment.eta_pol.value,
+            'instrument': self.chosen_instrument,
+            'finetune': self.finetune,
+        }
+
+        # Calculations already done, by this or another calculator, are
+        # taken from the cache
+        cache_key = DerivedParamsCache.key(inputs)
+        cached = DerivedParamsCache.get(cache_key)
+        if cached is not None:
+            derived_params, instrument_state = cached
+            for name, value in instrument_state.items():
+                setattr(self.chosen_instrument, name, value)
+            self._derived_parameters_model = derived_params.model_copy()
+            return self._derived_parameters_model
+
+        # Only the derived groups affected by a changed input are recalculated
+        derived = self._dependency_graph.evaluate(inputs)
+        T_sky, T_sys = derived['temperatures']
+
+        self._derived_parameters_model = \
+            DerivedParams(transmittance=derived['transmittance'], T_atm=derived['T_atm'],
+                            eta_a=derived['efficiencies'], eta_s=Efficiencies.ETA_S, T_sys=T_sys,
+                            T_sky=T_sky, sefd=derived['sefd'])
+        DerivedParamsCache.put(cache_key, self._derived_parameters_model.model_copy(),
+                               self.chosen_instrument)
 
-        # Perform atmospheric model calculations
-        atm = AtmosphereParams()
-        transmittance = atm.calculate_transmittance(obs_freq,
-                                        weather, elevation)
-        T_atm = atm.calculate_atmospheric_temperature(obs_freq,
-                                                        weather)
-        # Calculate the temperatures
-        temps = Temperatures(self.chosen_instrument, obs_freq, bandwidth, T_cmb, T_amb, eta_eff,
-                            T_atm, transmittance, n_pol)
+        return self._derived_parameters_model
 
+    def _build_dependency_graph(self):
+        """
+        Builds the graph of dependencies between the calculation inputs,
+        the chosen instrument and the derived groups.
+
+        :return: dependency graph of the derived parameters
+        :rtype: atlast_sc.dependency_graph.DependencyGraph
+        """
+        graph = DependencyGraph()
+        graph.add_node('efficiencies', core.dish_efficiency,
+                       ('obs_freq', 'surface_rms', 'eta_ill', 'eta_spill', 'eta_block', 'eta_pol'))
+        graph.add_node('transmittance', core.transmittance, ('obs_freq', 'weather', 'elevation'))
+        graph.add_node('T_atm', core.atmospheric_temperature, ('obs_freq', 'weather'))
+        graph.add_node('temperatures', self._calculate_temperatures,
+                       ('instrument', 'obs_freq', 'bandwidth', 'T_cmb', 'T_amb', 'eta_eff',
+                        'T_atm', 'transmittance', 'n_pol'))
+        graph.add_node('channel_T_sys', self._calculate_channel_system_temperatures,
+                       ('finetune', 'instrument', 'obs_freq', 'bandwidth', 'weather', 'elevation',
+                        'T_cmb', 'T_amb', 'eta_eff', 'n_pol'))
+        graph.add_node('sefd',
+                       lambda temperatures, channel_T_sys, efficiencies, bandwidth, dish_radius:
+                       self._calculate_effective_sefd(temperatures[1], channel_T_sys,
+                                                      efficiencies, bandwidth, dish_radius),
+                       ('temperatures', 'channel_T_sys', 'efficiencies', 'bandwidth',
+                        'dish_radius'))
+        return graph
+
+    def _calculate_temperatures(self, instrument, obs_freq, bandwidth, T_cmb, T_amb, eta_eff,
+                                T_atm, transmittance, n_pol):
+        """
+        Calculates the sky and system temperatures, and records the system
+        temperature on the instrument.
+
+        :return: sky temperature and system temperature
+        :rtype: tuple(astropy.units.Quantity, astropy.units.Quantity)
+        """
+        T_sky, T_sys = core.temperatures(instrument, obs_freq, bandwidth, T_cmb, T_amb,
+                                         eta_eff, T_atm, transmittance, n_pol)
+        instrument.record_system_temperature(obs_freq, T_sys)
+        return T_sky, T_sys
+
+    def _calculate_channel_system_temperatures(self, finetune, instrument, obs_freq, bandwidth,
+                                               weather, elevation, T_cmb, T_amb, eta_eff, n_pol):
+        """
+        Calculates the system temperature of the narrow channels making up
+        the band, used to calculate the effective SEFD when finetune is set.
+
+        :return: channel widths and system temperatures, or None if the
+            single-frequency SEFD is used
+        :rtype: tuple(astropy.units.Quantity, astropy.units.Quantity) or None
+        """
         # LDM
         # ------------------------------------------------------------------
         # This is where the snippet starts. The idea is to compute an
@@ -341,54 +413,26 @@ class ParameterSetup:
         # band composed of n independent channels. 
         # Setting finetune=False will fall back on the old implementation
         # ------------------------------------------------------------------
+        if not finetune:
+            return None
 
-        # define lower and upper limit of the requested band
-        obs_freq_low = (obs_freq-0.50*bandwidth).to('GHz').value
-        obs_freq_upp = (obs_freq+0.50*bandwidth).to('GHz').value
-        # select all the frequencies in the atm tables comprised within the band edges
-        obs_freq_list = atm.tau_atm_table[:, 0][np.logical_and(atm.tau_atm_table[:, 0]>obs_freq_low,
-                                                                atm.tau_atm_table[:, 0]<obs_freq_upp)]
-
-        # pad the frequency array to include the lower/upper band edges 
-        obs_freq_list = np.concatenate(([obs_freq_low],obs_freq_list,[obs_freq_upp]))*u.GHz
-
-        # double the frequency resolution; turned off for the moment, but
-        # just wanted to keep track of this
-        # if False:
-        #     obs_freq_list = np.ravel([obs_freq_list[1:],0.50*(obs_freq_list[1:]+obs_freq_list[:-1])],'F')
-        #     obs_freq_list = np.append(obs_freq_low,obs_freq_list)
-
-        # check if there are enough channels for performing the sum,
-        # otherwise estimate the single-frequency SEFD
-        if self.finetune and len(obs_freq_list)>1:
-            _sefd = []
+        return core.channel_system_temperatures(instrument, obs_freq, bandwidth, weather,
+                                                elevation, T_cmb, T_amb, eta_eff, n_pol)
 
-            obs_band_list = (obs_freq_list[1:]-obs_freq_list[:-1])
-            obs_freq_list = (obs_freq_list[1:]+obs_freq_list[:-1])*0.50
-
-            # compute SEFD for each narrow spectral element
-            for freq in obs_freq_list:
-                _transmittance = atm.calculate_transmittance(freq,weather,elevation)
-
-                _T_atm = atm.calculate_atmospheric_temperature(freq,weather)
-                _temps = Temperatures(self.chosen_instrument, obs_freq, bandwidth, T_cmb, T_amb, eta_eff,
-                            T_atm, transmittance, n_pol)
-
-                _sefd.append(self._calculate_sefd(_temps.T_sys,eta.eta_a, dish_radius).to('J/m2').value)
-            _sefd = np.asarray(_sefd)*(u.J/u.m**2)
+    def _calculate_effective_sefd(self, T_sys, channel_T_sys, eta_a, bandwidth, dish_radius):
+        """
+        Calculates the SEFD at the central frequency or, if the system
+        temperatures of the channels making up the band are given, the
+        effective SEFD of the band.
 
-            # obtain the effective SEFD for the input band
-            sefd = np.sqrt(bandwidth/np.sum(obs_band_list/_sefd**2))
-        else:
-            sefd = self._calculate_sefd(temps.T_sys, eta.eta_a, dish_radius)
+        :return: source equivalent flux density
+        :rtype: astropy.units.Quantity
+        """
+        if channel_T_sys is None:
+            return core.calculate_sefd(T_sys, eta_a, dish_radius)
 
-        self._derived_parameters_model = \
-            DerivedParams(transmittance=transmittance, T_atm=T_atm,
-                            eta_a=eta.eta_a, eta_s=eta.eta_s, T_sys=temps.T_sys, T_sky=temps.T_sky,
-                            sefd=sefd)
+        return core.calculate_effective_sefd(channel_T_sys, eta_a, bandwidth, dish_radius)
 
-        return self._derived_parameters_model
-    
     def _calculate_sefd(self, T_sys, eta_a, dish_radius):
         """
         Calculates the source equivalent flux density, SEFD, from the system
@@ -400,8 +444,4 @@ class ParameterSetup:
         :return: source equivalent flux density
         :rtype: astropy.units.Quantity
         """
-
-        dish_area = np.pi * dish_radius ** 2
-        sefd = (2 * k_B * T_sys) / (eta_a * dish_area)
-
-        return sefd
+        return core.calculate_sefd(T_sys, eta_a, dish_radius)
@@ -1,4 +1,4 @@
-from atlast_sc.utils import Decorators
+from atlast_sc.utils import Decorators, DataHelper
 
 ###################################################
 # Getters and setters for user input parameters   #
@@ -127,6 +127,28 @@ class UserInputParameters:
         self._param_setup.calculation_inputs.user_input.elevation.value = value
         self._param_setup.calculation_inputs.user_input.elevation.unit = value.unit
     
+    def update(self, **kwargs):
+        """
+        Updates several user input parameters at once. All the new values
+        are validated before any parameter is changed, and the instrument
+        selection and the recalculation of the derived parameters happen
+        only once, after all the parameters have been set.
+
+        Example: ``calculator.user_input.update(obs_freq=300 * u.GHz,
+        bandwidth=100 * u.MHz)``
+
+        :param kwargs: New values, keyed by parameter name
+        """
+        for param, value in kwargs.items():
+            attr = getattr(self.__class__, param, None)
+            if not isinstance(attr, property) or attr.fset is None:
+                raise ValueError(f'"{param}" is not a valid input parameter')
+            DataHelper.validate(self, param, value)
+
+        with self._param_setup.batch_update():
+            for param, value in kwargs.items():
+                setattr(self, param, value)
+
     def show(self):
         for name in dir(self.__class__):
             if name == "derived_parameters": # Don't show derived_parameters
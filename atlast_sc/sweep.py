@@ -0,0 +1,385 @@
+import numpy as np
+import astropy.units as u
+from astropy.units import Quantity, Unit
+
+from atlast_sc import kernel
+from atlast_sc.atmosphere import AtmosphereTables
+from atlast_sc.data import Data, Validator
+from atlast_sc.derived_groups import Efficiencies
+
+# Parameters that can be swept, in the order of the result dimensions
+SWEEP_AXES = ('obs_freq', 'bandwidth', 'weather', 'elevation', 'n_pol')
+
+# Quantities calculated at each point of a sweep
+SWEEP_TARGETS = ('sensitivity', 't_int')
+
+
+class SweepResult:
+    """
+    Result of a parameter sweep: the calculated target (sensitivity or
+    integration time) and the intermediate parameters at every combination
+    of the swept values, labelled by the sweep axes.
+
+    Combinations that are outside the permitted range of a parameter, or for
+    which the requested instrument is not applicable, are masked: their
+    values are NaN (None for the instrument) and `valid` is False.
+
+    :param axes: dictionary of the swept parameter names and their values,
+        in the order of the result dimensions
+    :type axes: dict
+    :param target: name of the calculated target, 'sensitivity' or 't_int'
+    :type target: str
+    :param values: dictionary of result names and arrays
+    :type values: dict
+    """
+    def __init__(self, axes, target, values):
+        self._axes = dict(axes)
+        self._target = target
+        self._values = dict(values)
+
+    @property
+    def axes(self):
+        """
+        Dictionary of the swept parameter names and their values
+        """
+        return dict(self._axes)
+
+    @property
+    def dims(self):
+        """
+        Names of the swept parameters, in the order of the result dimensions
+        """
+        return tuple(self._axes)
+
+    @property
+    def shape(self):
+        """
+        Shape of the result arrays
+        """
+        return self._values['valid'].shape
+
+    @property
+    def target(self):
+        """
+        Name of the calculated target, 'sensitivity' or 't_int'
+        """
+        return self._target
+
+    @property
+    def result(self):
+        """
+        The calculated target at each combination of the swept values
+        """
+        return self._values[self._target]
+
+    @property
+    def sensitivity(self):
+        """
+        Calculated sensitivity, or None if the integration time was
+        calculated
+        """
+        return self._values.get('sensitivity')
+
+    @property
+    def t_int(self):
+        """
+        Calculated integration time, or None if the sensitivity was
+        calculated
+        """
+        return self._values.get('t_int')
+
+    @property
+    def valid(self):
+        """
+        Boolean mask of the combinations for which the result was calculated
+        """
+        return self._values['valid']
+
+    @property
+    def instrument(self):
+        """
+        Name of the instrument used for each combination
+        """
+        return self._values['instrument']
+
+    @property
+    def T_sys(self):
+        """
+        System temperature
+        """
+        return self._values['T_sys']
+
+    @property
+    def sefd(self):
+        """
+        Source equivalent flux density
+        """
+        return self._values['sefd']
+
+    @property
+    def transmittance(self):
+        """
+        Atmospheric transmittance
+        """
+        return self._values['transmittance']
+
+    @property
+    def T_atm(self):
+        """
+        Atmospheric temperature
+        """
+        return self._values['T_atm']
+
+    def __getitem__(self, name):
+        return self._values[name]
+
+    def __repr__(self):
+        dims = ', '.join(f'{name}: {len(values)}'
+                         for name, values in self._axes.items())
+        return f'SweepResult({self._target}; {dims}; ' \
+               f'{np.count_nonzero(self.valid)} valid)'
+
+
+def spectrum_frequencies(f_min, f_max, resolution=None):
+    """
+    Frequencies sampling the range from `f_min` to `f_max` (inclusive): the
+    frequencies of the atmosphere tables (10 MHz apart) within the range, or
+    frequencies spaced by `resolution` from `f_min`.
+
+    :param f_min: lowest frequency
+    :type f_min: astropy.units.Quantity
+    :param f_max: highest frequency
+    :type f_max: astropy.units.Quantity
+    :param resolution: spacing of the frequencies. Optional. Defaults to
+        the resolution of the atmosphere tables
+    :type resolution: astropy.units.Quantity
+    :return: frequencies in GHz
+    :rtype: astropy.units.Quantity
+    """
+    f_min = Quantity(f_min).to_value(u.GHz)
+    f_max = Quantity(f_max).to_value(u.GHz)
+    if not f_min <= f_max:
+        raise ValueError(f'The lowest frequency ({f_min} GHz) must not be higher '
+                         f'than the highest frequency ({f_max} GHz)')
+
+    if resolution is None:
+        atm_freqs = AtmosphereTables.get().tau_atm_table[:, 0]
+        frequencies = atm_freqs[(atm_freqs >= f_min) & (atm_freqs <= f_max)]
+    else:
+        step = Quantity(resolution).to_value(u.GHz)
+        if not step > 0:
+            raise ValueError('The resolution must be positive')
+        # The small tolerance keeps f_max when it falls on the grid
+        n_steps = int(np.floor((f_max - f_min) / step * (1 + 1e-12)))
+        frequencies = f_min + step * np.arange(n_steps + 1)
+
+    return frequencies * u.GHz
+
+
+def permitted(values, key):
+    """
+    Determines, element by element, whether values are permitted for a
+    parameter. Unlike :meth:`atlast_sc.data.Validator.validate_field`, values
+    outside the permitted range or not in the allowed values are flagged
+    rather than raised. The units of Quantities are still validated.
+
+    :param values: values to check
+    :type values: astropy.units.Quantity or numpy.ndarray
+    :param key: name of the parameter
+    :type key: str
+    :return: boolean array, True where the value is permitted
+    :rtype: numpy.ndarray
+    """
+    data_type = Data.param_data_type_dicts[key]
+
+    if isinstance(values, Quantity):
+        Validator.validate_units(values.unit, key, data_type)
+        values = values.to_value(Unit(data_type.default_unit))
+    values = np.asarray(values, dtype=float)
+
+    ok = np.isfinite(values)
+    if data_type.allowed_values:
+        ok &= np.isin(values, data_type.allowed_values)
+    if data_type.lower_value is not None:
+        if data_type.lower_value_is_floor:
+            ok &= values > data_type.lower_value
+        else:
+            ok &= values >= data_type.lower_value
+    if data_type.upper_value is not None and not np.isinf(data_type.upper_value):
+        if data_type.upper_value_is_ceil:
+            ok &= values < data_type.upper_value
+        else:
+            ok &= values <= data_type.upper_value
+
+    return ok
+
+
+def run_sweep(param_setup, axes, target='sensitivity', t_int=None,
+              sensitivity=None, instrument=None):
+    """
+    Calculates the sensitivity or integration time at every combination of
+    the swept parameter values. Parameters that are not swept take their
+    current value in `param_setup`, which is not modified.
+
+    :param param_setup: parameter setup holding the current parameter values
+    :type param_setup: atlast_sc.parameter_setup.ParameterSetup
+    :param axes: dictionary of parameter names (see `SWEEP_AXES`) and 1-d
+        arrays of values
+    :type axes: dict
+    :param target: 'sensitivity' or 't_int'
+    :type target: str
+    :param t_int: integration time used to calculate the sensitivity
+    :type t_int: astropy.units.Quantity
+    :param sensitivity: sensitivity used to calculate the integration time
+    :type sensitivity: astropy.units.Quantity
+    :param instrument: name of the instrument to use. If None, the
+        instrument is chosen for each combination as in the calculator
+    :type instrument: str
+    :return: the sweep result
+    :rtype: SweepResult
+    """
+    if target not in SWEEP_TARGETS:
+        raise ValueError(f'Invalid sweep target "{target}". '
+                         f'Must be one of {SWEEP_TARGETS}')
+    unknown = set(axes) - set(SWEEP_AXES)
+    if unknown:
+        raise ValueError(f'Cannot sweep over {sorted(unknown)}. '
+                         f'Sweep axes must be in {SWEEP_AXES}')
+
+    user_input = param_setup.calculation_inputs.user_input
+    telescope = param_setup.calculation_inputs.telescope_and_environment
+    range_index = param_setup.instrument_range_index
+
+    # Order the axes and give each its own dimension. Invalid values are
+    # replaced by the current parameter value, so that the calculation can
+    # proceed, and masked at the end.
+    axes = {name: axes[name] for name in SWEEP_AXES if name in axes}
+    ndim = len(axes)
+    grid = {}
+    valid = np.ones((), dtype=bool)
+    for dim, (name, values) in enumerate(axes.items()):
+        current = getattr(user_input, name).value
+        if not isinstance(values, Quantity):
+            values = np.asarray(values)
+            if isinstance(current, Quantity):
+                values = values * current.unit
+        if values.ndim != 1:
+            raise ValueError(f'The values of sweep axis "{name}" must be '
+                             f'one-dimensional')
+        axes[name] = values
+
+        axis_ok = permitted(values, name)
+        values = np.where(axis_ok, values, current)
+
+        shape = [1] * ndim
+        shape[dim] = len(values)
+        grid[name] = values.reshape(shape)
+        valid = valid & axis_ok.reshape(shape)
+
+    # Parameters that are not swept keep their current value
+    for name in SWEEP_AXES:
+        if name not in grid:
+            grid[name] = getattr(user_input, name).value
+    shape = np.broadcast_shapes(*(np.shape(grid[name]) for name in SWEEP_AXES))
+    valid = np.broadcast_to(valid, shape).copy()
+
+    obs_freq = np.broadcast_to(grid['obs_freq'], shape) << grid['obs_freq'].unit
+    bandwidth = np.broadcast_to(grid['bandwidth'], shape) << grid['bandwidth'].unit
+
+    # Choose the instrument for each combination, or mask the combinations
+    # the requested instrument does not cover
+    if instrument is None:
+        instruments = np.broadcast_to(range_index.select(obs_freq, bandwidth), shape)
+    else:
+        inst_name = param_setup.loaded_instruments[instrument.capitalize()].name
+        if inst_name == range_index.DEFAULT_INSTRUMENT:
+            # The default instrument accepts any bandwidth
+            column = range_index.names.index(inst_name)
+            valid &= range_index.obs_freq_applicable(obs_freq)[..., column]
+        else:
+            valid &= range_index.is_applicable(inst_name, obs_freq, bandwidth)
+        instruments = np.full(shape, inst_name, dtype=object)
+
+    # The calculation is done by the float kernel, on values in canonical
+    # units. Parameters that do not depend on the instrument are calculated
+    # on the grid and broadcast.
+    values = {name: kernel.to_canonical(name, grid[name]) for name in SWEEP_AXES}
+    fixed = {name: kernel.to_canonical(name, getattr(telescope, name).value)
+             for name in ('surface_rms', 'dish_radius', 'T_amb', 'T_cmb', 'eta_eff',
+                          'eta_ill', 'eta_spill', 'eta_block', 'eta_pol')}
+    eta_a = np.broadcast_to(kernel.dish_efficiency(values['obs_freq'], fixed['surface_rms'],
+                                                   fixed['eta_ill'], fixed['eta_spill'],
+                                                   fixed['eta_block'], fixed['eta_pol']),
+                            shape)
+    transmittance = np.broadcast_to(kernel.transmittance(values['obs_freq'], values['weather'],
+                                                         values['elevation']), shape)
+    T_atm = np.broadcast_to(kernel.atmospheric_temperature(values['obs_freq'],
+                                                           values['weather']), shape)
+    values = {name: np.broadcast_to(value, shape) for name, value in values.items()}
+
+    # System temperature and SEFD, calculated for all the combinations using
+    # the same instrument at once. The kernel does not modify the
+    # instruments. Combinations with no transmission give an infinite system
+    # temperature, and are masked below.
+    T_sys = np.full(shape, np.nan)
+    sefd = np.full(shape, np.nan)
+    with np.errstate(divide='ignore', over='ignore', invalid='ignore'):
+        for name in np.unique(instruments[valid]):
+            inst = param_setup.loaded_instruments[name]
+            selected = valid & (instruments == name)
+            point = {key: value[selected] for key, value in values.items()}
+            T_sky = kernel.sky_temperature(T_atm[selected], transmittance[selected],
+                                           fixed['T_cmb'], point['obs_freq'])
+            T_sys[selected] = inst.system_temperature_kernel(
+                point['obs_freq'], point['bandwidth'], fixed['eta_eff'], fixed['T_amb'],
+                T_sky, transmittance[selected], point['n_pol'])
+
+            if param_setup.finetune:
+                # The effective SEFD is integrated over the channels of each
+                # band, for all the combinations at once
+                sefd[selected] = kernel.effective_sefds(
+                    inst, point['obs_freq'], point['bandwidth'], point['weather'],
+                    point['elevation'], fixed['T_cmb'], fixed['T_amb'],
+                    fixed['eta_eff'], point['n_pol'], eta_a[selected],
+                    fixed['dish_radius'])
+            else:
+                sefd[selected] = kernel.sefd(T_sys[selected], eta_a[selected],
+                                             fixed['dish_radius'])
+
+    eta_s = Efficiencies.ETA_S
+    if target == 'sensitivity':
+        t_int = user_input.t_int.value if t_int is None else t_int
+        Validator.validate_field('t_int', t_int)
+        with np.errstate(over='ignore', invalid='ignore'):
+            result = (kernel.sensitivity(sefd, eta_s, values['n_pol'], values['bandwidth'],
+                                         kernel.to_canonical('t_int', t_int)) * u.Jy).to(u.mJy)
+        result_key = 'calculated_sensitivity'
+    else:
+        sensitivity = user_input.sensitivity.value if sensitivity is None else sensitivity
+        Validator.validate_field('calculated_sensitivity', sensitivity)
+        with np.errstate(over='ignore', invalid='ignore'):
+            result = kernel.t_integration(sefd, eta_s, values['n_pol'], values['bandwidth'],
+                                          kernel.to_canonical('sensitivity', sensitivity)) * u.s
+        result_key = 'calculated_t_int'
+
+    # Mask results that could not be calculated or are outside the permitted
+    # range, as the calculator would refuse to store them. Results close to
+    # the largest float may overflow when converted to the permitted units.
+    with np.errstate(over='ignore', invalid='ignore'):
+        valid &= np.isfinite(result) & permitted(result, result_key)
+    result[~valid] = np.nan
+    T_sys[~valid] = np.nan
+    sefd[~valid] = np.nan
+    instruments = np.where(valid, instruments, None)
+
+    values = {
+        target: result,
+        'T_sys': T_sys * u.K,
+        'sefd': sefd * u.Jy,
+        'transmittance': np.where(valid, transmittance, np.nan),
+        'T_atm': np.where(valid, T_atm, np.nan) * u.K,
+        'instrument': instruments,
+        'valid': valid,
+    }
+
+    return SweepResult(axes, target, values)
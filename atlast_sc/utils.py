@@ -12,6 +12,10 @@ class Decorators:
     Decorator functions
     """
 
+    # Parameters that input to the derived parameters, but not to the
+    # instrument selection
+    _NON_SELECTING_PARAMS = ('weather', 'elevation', 'dish_radius')
+
     @staticmethod
     def validate_value(func):
         """
@@ -84,17 +88,39 @@ class Decorators:
             func(param_class, value, **kwargs)
             # Recalculate derived parameters and change instrument, if necessary
             if dirty:
-                old_inst_name = param_class._param_setup.chosen_instrument.name
-                param_class._param_setup.chosen_instrument = \
-                    param_class._param_setup.get_chosen_instrument_class()
-                new_inst_name = param_class._param_setup.chosen_instrument.name
-                if old_inst_name != new_inst_name: 
-                    print("Instrument has been changed from " + old_inst_name + " to " + \
-                      new_inst_name + ".")
-                param_class._param_setup._calculate_derived_parameters()
+                pending_updates = getattr(param_class._param_setup, '_pending_updates', None)
+                if pending_updates is not None:
+                    # A batch update is in progress: recalculate once it ends
+                    pending_updates.add(func.__name__)
+                else:
+                    Decorators.update_derived_params(param_class._param_setup,
+                                                     [func.__name__])
 
         return do_update
 
+    @staticmethod
+    def update_derived_params(param_setup, param_names):
+        """
+        Reselects the instrument, if necessary, and recalculates the derived
+        parameters after the parameters in `param_names` have changed.
+
+        :param param_setup: The parameter setup holding the changed parameters
+        :type param_setup: atlast_sc.parameter_setup.ParameterSetup
+        :param param_names: Names of the changed parameters
+        :type param_names: iterable of str
+        """
+        # The instrument selection only depends on the observing
+        # frequency and bandwidth
+        if not set(param_names).issubset(Decorators._NON_SELECTING_PARAMS):
+            old_inst_name = param_setup.chosen_instrument.name
+            param_setup.chosen_instrument = \
+                param_setup.get_chosen_instrument_class()
+            new_inst_name = param_setup.chosen_instrument.name
+            if old_inst_name != new_inst_name: 
+                print("Instrument has been changed from " + old_inst_name + " to " + \
+                  new_inst_name + ".")
+        param_setup._calculate_derived_parameters()
+
 class FileHelper:
     """
     Class that provides support for reading input parameters from a file
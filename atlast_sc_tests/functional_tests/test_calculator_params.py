@@ -179,7 +179,7 @@ class TestDerivedGroups:
     def test_instrument_specific_receiver_temperature(self, inst_spec_module, 
                                                         obs_freq, inst_name, bandwidth):
         if hasattr(inst_spec_module, 'calculate_receiver_temp'):
-            receiver_temperature = inst_spec_module.calculate_receiver_temp(obs_freq* u.GHz)
+            receiver_temperature = inst_spec_module.calculate_receiver_temp(obs_freq)
 
             # Make sure the temperature is returned in Kelvin
             assert receiver_temperature.unit == "K"
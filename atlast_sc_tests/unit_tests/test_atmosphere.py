@@ -0,0 +1,227 @@
+import json
+import pytest
+import numpy as np
+from scipy.interpolate import RegularGridInterpolator
+from atlast_sc.atmosphere import AtmosphereTables, tables_from_am_output, \
+    write_lookup, read_lookup, UniformGridInterpolator, make_interpolator
+from atlast_sc.derived_groups import AtmosphereParams
+from atlast_sc.calculator import Calculator
+
+
+class TestAtmosphereTables:
+
+    def test_tables_loaded_once(self):
+        # Make sure the tables have been loaded
+        AtmosphereTables.get()
+        load_count = AtmosphereTables.load_count()
+
+        # Creating further atmosphere objects and calculators should not
+        # parse the lookup files again
+        atm_1 = AtmosphereParams()
+        atm_2 = AtmosphereParams()
+        calculator = Calculator()
+        calculator.user_input.weather = 50.0
+        calculator.user_input.obs_freq = 200.0 * calculator.user_input.obs_freq.unit
+
+        assert AtmosphereTables.load_count() == load_count
+        # The tables are shared, not copied
+        assert atm_1.T_atm_table is atm_2.T_atm_table
+        assert atm_1.tau_atm_table is atm_2.tau_atm_table
+
+    def test_tables_are_read_only(self):
+        tables = AtmosphereTables.get()
+
+        with pytest.raises(ValueError):
+            tables.T_atm_table[0, 1] = 0.0
+        with pytest.raises(ValueError):
+            tables.tau_atm_table[0, 1] = 0.0
+
+    def test_reload_and_invalidate(self):
+        original_tables = AtmosphereTables.get()
+        load_count = AtmosphereTables.load_count()
+
+        # Reloading parses the files again and replaces the shared tables
+        reloaded_tables = AtmosphereTables.reload()
+        assert AtmosphereTables.load_count() == load_count + 1
+        assert reloaded_tables is not original_tables
+        assert AtmosphereTables.get() is reloaded_tables
+        assert np.array_equal(reloaded_tables.T_atm_table,
+                              original_tables.T_atm_table)
+
+        # Invalidating drops the tables; they are re-read on next use
+        AtmosphereTables.invalidate()
+        assert AtmosphereTables.load_count() == load_count + 1
+        AtmosphereParams()
+        assert AtmosphereTables.load_count() == load_count + 2
+
+
+class TestUniformGridInterpolator:
+
+    def test_matches_regular_grid_interpolator(self):
+        tables = AtmosphereTables.get()
+        assert isinstance(tables.interp_T_atm, UniformGridInterpolator)
+        assert isinstance(tables.interp_tau_atm, UniformGridInterpolator)
+
+        rng = np.random.default_rng(1)
+        frequencies = np.concatenate((rng.uniform(30, 1000, 10000),
+                                      tables.T_atm_table[:50, 0],
+                                      [30, 1000]))
+        weathers = rng.uniform(5, 95, len(frequencies))
+        weathers[:5] = tables.weather
+        points = np.column_stack((frequencies, weathers))
+
+        for table, interp in ((tables.T_atm_table, tables.interp_T_atm),
+                              (tables.tau_atm_table, tables.interp_tau_atm)):
+            reference = RegularGridInterpolator(
+                (table[:, 0], tables.weather), table[:, 1:])
+            expected = reference(points)
+            # Batched evaluation
+            assert np.allclose(interp(points), expected, rtol=1e-12, atol=0)
+            # Single points
+            for point, expected_value in zip(points[:20], expected[:20]):
+                assert interp(point) == pytest.approx(expected_value,
+                                                      rel=1e-12)
+
+    @pytest.mark.parametrize(
+        'point',
+        [
+            [29.9, 25],
+            [1000.1, 25],
+            [406, 4],
+            [406, 96],
+        ]
+    )
+    def test_out_of_bounds(self, point):
+        interp = AtmosphereTables.get().interp_T_atm
+        with pytest.raises(ValueError):
+            interp(point)
+        with pytest.raises(ValueError):
+            interp([point, [406, 25]])
+
+    def test_falls_back_for_non_uniform_grid(self):
+        weather = [5, 50, 95]
+        values = np.arange(12, dtype=float).reshape(4, 3)
+
+        uniform_interp = make_interpolator([1, 2, 3, 4], weather, values)
+        assert isinstance(uniform_interp, UniformGridInterpolator)
+
+        non_uniform_interp = make_interpolator([1, 2, 4, 8], weather, values)
+        assert isinstance(non_uniform_interp, RegularGridInterpolator)
+        assert non_uniform_interp([3, 50]) == pytest.approx(5.5)
+
+
+class TestBinaryLookup:
+
+    @pytest.fixture()
+    def am_output_files(self, tmp_path):
+        # Write a small grid in the format produced by the AM model:
+        # frequency (GHz), tau, T (K)
+        frequencies = np.linspace(30, 31, 101)
+        am_output_files = {}
+        for i, pwv in enumerate([5, 50, 95]):
+            tau = 0.01 * (i + 1) * frequencies / 30
+            T = 2.0 * (i + 1) * frequencies / 30
+            file_name = tmp_path / f'am_{pwv:02d}.txt'
+            np.savetxt(file_name, np.column_stack((frequencies, tau, T)))
+            am_output_files[pwv] = file_name
+
+        return am_output_files
+
+    def test_tables_from_am_output(self, am_output_files):
+        T_atm_table, tau_atm_table = tables_from_am_output(am_output_files)
+
+        assert T_atm_table.shape == tau_atm_table.shape == (101, 4)
+        # The T_atm values are rescaled by the zenith opacity
+        am_output = np.genfromtxt(am_output_files[50])
+        assert np.allclose(tau_atm_table[:, 2], am_output[:, 1])
+        assert np.allclose(T_atm_table[:, 2],
+                           am_output[:, 2] / (1 - np.exp(-am_output[:, 1])))
+
+    def test_write_and_read_lookup(self, am_output_files, tmp_path):
+        T_atm_table, tau_atm_table = tables_from_am_output(am_output_files)
+        lookup_path = tmp_path / 'lookup.npy'
+
+        header = write_lookup(lookup_path, T_atm_table, tau_atm_table,
+                              [5, 50, 95], site='Test',
+                              sources=am_output_files.values())
+
+        # Check the header records the grid, site and content hash
+        with open(tmp_path / 'lookup.json') as f:
+            assert json.load(f) == header
+        assert header['site'] == 'Test'
+        assert header['weather'] == [5, 50, 95]
+        assert header['frequency']['count'] == 101
+        assert header['frequency']['start'] == pytest.approx(30)
+        assert header['frequency']['step'] == pytest.approx(0.01)
+
+        # Check the tables are memory-mapped read-only and unchanged
+        read_T_atm, read_tau_atm, read_header = \
+            read_lookup(lookup_path, verify=True)
+        assert isinstance(read_T_atm, np.memmap)
+        assert not read_T_atm.flags.writeable
+        assert np.array_equal(read_T_atm, T_atm_table)
+        assert np.array_equal(read_tau_atm, tau_atm_table)
+        assert read_header == header
+
+        # The content hash is the same as for the same tables held in memory
+        tables = AtmosphereTables(T_atm_table, tau_atm_table, [5, 50, 95])
+        assert tables.content_hash == header['sha256']
+
+    def test_read_lookup_verify_fails(self, am_output_files, tmp_path):
+        T_atm_table, tau_atm_table = tables_from_am_output(am_output_files)
+        lookup_path = tmp_path / 'lookup.npy'
+        write_lookup(lookup_path, T_atm_table, tau_atm_table, [5, 50, 95],
+                     site='Test')
+
+        # Tamper with the tables
+        data = np.load(lookup_path)
+        data[0, 0, 1] += 1
+        np.save(lookup_path, data)
+
+        read_lookup(lookup_path)
+        with pytest.raises(ValueError):
+            read_lookup(lookup_path, verify=True)
+
+    def test_binary_lookup_preferred(self, am_output_files, tmp_path,
+                                     monkeypatch):
+        T_atm_table, tau_atm_table = tables_from_am_output(am_output_files)
+        lookup_path = tmp_path / 'lookup.npy'
+        header = write_lookup(lookup_path, T_atm_table, tau_atm_table,
+                              [5, 50, 95], site='Test')
+
+        monkeypatch.setattr(AtmosphereTables, 'LOOKUP_PATH', lookup_path)
+        try:
+            tables = AtmosphereTables.reload()
+            assert tables.header == header
+            assert tables.weather == (5, 50, 95)
+            assert np.array_equal(tables.T_atm_table, T_atm_table)
+            assert AtmosphereParams().tau_atm_table is tables.tau_atm_table
+        finally:
+            # Make sure later tests use the real tables
+            AtmosphereTables.invalidate()
+
+    def test_build_lookup(self, tmp_path, monkeypatch):
+        # Text tables in the format of the package tables: frequency (GHz)
+        # and one column per weather percentile
+        frequencies = np.linspace(30, 31, 101)
+        tau = np.column_stack([frequencies] + [0.01 * pwv * frequencies / 30
+                                               for pwv in AtmosphereTables.WEATHER])
+        T = np.column_stack([frequencies] + [pwv * frequencies / 30
+                                             for pwv in AtmosphereTables.WEATHER])
+        np.savetxt(tmp_path / 'T.txt', T)
+        np.savetxt(tmp_path / 'tau.txt', tau)
+        monkeypatch.setattr(AtmosphereTables, 'T_ATM_PATH', tmp_path / 'T.txt')
+        monkeypatch.setattr(AtmosphereTables, 'TAU_ATM_PATH', tmp_path / 'tau.txt')
+
+        lookup_path = tmp_path / 'lookup.npy'
+        header = AtmosphereTables.build_lookup(lookup_path)
+
+        T_atm_table, tau_atm_table, read_header = \
+            read_lookup(lookup_path, verify=True)
+        assert read_header == header
+        assert header['weather'] == list(AtmosphereTables.WEATHER)
+        assert header['sources'] == ['T.txt', 'tau.txt']
+        # The stored T_atm values are rescaled, as when the text tables
+        # are loaded
+        assert np.array_equal(tau_atm_table, tau)
+        assert np.allclose(T_atm_table[:, 1:], T[:, 1:] / (1 - np.exp(-tau[:, 1:])))
@@ -0,0 +1,300 @@
+import pickle
+import sqlite3
+import subprocess
+import sys
+import time
+import pytest
+import numpy as np
+import astropy.units as u
+from atlast_sc.cache import LRUCache, SQLiteCache, DerivedParamsCache
+from atlast_sc.calculator import Calculator
+from atlast_sc.instruments.config import InstrumentRegistry
+
+
+@pytest.fixture()
+def derived_params_cache():
+    # An empty cache, restored to its size after the test
+    maxsize = DerivedParamsCache.stats().maxsize
+    DerivedParamsCache.clear()
+    yield DerivedParamsCache
+    DerivedParamsCache.configure(maxsize)
+
+
+@pytest.fixture()
+def persistent_cache(derived_params_cache, tmp_path):
+    # An empty persistent cache, removed after the test
+    yield derived_params_cache.set_persistent(tmp_path / 'cache.sqlite')
+    derived_params_cache.set_persistent(None)
+
+
+class TestLRUCache:
+
+    def test_eviction(self):
+        cache = LRUCache(maxsize=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        # Using 'a' makes 'b' the least recently used entry
+        assert cache.get('a') == 1
+        cache.put('c', 3)
+
+        assert 'b' not in cache
+        assert cache.get('b') is None
+        assert cache.get('c') == 3
+        stats = cache.stats()
+        assert (stats.hits, stats.misses, stats.evictions, stats.size, stats.maxsize) == \
+            (2, 1, 1, 2, 2)
+
+    def test_resize(self):
+        cache = LRUCache(maxsize=3)
+        for key in 'abc':
+            cache.put(key, key)
+
+        cache.resize(1)
+        assert len(cache) == 1
+        assert 'c' in cache
+        assert cache.stats().evictions == 2
+
+        # A size of 0 disables the cache
+        cache.resize(0)
+        cache.put('d', 'd')
+        assert len(cache) == 0
+
+        with pytest.raises(ValueError):
+            cache.resize(-1)
+        with pytest.raises(ValueError):
+            LRUCache(maxsize=-1)
+
+
+    def test_ttl(self):
+        cache = LRUCache(maxsize=2, ttl=0.05)
+        cache.put('a', 1)
+        assert cache.get('a') == 1
+
+        time.sleep(0.1)
+
+        assert 'a' not in cache
+        assert cache.get('a') is None
+        stats = cache.stats()
+        assert (stats.hits, stats.misses, stats.expirations, stats.size) == (1, 1, 1, 0)
+
+        with pytest.raises(ValueError):
+            LRUCache(ttl=0)
+
+
+class TestSQLiteCache:
+
+    def test_get_and_put(self, tmp_path):
+        cache = SQLiteCache(tmp_path / 'cache.sqlite')
+        assert cache.get('a') is None
+        cache.put('a', {'value': 1.5 * u.K})
+
+        # The entries are kept by another cache using the same file
+        other = SQLiteCache(tmp_path / 'cache.sqlite')
+        assert other.get('a') == {'value': 1.5 * u.K}
+        assert len(other) == 1
+        stats = cache.stats()
+        assert (stats.hits, stats.misses, stats.size) == (0, 1, 1)
+
+    def test_eviction(self, tmp_path):
+        cache = SQLiteCache(tmp_path / 'cache.sqlite', maxsize=2, recency_resolution=0)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        # Using 'a' makes 'b' the least recently used entry
+        assert cache.get('a') == 1
+        cache.put('c', 3)
+
+        assert cache.get('b') is None
+        assert cache.get('a') == 1
+        assert cache.stats().evictions == 1
+        assert len(cache) == 2
+
+        with pytest.raises(ValueError):
+            SQLiteCache(tmp_path / 'other.sqlite', maxsize=-1)
+
+    def test_values_stored_as_json(self, tmp_path):
+        path = tmp_path / 'cache.sqlite'
+        cache = SQLiteCache(path)
+        value = {'T_sys': np.array([50.0, 60.0]) * u.K, 'n_pol': np.int64(2),
+                 'values': (1, 'a', None), 'eta': np.array([0.5, 0.7])}
+        cache.put('a', value)
+
+        read = cache.get('a')
+        assert read['T_sys'].unit == u.K
+        assert np.array_equal(read['T_sys'].value, [50.0, 60.0])
+        assert read['n_pol'] == 2
+        assert read['values'] == [1, 'a', None]
+        assert np.array_equal(read['eta'], value['eta'])
+
+        # Values that cannot be stored as JSON are skipped
+        cache.put('b', object())
+        assert cache.get('b') is None
+
+        # Pickles written to the file are never loaded
+        class Payload:
+            def __reduce__(self):
+                return (exec, ('raise AssertionError("unpickled")',))
+        with sqlite3.connect(path) as connection:
+            connection.execute("UPDATE entries SET value = ? WHERE key = 'a'",
+                               (pickle.dumps(Payload()),))
+        assert cache.get('a') is None
+
+    def test_reads_do_not_write(self, tmp_path):
+        path = tmp_path / 'cache.sqlite'
+        cache = SQLiteCache(path)
+        cache.put('a', 1)
+        statements = []
+        cache._connection().set_trace_callback(statements.append)
+
+        assert [cache.get('a') for _ in range(10)] == [1] * 10
+
+        # The entry was used within the recency resolution of its write
+        assert not any(statement.startswith('UPDATE') for statement in statements)
+
+    def test_batched_eviction(self, tmp_path):
+        cache = SQLiteCache(tmp_path / 'cache.sqlite', maxsize=100)
+        statements = []
+        cache._connection().set_trace_callback(statements.append)
+
+        for i in range(100):
+            cache.put(str(i), i)
+        counts = sum('count(*)' in statement for statement in statements)
+        cache.put('100', 100)
+
+        # The entries are counted once every tenth of the cache is written,
+        # and evicted down to 90% of the maximum size once it is exceeded
+        assert counts == 9
+        assert len(cache) == 90
+        assert cache.stats().evictions == 11
+        assert cache.get('10') is None
+        assert cache.get('11') == 11
+
+    def test_errors_are_misses(self, tmp_path):
+        path = tmp_path / 'cache.sqlite'
+        cache = SQLiteCache(path)
+        cache.put('a', 1)
+        with sqlite3.connect(path) as connection:
+            connection.execute('DROP TABLE entries')
+
+        assert cache.get('a') is None
+        cache.put('b', 2)
+        cache.clear()
+        assert len(cache) == 0
+        assert cache.stats().size == 0
+
+    def test_shared_between_processes(self, tmp_path):
+        path = tmp_path / 'cache.sqlite'
+        script = ('import sys; from atlast_sc.cache import SQLiteCache; '
+                  'cache = SQLiteCache(sys.argv[1]); '
+                  '[cache.put(f"{sys.argv[2]}-{i}", i) for i in range(50)]')
+        processes = [subprocess.Popen([sys.executable, '-c', script, str(path), str(n)])
+                     for n in range(4)]
+        assert [process.wait(timeout=120) for process in processes] == [0] * 4
+
+        cache = SQLiteCache(path)
+        assert len(cache) == 200
+        assert cache.get('3-49') == 49
+
+
+class TestDerivedParamsCache:
+
+    def test_shared_between_calculators(self, derived_params_cache):
+        calculator_1 = Calculator()
+        calculator_1.user_input.update(obs_freq=300 * u.GHz, weather=50)
+        before = derived_params_cache.stats()
+
+        calculator_2 = Calculator()
+        calculator_2.user_input.update(obs_freq=300 * u.GHz, weather=50)
+
+        stats = derived_params_cache.stats()
+        # The defaults were calculated when calculator_1 was created
+        assert stats.hits == before.hits + 2
+        assert stats.misses == before.misses
+        derived_1 = calculator_1._param_setup.derived_parameters_model
+        derived_2 = calculator_2._param_setup.derived_parameters_model
+        assert derived_2 == derived_1
+        assert derived_2 is not derived_1
+        # The values recorded on the instrument are restored
+        instrument = calculator_2._param_setup.chosen_instrument
+        assert instrument.T_sys == derived_2.T_sys
+        assert instrument.T_rx == 90 * u.K
+
+    def test_unit_normalised_key(self, derived_params_cache):
+        calculator = Calculator()
+        calculator.user_input.bandwidth = 200 * u.MHz
+        calculator.user_input.bandwidth = 100 * u.MHz
+        hits = derived_params_cache.stats().hits
+
+        calculator.user_input.bandwidth = 0.2 * u.GHz
+
+        assert derived_params_cache.stats().hits == hits + 1
+
+    def test_modified_instrument_not_shared(self, derived_params_cache):
+        calculator_1 = Calculator()
+        sepia = calculator_1._param_setup.loaded_instruments['Sepia']
+        sepia.receiver_temp_options_and_unit['values'] = [1000.0, 216.5]
+        calculator_1.user_input.update(obs_freq=300 * u.GHz, bandwidth=150 * u.MHz)
+
+        calculator_2 = Calculator()
+        calculator_2.user_input.update(obs_freq=300 * u.GHz, bandwidth=150 * u.MHz)
+
+        assert calculator_1.derived_parameters.T_sys != calculator_2.derived_parameters.T_sys
+
+    def test_invalidated_when_instruments_change(self, derived_params_cache):
+        Calculator()
+        assert derived_params_cache.stats().size > 0
+
+        InstrumentRegistry.invalidate()
+        Calculator()
+
+        # Only the calculation done with the reloaded instruments is kept
+        assert derived_params_cache.stats().size == 1
+
+    def test_configure(self, derived_params_cache):
+        derived_params_cache.configure(2)
+        calculator = Calculator()
+        for weather in (10, 20, 30):
+            calculator.user_input.weather = weather
+
+        stats = derived_params_cache.stats()
+        assert stats.size == 2
+        assert stats.maxsize == 2
+        assert stats.evictions >= 2
+
+    def test_persistent(self, persistent_cache, derived_params_cache):
+        calculator_1 = Calculator()
+        calculator_1.user_input.update(obs_freq=300 * u.GHz, weather=50)
+        assert len(persistent_cache) == 2
+
+        # A new process starts with an empty memory cache
+        derived_params_cache.clear()
+        calculator_2 = Calculator()
+        calculator_2.user_input.update(obs_freq=300 * u.GHz, weather=50)
+
+        assert persistent_cache.stats().hits == 2
+        assert calculator_2.derived_parameters == calculator_1.derived_parameters
+        instrument = calculator_2._param_setup.chosen_instrument
+        assert instrument.T_sys == calculator_2.derived_parameters.T_sys
+
+    def test_persistent_keys_hold_package_fingerprint(self, persistent_cache,
+                                                      derived_params_cache, monkeypatch):
+        Calculator()
+        derived_params_cache.clear()
+
+        # Another version of the calculator does not use the entries
+        monkeypatch.setattr(derived_params_cache, '_package_hash', 'other version')
+        Calculator()
+
+        assert persistent_cache.stats().hits == 0
+        assert len(persistent_cache) == 2
+
+    def test_persistent_from_environment(self, derived_params_cache, tmp_path, monkeypatch):
+        path = tmp_path / 'cache.sqlite'
+        monkeypatch.setenv(DerivedParamsCache.PERSISTENT_PATH_ENV, str(path))
+        monkeypatch.setenv(DerivedParamsCache.PERSISTENT_SIZE_ENV, '10')
+        monkeypatch.setattr(DerivedParamsCache, '_persistent_configured', False)
+        try:
+            persistent = derived_params_cache.persistent()
+            assert persistent.path == str(path)
+            assert persistent.maxsize == 10
+        finally:
+            derived_params_cache.set_persistent(None)
@@ -1,10 +1,12 @@
 import copy
 import pytest
+import numpy as np
 import astropy.units as u
 from atlast_sc.calculator import Calculator
 from atlast_sc.parameter_setup import ParameterSetup
 from atlast_sc.parameters.user_input_parameters import UserInputParameters
 from atlast_sc.models import DerivedParams, CalculationInput
+from atlast_sc.derived_groups import AtmosphereParams, Temperatures
 from atlast_sc.utils import DataHelper
 from atlast_sc.exceptions import CalculatedValueInvalidWarning
 from atlast_sc_tests.utils import does_not_raise
@@ -23,7 +25,7 @@ class TestCalculator:
         for attr in dir(parameter_class):
             if not attr.startswith('__') and \
                not attr.startswith('_') and \
-               attr != 'show':
+               attr not in ('show', 'update'):
                 properties[attr] = getattr(parameter_class, attr)
         return properties
 
@@ -274,6 +276,131 @@ class TestCalculator:
         # Calculator's parameter setup object
         parameter_setup_reset_spy.assert_called()
 
+    def test_clone(self, calculator, obs_freq, mocker):
+        init_spy = mocker.spy(ParameterSetup, '__init__')
+        clone = calculator.clone(weather=50, elevation=60 * u.deg)
+
+        # The clone is not built from scratch
+        init_spy.assert_not_called()
+        assert clone.user_input.weather == 50
+        assert clone.user_input.elevation == 60 * u.deg
+        assert clone.user_input.obs_freq == obs_freq
+        assert clone.chosen_instrument == calculator.chosen_instrument
+        expected_calculator = copy.deepcopy(calculator)
+        expected_calculator.user_input.update(weather=50, elevation=60 * u.deg)
+        assert clone.derived_parameters == expected_calculator.derived_parameters
+
+        # The calculators are independent
+        assert calculator.user_input.weather != 50
+        clone.user_input.obs_freq = 850 * u.GHz
+        assert calculator.user_input.obs_freq == obs_freq
+        clone_instrument = clone._param_setup.loaded_instruments['Sepia']
+        assert clone_instrument is not calculator._param_setup.loaded_instruments['Sepia']
+        assert clone_instrument.obs_freq_ranges is \
+            calculator._param_setup.loaded_instruments['Sepia'].obs_freq_ranges
+        clone_instrument.receiver_temp_options_and_unit['values'] = [1000.0, 216.5]
+        assert calculator._param_setup.loaded_instruments['Sepia'] \
+            .receiver_temp_options_and_unit['values'][0] != 1000.0
+
+        # Resetting the clone restores the overridden values
+        clone.reset()
+        assert clone.user_input.obs_freq == obs_freq
+        assert clone.user_input.weather == 50
+
+    def test_clone_invalid(self, calculator):
+        with pytest.raises(ValueError):
+            calculator.clone(weather=100)
+        with pytest.raises(ValueError):
+            calculator.clone(dish_radius=20 * u.m)
+
+    def test_user_input_update(self, calculator, mocker, capsys):
+        calculate_derived_params_spy = \
+            mocker.spy(ParameterSetup, '_calculate_derived_parameters')
+        select_instrument_spy = \
+            mocker.spy(ParameterSetup, 'get_chosen_instrument_class')
+
+        calculator.user_input.update(obs_freq=183 * u.GHz, bandwidth=8 * u.GHz,
+                                     weather=50, t_int=10 * u.s)
+
+        assert calculator.user_input.obs_freq == 183 * u.GHz
+        assert calculator.user_input.bandwidth == 8 * u.GHz
+        assert calculator.user_input.weather == 50
+        assert calculator.user_input.t_int == 10 * u.s
+        # The instrument is selected and the derived parameters are
+        # recalculated once, without passing through FINER (183 GHz, 100 MHz)
+        assert calculator.chosen_instrument == 'Tifuun'
+        assert capsys.readouterr().out == \
+            'Instrument has been changed from Default to Tifuun.\n'
+        select_instrument_spy.assert_called_once()
+        calculate_derived_params_spy.assert_called_once()
+
+        # The result is the same as updating the parameters one at a time
+        expected_calculator = Calculator()
+        expected_calculator.user_input.obs_freq = 183 * u.GHz
+        expected_calculator.user_input.bandwidth = 8 * u.GHz
+        expected_calculator.user_input.weather = 50
+        assert calculator.derived_parameters == expected_calculator.derived_parameters
+
+    @pytest.mark.parametrize(
+        'kwargs,expected_raises',
+        [
+            ({'obs_freq': 200 * u.GHz, 'weather': 100}, pytest.raises(ValueError)),
+            ({'obs_freq': 200 * u.GHz, 'bandwidth': 5 * u.s}, pytest.raises(ValueError)),
+            ({'obs_freq': 200 * u.GHz, 'dish_radius': 20 * u.m}, pytest.raises(ValueError)),
+        ]
+    )
+    def test_user_input_update_invalid(self, kwargs, expected_raises, obs_freq,
+                                       calculator, mocker):
+        calculate_derived_params_spy = \
+            mocker.spy(ParameterSetup, '_calculate_derived_parameters')
+
+        # No parameter is updated if any of the values is invalid
+        with expected_raises:
+            calculator.user_input.update(**kwargs)
+        assert calculator.user_input.obs_freq == obs_freq
+        calculate_derived_params_spy.assert_not_called()
+
+    def test_batch_update(self, calculator, obs_freq, bandwidth, mocker):
+        calculate_derived_params_spy = \
+            mocker.spy(ParameterSetup, '_calculate_derived_parameters')
+
+        with calculator.batch_update():
+            calculator.user_input.obs_freq = 345 * u.GHz
+            calculator.user_input.bandwidth = 150 * u.MHz
+            calculator.telescope_and_environment.dish_radius = 20 * u.m
+            # Nothing is recalculated until the batch ends
+            calculate_derived_params_spy.assert_not_called()
+            assert calculator.chosen_instrument == 'Default'
+
+        calculate_derived_params_spy.assert_called_once()
+        assert calculator.chosen_instrument == 'Sepia'
+
+        # The parameters are restored if the batch update fails
+        original_derived_params = copy.deepcopy(calculator.derived_parameters)
+        with pytest.raises(ValueError):
+            with calculator.batch_update():
+                calculator.user_input.obs_freq = 183 * u.GHz
+                calculator.user_input.weather = 100
+        assert calculator.user_input.obs_freq == 345 * u.GHz
+        assert calculator.chosen_instrument == 'Sepia'
+        assert calculator.derived_parameters == original_derived_params
+        calculate_derived_params_spy.assert_called_once()
+
+    def test_batch_update_recalculation_fails(self, calculator, obs_freq, mocker):
+        original_derived_params = copy.deepcopy(calculator.derived_parameters)
+        original_instrument = calculator.chosen_instrument
+        mocker.patch.object(ParameterSetup, '_calculate_derived_parameters',
+                            side_effect=ZeroDivisionError)
+
+        # The parameters are restored if the recalculation fails
+        with pytest.raises(ZeroDivisionError):
+            with calculator.batch_update():
+                calculator.user_input.obs_freq = 345 * u.GHz
+                calculator.user_input.bandwidth = 150 * u.MHz
+        assert calculator.user_input.obs_freq == obs_freq
+        assert calculator.chosen_instrument == original_instrument
+        assert calculator.derived_parameters == original_derived_params
+
     @pytest.mark.parametrize(
         'new_t_int,update_calculator',
         [
@@ -426,6 +553,43 @@ class TestCalculator:
     #     stored_value = getattr(calculator, param)
     #     assert stored_value != calculated_value
 
+    @pytest.mark.parametrize(
+        'func_name,param,values,expected_unit',
+        [
+            ('calculate_sensitivity', 't_int', [1, 10, 100, 1000, 1e4] * u.s, u.mJy),
+            ('calculate_sensitivity', 't_int', [1e3, 1e4, 1e5, 1e6] * u.s, u.uJy),
+            ('calculate_sensitivity', 't_int', [[1, 2], [3, 4]] * u.s, u.mJy),
+            ('calculate_t_integration', 'sensitivity', [0.1, 1, 10] * u.mJy, u.min),
+            ('calculate_t_integration', 'sensitivity', [10, 100] * u.mJy, u.s),
+            ('calculate_t_integration', 'sensitivity', [5, 10, 50, 100] * u.uJy, u.h),
+        ]
+    )
+    def test_calculate_arrays(self, func_name, param, values, expected_unit, calculator):
+        original_value = getattr(calculator.user_input, param)
+        original_sensitivity = calculator.calculated_sensitivity
+        original_t_int = calculator.calculated_t_int
+
+        result = getattr(calculator, func_name)(values)
+
+        # The results are returned in a single unit...
+        assert result.shape == values.shape
+        assert result.unit == expected_unit
+        # ...and match the values calculated one at a time
+        for value, result_value in zip(values.flat, result.flat):
+            expected = getattr(calculator, func_name)(value, update_calculator=False)
+            assert result_value.to_value(expected.unit) == \
+                pytest.approx(expected.value, rel=1e-12)
+
+        # The calculator is not updated
+        assert getattr(calculator.user_input, param) == original_value
+        assert calculator.calculated_sensitivity == original_sensitivity
+        assert calculator.calculated_t_int == original_t_int
+
+    def test_calculate_arrays_invalid(self, calculator, t_int):
+        with pytest.raises(ValueError):
+            calculator.calculate_sensitivity([1, -1, 100] * u.s)
+        assert calculator.user_input.t_int == t_int
+
     def test_consistency(self, calculator):
         # Calculate the sensitivity
         integration_time = calculator.calculate_t_integration()
@@ -462,3 +626,56 @@ class TestParameterSetup:
         # Check that all the config properties are correctly mapped
         assert param_setup.calculation_inputs == param_setup._calculation_inputs
         assert param_setup._original_inputs == param_setup._calculation_inputs
+
+    @pytest.mark.parametrize(
+        'obs_freq,bandwidth,expected_instrument',
+        [
+            (345 * u.GHz, 150 * u.MHz, 'Sepia'),
+            (183 * u.GHz, 8 * u.GHz, 'Tifuun'),
+            (800 * u.GHz, 3 * u.GHz, 'Chai'),
+            (406 * u.GHz, 100 * u.MHz, 'Default'),
+        ]
+    )
+    def test_finetune_sefd(self, obs_freq, bandwidth, expected_instrument):
+        user_input = {
+            'obs_freq': {'value': obs_freq.value, 'unit': str(obs_freq.unit)},
+            'bandwidth': {'value': bandwidth.value, 'unit': str(bandwidth.unit)},
+        }
+        calculator = Calculator(user_input=user_input)
+        finetuned_calculator = Calculator(user_input=user_input, finetune=True)
+        param_setup = finetuned_calculator._param_setup
+        instrument = param_setup.chosen_instrument
+        assert instrument.name == expected_instrument
+
+        # The temperatures are still reported at the central frequency
+        derived_params = finetuned_calculator.derived_parameters
+        assert derived_params.T_sys == calculator.derived_parameters.T_sys
+        assert derived_params.T_sky == calculator.derived_parameters.T_sky
+        assert instrument.T_sys == derived_params.T_sys
+
+        # Calculate the effective SEFD one channel at a time
+        inputs = finetuned_calculator.user_input
+        env = finetuned_calculator.telescope_and_environment
+        atm = AtmosphereParams()
+        atm_freqs = atm.tau_atm_table[:, 0] * u.GHz
+        band_low = inputs.obs_freq - 0.5 * inputs.bandwidth
+        band_upp = inputs.obs_freq + 0.5 * inputs.bandwidth
+        edges = atm_freqs[(atm_freqs > band_low) & (atm_freqs < band_upp)]
+        edges = [band_low.to(u.GHz)] + list(edges) + [band_upp.to(u.GHz)]
+
+        weighted_sum = 0 * u.m**4 / u.J**2 * u.GHz
+        for low, upp in zip(edges[:-1], edges[1:]):
+            freq = 0.5 * (low + upp)
+            transmittance = atm.calculate_transmittance(freq, inputs.weather, inputs.elevation)
+            T_atm = atm.calculate_atmospheric_temperature(freq, inputs.weather)
+            temps = Temperatures(copy.deepcopy(instrument), freq, inputs.bandwidth, env.T_cmb,
+                                 env.T_amb, env.eta_eff, T_atm, transmittance, inputs.n_pol)
+            sefd = param_setup._calculate_sefd(temps.T_sys, derived_params.eta_a, env.dish_radius)
+            weighted_sum += (upp - low) / sefd**2
+        expected_sefd = np.sqrt(inputs.bandwidth / weighted_sum)
+
+        assert derived_params.sefd.to(u.J / u.m**2).value == \
+            pytest.approx(expected_sefd.to(u.J / u.m**2).value, rel=1e-10)
+        # The atmosphere varies across the band, so the result differs from
+        # the SEFD at the central frequency
+        assert derived_params.sefd != calculator.derived_parameters.sefd
@@ -0,0 +1,192 @@
+import copy
+import dataclasses
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import numpy as np
+import astropy.units as u
+from atlast_sc import core
+from atlast_sc.calculator import Calculator
+from atlast_sc.data import Validator
+from atlast_sc.derived_groups import AtmosphereParams, Efficiencies, Temperatures
+from atlast_sc.exceptions import InstrumentNotApplicableException, ValueOutOfRangeException
+
+
+class TestInputs:
+
+    def test_defaults_match_calculator(self):
+        assert core.Inputs() == Calculator().inputs
+
+    def test_immutable(self):
+        inputs = core.Inputs()
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            inputs.obs_freq = 200 * u.GHz
+
+        # The record keeps its own read-only copy of the Quantities
+        obs_freq = 200 * u.GHz
+        inputs = core.Inputs(obs_freq=obs_freq)
+        obs_freq[...] = 300 * u.GHz
+        assert inputs.obs_freq == 200 * u.GHz
+        with pytest.raises(ValueError):
+            inputs.obs_freq[...] = 300 * u.GHz
+
+    def test_validated(self):
+        with pytest.raises(ValueOutOfRangeException):
+            core.Inputs(weather=100)
+        with pytest.raises(ValueOutOfRangeException):
+            core.Inputs().replace(weather=100)
+
+    def test_replace(self, mocker):
+        inputs = core.Inputs()
+        validate_spy = mocker.spy(Validator, 'validate_field')
+
+        replaced = inputs.replace(obs_freq=150 * u.GHz, weather=50)
+
+        # Only the changed values are validated
+        assert validate_spy.call_count == 2
+        assert replaced == core.Inputs(obs_freq=150 * u.GHz, weather=50)
+        assert replaced.canonical() == core.Inputs(obs_freq=150 * u.GHz, weather=50).canonical()
+        assert inputs.obs_freq != 150 * u.GHz
+        with pytest.raises(ValueError):
+            replaced.obs_freq[...] = 300 * u.GHz
+        with pytest.raises(TypeError):
+            inputs.replace(frequency=150 * u.GHz)
+
+    def test_from_calculator(self):
+        calculator = Calculator()
+        calculator.user_input.update(obs_freq=150 * u.GHz, weather=50)
+
+        inputs = calculator.inputs
+        assert inputs.obs_freq == 150 * u.GHz
+        assert inputs.weather == 50
+        # The record does not follow later changes to the calculator
+        calculator.user_input.weather = 75
+        assert inputs.weather == 50
+
+
+class TestEvaluate:
+
+    @pytest.mark.parametrize(
+        'obs_freq,bandwidth,finetune',
+        [
+            (100 * u.GHz, 100 * u.MHz, False),
+            (150 * u.GHz, 8 * u.GHz, True),
+            (300 * u.GHz, 100 * u.MHz, False),
+            (400 * u.GHz, 1 * u.MHz, True),
+            (700 * u.GHz, 100 * u.MHz, False),
+        ]
+    )
+    def test_matches_calculator(self, obs_freq, bandwidth, finetune):
+        calculator = Calculator(finetune=finetune)
+        calculator.user_input.update(obs_freq=obs_freq, bandwidth=bandwidth)
+
+        result = core.evaluate(calculator.inputs, finetune=finetune)
+
+        assert result.derived.instrument == calculator.chosen_instrument
+        for name in ('transmittance', 'T_atm', 'eta_a', 'eta_s', 'T_sky', 'T_sys', 'sefd'):
+            value = getattr(result.derived, name)
+            expected = getattr(calculator.derived_parameters, name)
+            if isinstance(value, u.Quantity):
+                value, expected = value.value, expected.to_value(value.unit)
+            assert value == pytest.approx(expected, rel=1e-12)
+        assert result.sensitivity.to_value(u.mJy) == \
+            pytest.approx(calculator.calculate_sensitivity().to_value(u.mJy), rel=1e-12)
+        assert result.t_int.to_value(u.s) == \
+            pytest.approx(calculator.calculate_t_integration().to_value(u.s), rel=1e-12)
+
+    def test_requested_instrument(self):
+        inputs = core.Inputs(obs_freq=300 * u.GHz, bandwidth=100 * u.MHz)
+
+        assert core.evaluate(inputs).derived.instrument == 'Sepia'
+        assert core.evaluate(inputs, instrument='default').derived.instrument == 'Default'
+        with pytest.raises(InstrumentNotApplicableException):
+            core.evaluate(inputs, instrument='Muscat')
+        with pytest.raises(ValueError, match='Chai, Default, Finer, Muscat, Sepia, Tifuun'):
+            core.evaluate(inputs, instrument='Alma')
+
+    def test_shared_state_unchanged(self):
+        instrument_set = core.shared_instruments()
+        core.evaluate(core.Inputs(obs_freq=300 * u.GHz), finetune=True)
+
+        assert core.shared_instruments() is instrument_set
+        for instrument in instrument_set.instruments.values():
+            assert getattr(instrument, 'T_sys', None) is None
+            assert getattr(instrument, 'T_rx', None) is None
+
+    def test_derived_groups(self):
+        # The Quantity-boundary functions match the derived groups
+        instrument = core.shared_instruments().instruments['Sepia']
+        obs_freq = np.array([300.0, 345.0]) * u.GHz
+        atm = AtmosphereParams()
+        transmittance = core.transmittance(obs_freq, 25, 45 * u.deg)
+        T_atm = core.atmospheric_temperature(obs_freq, 25)
+        assert transmittance == pytest.approx(
+            atm.calculate_transmittance(obs_freq, 25, 45 * u.deg), rel=1e-12)
+        assert T_atm.to_value(u.K) == pytest.approx(
+            atm.calculate_atmospheric_temperature(obs_freq, 25).to_value(u.K), rel=1e-12)
+        assert core.dish_efficiency(obs_freq, 25 * u.micron, 0.8, 0.95, 0.99, 0.99) == \
+            pytest.approx(Efficiencies(obs_freq, 25 * u.micron, 0.8, 0.95, 0.99, 0.99).eta_a,
+                          rel=1e-12)
+
+        T_sky, T_sys = core.temperatures(instrument, obs_freq, 100 * u.MHz, 2.726 * u.K,
+                                         270 * u.K, 0.9, T_atm, transmittance, 2)
+        expected = Temperatures(copy.copy(instrument), obs_freq, 100 * u.MHz, 2.726 * u.K,
+                                270 * u.K, 0.9, T_atm, transmittance, 2)
+        assert T_sky.to_value(u.K) == pytest.approx(expected.T_sky.to_value(u.K), rel=1e-12)
+        assert T_sys.to_value(u.K) == pytest.approx(expected.T_sys.to_value(u.K), rel=1e-12)
+        assert getattr(instrument, 'T_sys', None) is None
+
+    def test_thread_pool(self):
+        frequencies = np.linspace(80, 360, 40)
+        inputs = [core.Inputs(obs_freq=f * u.GHz, weather=w)
+                  for f in frequencies for w in (10, 50, 90)]
+
+        expected = [core.evaluate(i) for i in inputs]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(core.evaluate, inputs))
+
+        for result, expected_result in zip(results, expected):
+            assert result.derived.instrument == expected_result.derived.instrument
+            assert result.sensitivity == expected_result.sensitivity
+
+
+class TestEvaluateChannels:
+
+    def test_matches_evaluate(self):
+        inputs = core.Inputs(weather=50, t_int=1 * u.h)
+        result = core.evaluate_channels(inputs, 'tifuun')
+
+        assert result.instrument == 'Tifuun'
+        assert len(result.obs_freq) == len(core.shared_instruments().instruments['Tifuun'].channels)
+        for name in ('bandwidth', 'transmittance', 'T_sys', 'sefd', 'sensitivity', 't_int'):
+            assert np.shape(getattr(result, name)) == result.obs_freq.shape
+
+        for i in (0, 100, 400, len(result.obs_freq) - 1):
+            channel = core.evaluate(inputs.replace(obs_freq=result.obs_freq[i],
+                                                   bandwidth=result.bandwidth[i]),
+                                    instrument='Tifuun')
+            assert result.T_sys[i].to_value(u.K) == \
+                pytest.approx(channel.derived.T_sys.to_value(u.K), rel=1e-12)
+            assert result.sefd[i].to_value(u.Jy) == \
+                pytest.approx(channel.derived.sefd.to_value(u.Jy), rel=1e-12)
+            assert result.sensitivity[i].to_value(u.mJy) == \
+                pytest.approx(channel.sensitivity.to_value(u.mJy), rel=1e-12)
+            assert result.t_int[i].to_value(u.s) == \
+                pytest.approx(channel.t_int.to_value(u.s), rel=1e-12)
+
+    def test_instrument_without_channels(self):
+        with pytest.raises(ValueError):
+            core.evaluate_channels(core.Inputs(), 'Sepia')
+
+    def test_calculator(self):
+        calculator = Calculator()
+        calculator.user_input.weather = 75
+
+        result = calculator.calculate_channels('Tifuun', t_int=10 * u.min)
+
+        assert result.inputs.weather == 75
+        assert result.inputs.t_int == 10 * u.min
+        # The calculator is not updated
+        assert calculator.user_input.t_int == 100 * u.s
+        assert result.sensitivity.unit == u.mJy
+        with pytest.raises(ValueError):
+            calculator.calculate_channels()
@@ -1,4 +1,5 @@
 import pytest
+import numpy as np
 import astropy.units as u
 from atlast_sc.data import Data, Validator
 from atlast_sc.exceptions import UnitException, ValueNotAllowedException, \
@@ -172,6 +173,23 @@ class TestValidator:
                 .assert_called_with(expect_validates_with, 't_int',
                                     test_data_types['t_int'])
 
+    @pytest.mark.parametrize(
+        'test_val,param,expected_raises',
+        [
+            ([1, 10, 100] * u.s, 't_int', does_not_raise()),
+            ([[1, 2], [3, 4]] * u.h, 't_int', does_not_raise()),
+            ([1, 0, 100] * u.s, 't_int', pytest.raises(ValueOutOfRangeException)),
+            ([1, np.inf] * u.s, 't_int', pytest.raises(ValueTooHighException)),
+            ([1, np.nan] * u.s, 't_int', pytest.raises(ValueOutOfRangeException)),
+            (np.array([1, 2, 2]), 'n_pol', does_not_raise()),
+            (np.array([1, 3]), 'n_pol', pytest.raises(ValueNotAllowedException)),
+        ]
+    )
+    def test_validate_field_array(self, test_val, param, expected_raises):
+        # Arrays of values are valid only if every value is valid
+        with expected_raises:
+            Validator.validate_field(param, test_val)
+
     @pytest.mark.parametrize(
         'test_unit,param,expected_raises',
         [
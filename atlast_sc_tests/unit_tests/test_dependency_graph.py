@@ -0,0 +1,138 @@
+import pytest
+import numpy as np
+import astropy.units as u
+from atlast_sc.cache import DerivedParamsCache
+from atlast_sc.calculator import Calculator
+from atlast_sc.dependency_graph import DependencyGraph
+
+
+class TestDependencyGraph:
+
+    @pytest.fixture()
+    def graph(self):
+        graph = DependencyGraph()
+        graph.add_node('sum', lambda a, b: a + b, ('a', 'b'))
+        graph.add_node('double', lambda c: 2 * c, ('c',))
+        graph.add_node('product', lambda sum, double: sum * double,
+                       ('sum', 'double'))
+        return graph
+
+    def test_only_invalidated_nodes_recomputed(self, graph):
+        values = graph.evaluate({'a': 1, 'b': 2, 'c': 3})
+        assert values == {'sum': 3, 'double': 6, 'product': 18}
+        assert graph.last_recomputed == ('sum', 'double', 'product')
+
+        # Nothing changed
+        graph.evaluate({'a': 1, 'b': 2, 'c': 3})
+        assert graph.last_recomputed == ()
+
+        # Changes propagate to the dependent nodes only
+        values = graph.evaluate({'a': 2, 'b': 2, 'c': 3})
+        assert values == {'sum': 4, 'double': 6, 'product': 24}
+        assert graph.last_recomputed == ('sum', 'product')
+        assert graph.recompute_counts == {'sum': 2, 'double': 1,
+                                          'product': 2}
+
+        graph.invalidate()
+        graph.evaluate({'a': 2, 'b': 2, 'c': 3})
+        assert graph.last_recomputed == ('sum', 'double', 'product')
+
+    def test_input_comparison(self, graph):
+        graph.evaluate({'a': 1 * u.GHz, 'b': 1 * u.GHz, 'c': np.ones(3)})
+
+        # Equal quantities in different units are unchanged
+        graph.evaluate({'a': 1000 * u.MHz, 'b': 1 * u.GHz, 'c': np.ones(3)})
+        assert graph.last_recomputed == ()
+
+        graph.evaluate({'a': 1000 * u.MHz, 'b': 1 * u.GHz,
+                        'c': np.array([1, 2, 1])})
+        assert graph.last_recomputed == ('double', 'product')
+
+    def test_copy_values(self, graph):
+        graph.evaluate({'a': 1, 'b': 2, 'c': 3})
+        other = DependencyGraph()
+        other.add_node('sum', lambda a, b: a + b, ('a', 'b'))
+        other.add_node('double', lambda c: 2 * c, ('c',))
+        other.add_node('product', lambda sum, double: sum * double,
+                       ('sum', 'double'))
+
+        other.copy_values(graph, c=3.0)
+        other.evaluate({'a': 1, 'b': 2, 'c': 3.0})
+        assert other.last_recomputed == ()
+
+        with pytest.raises(ValueError):
+            DependencyGraph().copy_values(graph)
+
+    def test_duplicate_node(self, graph):
+        with pytest.raises(ValueError):
+            graph.add_node('sum', lambda a: a, ('a',))
+
+
+class TestDerivedParametersGraph:
+
+    @pytest.fixture(autouse=True)
+    def no_derived_params_cache(self):
+        # Calculations taken from the cache do not use the graph
+        maxsize = DerivedParamsCache.stats().maxsize
+        DerivedParamsCache.configure(0)
+        yield
+        DerivedParamsCache.configure(maxsize)
+
+    @pytest.mark.parametrize(
+        'param_class,param,new_value,expected_recomputed',
+        [
+            ('telescope_and_environment', 'dish_radius', 20 * u.m,
+             ('sefd',)),
+            ('user_input', 'elevation', 60 * u.deg,
+             ('transmittance', 'temperatures', 'channel_T_sys', 'sefd')),
+            ('user_input', 'weather', 50,
+             ('transmittance', 'T_atm', 'temperatures', 'channel_T_sys',
+              'sefd')),
+            ('user_input', 'bandwidth', 50 * u.MHz,
+             ('temperatures', 'channel_T_sys', 'sefd')),
+            ('user_input', 'obs_freq', 200 * u.GHz,
+             ('efficiencies', 'transmittance', 'T_atm', 'temperatures',
+              'channel_T_sys', 'sefd')),
+        ]
+    )
+    def test_recomputed_nodes(self, param_class, param, new_value,
+                              expected_recomputed):
+        calculator = Calculator()
+        graph = calculator._param_setup.dependency_graph
+        counts = graph.recompute_counts
+
+        setattr(getattr(calculator, param_class), param, new_value)
+
+        assert graph.last_recomputed == expected_recomputed
+        for node, count in graph.recompute_counts.items():
+            expected_count = counts[node] + (node in expected_recomputed)
+            assert count == expected_count
+
+        # The derived parameters are the same as for a full calculation
+        new_calculator = Calculator()
+        setattr(getattr(new_calculator, param_class), param, new_value)
+        new_calculator._param_setup.dependency_graph.invalidate()
+        new_calculator._param_setup._calculate_derived_parameters()
+        assert calculator._param_setup.derived_parameters_model == \
+            new_calculator._param_setup.derived_parameters_model
+
+    def test_chosen_instrument_kept(self, capsys):
+        calculator = Calculator()
+        calculator.user_input.obs_freq = 300 * u.GHz
+        calculator.chosen_instrument = 'Finer'
+        capsys.readouterr()
+
+        # Changing the weather does not reselect the instrument
+        calculator.user_input.weather = 50
+        assert calculator.chosen_instrument == 'Finer'
+        assert capsys.readouterr().out == ''
+        assert calculator._param_setup.dependency_graph.last_recomputed == \
+            ('transmittance', 'T_atm', 'temperatures', 'channel_T_sys', 'sefd')
+
+    def test_clone_recomputes_overrides_only(self):
+        calculator = Calculator()
+
+        clone = calculator.clone(weather=50)
+
+        assert clone._param_setup.dependency_graph.last_recomputed == \
+            ('transmittance', 'T_atm', 'temperatures', 'channel_T_sys', 'sefd')
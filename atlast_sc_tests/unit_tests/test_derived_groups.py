@@ -1,4 +1,5 @@
 import pytest
+import numpy as np
 import astropy.units as u
 from atlast_sc.derived_groups import AtmosphereParams, Temperatures, \
     Efficiencies
@@ -11,6 +12,49 @@ class TestAtmosphereParams:
         # Nothing to test here
         assert True
 
+    def test_vectorised_calculations(self, atmosphere_params):
+        obs_freqs = np.array([100.0, 406.0, 850.0]) * u.GHz
+        weathers = np.array([5.0, 25.0, 60.0])
+        elevations = np.array([30.0, 45.0, 80.0]) * u.deg
+
+        T_atm = atmosphere_params.calculate_atmospheric_temperature(
+            obs_freqs, weathers)
+        transmittance = atmosphere_params.calculate_transmittance(
+            obs_freqs, weathers, elevations)
+
+        assert T_atm.shape == transmittance.shape == (3,)
+        assert T_atm.unit == u.K
+        # Check the arrays match the values calculated one at a time
+        for i in range(3):
+            assert T_atm[i] == atmosphere_params.\
+                calculate_atmospheric_temperature(obs_freqs[i], weathers[i])
+            assert transmittance[i] == pytest.approx(
+                atmosphere_params.calculate_transmittance(
+                    obs_freqs[i], weathers[i], elevations[i]), rel=1e-12)
+
+    def test_broadcasting_and_units(self, atmosphere_params):
+        # A transmission curve for several weather values in one call
+        obs_freqs = np.linspace(30, 1000, 1001) * u.GHz
+        weathers = np.array([5.0, 50.0, 95.0])
+        transmittance = atmosphere_params.calculate_transmittance(
+            obs_freqs[:, np.newaxis], weathers, 45 * u.deg)
+        assert transmittance.shape == (1001, 3)
+        assert np.all((transmittance >= 0) & (transmittance < 1))
+
+        # Frequencies are converted to GHz, and unitless values are
+        # interpreted as GHz and degrees
+        scalar_transmittance = atmosphere_params.calculate_transmittance(
+            406 * u.GHz, 25, 45 * u.deg)
+        assert isinstance(scalar_transmittance, float)
+        assert atmosphere_params.calculate_transmittance(
+            406000 * u.MHz, 25, 45 * u.deg) == scalar_transmittance
+        assert atmosphere_params.calculate_transmittance(406, 25, 45) == \
+            pytest.approx(scalar_transmittance, rel=1e-12)
+        assert atmosphere_params.calculate_atmospheric_temperature(
+            406000 * u.MHz, 25) == \
+            atmosphere_params.calculate_atmospheric_temperature(406 * u.GHz,
+                                                                25)
+
 
 class TestEfficiencies:
 
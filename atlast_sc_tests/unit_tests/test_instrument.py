@@ -0,0 +1,322 @@
+from types import SimpleNamespace
+import pytest
+import numpy as np
+import astropy.units as u
+from atlast_sc.calculator import Calculator
+from atlast_sc.instrument import parse_ranges, Instrument, InstrumentChannels, \
+    InstrumentRangeIndex, ReceiverTemperatureCurve, HeterodyneInstrument
+from atlast_sc.instruments.config import InstrumentRegistry
+from atlast_sc_tests.utils import reference_system_temperature
+
+
+class TestParseRanges:
+
+    @pytest.mark.parametrize(
+        'ranges,unit,to_unit,expected',
+        [
+            (['(272.0-330.0)', '(330.0-376.0)'], 'GHz', None,
+             [[272, 330], [330, 376]]),
+            (['(6.1e4-4e9)'], 'Hz', None, [[6.1e4, 4e9]]),
+            (['(0.18-10)'], 'GHz', u.Hz, [[1.8e8, 1e10]]),
+            (['( 1E-3 - 2.5 )'], 'GHz', u.MHz, [[1, 2500]]),
+            ('(10-80)', 'GHz', None, [[10, 80]]),
+            ([], 'MHz', u.Hz, np.empty((0, 2))),
+        ]
+    )
+    def test_parse_ranges(self, ranges, unit, to_unit, expected):
+        limits = parse_ranges(ranges, unit, to_unit)
+        assert limits.shape == np.shape(expected)
+        assert np.allclose(limits, expected, rtol=1e-12)
+        assert not limits.flags.writeable
+
+    @pytest.mark.parametrize('ranges', [['272.0-330.0'], ['(272.0,330.0)'], ['(a-b)']])
+    def test_invalid_ranges(self, ranges):
+        with pytest.raises(ValueError):
+            parse_ranges(ranges)
+
+
+class TestInstrumentRangeIndex:
+
+    @pytest.fixture()
+    def instruments(self):
+        return InstrumentRegistry.create_instruments()
+
+    @staticmethod
+    def select_one_at_a_time(instruments, obs_freq, bandwidth):
+        # Reference implementation of the instrument selection rule
+        applicable = []
+        for name, instrument in instruments.items():
+            obs_freq_ok = any(low <= obs_freq.to_value(u.GHz) <= high
+                              for low, high in instrument.obs_freq_ranges)
+            bandwidth_ok = any(low <= bandwidth.to_value(u.Hz) <= high
+                               for low, high in instrument.bandwidth_ranges)
+            if obs_freq_ok and bandwidth_ok:
+                applicable.append(name)
+        applicable = sorted(applicable)
+        if len(applicable) > 1:
+            return applicable[1]
+        if len(applicable) == 1:
+            return applicable[0]
+        return 'Default'
+
+    def test_select_matches_scalar_rule(self, instruments):
+        index = InstrumentRangeIndex(instruments)
+
+        rng = np.random.default_rng(2)
+        obs_freqs = np.concatenate((rng.uniform(30, 1000, 2000),
+                                    [90, 120, 210, 255, 272, 330, 360, 376, 460, 500])) * u.GHz
+        bandwidths = 10 ** rng.uniform(4, 11, len(obs_freqs)) * u.Hz
+        bandwidths[-10:] = [6.1e4, 8.8e4, 1.8e8, 1e10, 4e9, 6.25e4, 1.8e8, 2e8, 1e5, 1e9] * u.Hz
+
+        names = index.select(obs_freqs, bandwidths)
+        assert names.shape == obs_freqs.shape
+        expected = [self.select_one_at_a_time(instruments, obs_freq, bandwidth)
+                    for obs_freq, bandwidth in zip(obs_freqs, bandwidths)]
+        assert list(names) == expected
+        # Every instrument is chosen for some of the configurations
+        assert set(names) == set(instruments)
+
+        # Scalar queries return a single name
+        assert index.select(345 * u.GHz, 150 * u.MHz) == 'Sepia'
+        assert index.select(345000 * u.MHz, 0.15 * u.GHz) == 'Sepia'
+
+    def test_applicable_broadcasts(self, instruments):
+        index = InstrumentRangeIndex(instruments)
+        obs_freqs = np.array([100, 300, 800]) * u.GHz
+        bandwidths = np.array([1, 100, 8000]) * u.MHz
+
+        applicable = index.applicable(obs_freqs[:, np.newaxis], bandwidths)
+        assert applicable.shape == (3, 3, len(instruments))
+        assert index.names == tuple(sorted(instruments))
+
+        # 300 GHz and 100 MHz is covered by FINER and SEPIA (and not by the
+        # default instrument, which has no bandwidth ranges)
+        covering = {name for name, covers in zip(index.names, applicable[1, 1]) if covers}
+        assert covering == {'Finer', 'Sepia'}
+        assert index.is_applicable('Sepia', 300 * u.GHz, 100 * u.MHz)
+        assert not index.is_applicable('Sepia', 300 * u.GHz, 1 * u.GHz)
+
+    def test_find_applicable_instruments(self):
+        calculator = Calculator()
+        param_setup = calculator._param_setup
+        assert param_setup.find_applicable_instruments(183 * u.GHz, 8 * u.GHz) == 'Tifuun'
+
+        obs_freqs = np.array([183, 345, 800]) * u.GHz
+        assert list(param_setup.find_applicable_instruments(obs_freqs, 150 * u.MHz)) == \
+            ['Finer', 'Sepia', 'Chai']
+
+
+class ScalarInstrument(Instrument):
+    """
+    Instrument whose calculation only supports scalars
+    """
+    def calculate_system_temperature(self, obs_freq, bandwidth, eta_eff,
+                                     T_amb, T_sky, transmittance, n_pol):
+        T_rx = 50 * u.K if obs_freq.value < 300 else 100 * u.K
+        self.T_sys = (T_rx + T_sky) / (eta_eff * transmittance)
+        return self.T_sys
+
+
+class TestSystemTemperatureArrays:
+
+    @pytest.fixture()
+    def instruments(self):
+        return InstrumentRegistry.create_instruments()
+
+    @staticmethod
+    def grid(instrument):
+        # Frequencies within the instrument ranges, broadcast against the
+        # bandwidths and the sky parameters
+        low, high = instrument.obs_freq_ranges[0]
+        obs_freq = np.linspace(low, high, 4)[:, np.newaxis] * u.GHz
+        if len(instrument.bandwidth_ranges):
+            low, high = instrument.bandwidth_ranges[0]
+        else:
+            low, high = 1e6, 1e9
+        bandwidth = np.geomspace(low, high, 3) * u.Hz
+        T_sky = np.array([[20.0], [40.0], [60.0], [80.0]]) * u.K
+        transmittance = np.array([0.9, 0.7, 0.5])
+        n_pol = np.array([[1], [2], [1], [2]])
+        return obs_freq, bandwidth, T_sky, transmittance, n_pol
+
+    @staticmethod
+    def one_at_a_time(instrument, obs_freq, bandwidth, T_sky, transmittance, n_pol):
+        args = np.broadcast_arrays(obs_freq, bandwidth, T_sky, transmittance, n_pol,
+                                   subok=True)
+        temps = [reference_system_temperature(instrument, o, b, 0.95, 270 * u.K, t, tr,
+                                              n).to_value(u.K)
+                 for o, b, t, tr, n in zip(*(arg.ravel() for arg in args))]
+        return np.reshape(temps, args[0].shape)
+
+    @pytest.mark.parametrize('name', ['Default', 'Chai', 'Finer', 'Muscat', 'Sepia', 'Tifuun'])
+    def test_arrays_match_scalars(self, instruments, name):
+        instrument = instruments[name]
+        obs_freq, bandwidth, T_sky, transmittance, n_pol = self.grid(instrument)
+
+        T_sys = instrument.calculate_system_temperature(obs_freq, bandwidth, 0.95, 270 * u.K,
+                                                        T_sky, transmittance, n_pol)
+
+        assert T_sys.shape == (4, 3)
+        assert instrument.T_sys is T_sys
+        assert T_sys.to_value(u.K) == pytest.approx(
+            self.one_at_a_time(instrument, obs_freq, bandwidth, T_sky, transmittance, n_pol),
+            rel=1e-12)
+
+    def test_receiver_temperature_arrays(self, instruments):
+        # SEPIA has a constant receiver temperature over its first range and
+        # a linear rise over the second
+        sepia = instruments['Sepia']
+        obs_freq = np.array([[272, 330], [353, 376]]) * u.GHz
+        T_rx = sepia.receiver_temperature(obs_freq)
+        assert T_rx.shape == (2, 2)
+        for index in np.ndindex(obs_freq.shape):
+            assert T_rx[index] == sepia.receiver_temperature(obs_freq[index])
+
+        # Frequencies outside the ranges use the nearest range, for scalars
+        # and arrays alike
+        outside = np.array([250, 400]) * u.GHz
+        assert sepia.receiver_temperature(400 * u.GHz) == 216.5 * u.K
+        assert np.array_equal(sepia.receiver_temperature(outside), [90, 216.5] * u.K)
+        chai = instruments['Chai']
+        assert chai.receiver_temperature(600 * u.GHz) == 100 * u.K
+        assert chai.receiver_temperature(700 * u.GHz) == 200 * u.K
+        assert np.array_equal(chai.receiver_temperature([600, 700] * u.GHz),
+                              [100, 200] * u.K)
+
+    def test_heterodyne_instruments(self, instruments):
+        # The heterodynes share one calculation, differing by their receiver
+        # temperature and sideband factor
+        heterodynes = {name for name, instrument in instruments.items()
+                       if isinstance(instrument, HeterodyneInstrument)}
+        assert heterodynes == {'Chai', 'Default', 'Finer', 'Sepia'}
+        assert instruments['Chai'].sideband_factor == 1 + instruments['Chai'].g
+        assert instruments['Finer'].sideband_factor == 1
+
+    def test_scalar_only_instrument(self, instruments):
+        # The base class evaluates scalar-only calculations one combination
+        # at a time, which is deprecated
+        instrument = ScalarInstrument(instruments['Default'].data)
+        obs_freq = np.array([[100], [400]]) * u.GHz
+        T_sky = np.array([10, 20, 30]) * u.K
+
+        with pytest.warns(DeprecationWarning, match='ScalarInstrument'):
+            T_sys = instrument.system_temperature(obs_freq, 1 * u.GHz, 0.5, 270 * u.K,
+                                                  T_sky, 0.5, 2)
+
+        assert T_sys.unit == u.K
+        assert np.allclose(T_sys.value, [[240, 280, 320], [440, 480, 520]])
+        with pytest.warns(DeprecationWarning):
+            assert instrument.system_temperature(100 * u.GHz, 1 * u.GHz, 0.5, 270 * u.K,
+                                                 10 * u.K, 0.5, 2) == 240 * u.K
+        # Nothing is recorded on the instrument
+        assert getattr(instrument, 'T_sys', None) is None
+
+
+class TestReceiverTemperatureCurve:
+
+    # The SEPIA ramp written as a table
+    SEPIA_CURVE = {'frequencies': [272.0, 330.0, 376.0], 'values': [90.0, 90.0, 216.5],
+                   'frequency_unit': 'GHz', 'unit': 'K'}
+
+    @staticmethod
+    def create_instrument(name, curve):
+        definition = InstrumentRegistry.get()[name]
+        data = definition.copy_data()
+        data['receiver_temperature_curve'] = curve
+        return definition.instrument_class(data=SimpleNamespace(**data))
+
+    def test_interpolation(self):
+        curve = ReceiverTemperatureCurve([0.3, 0.4, 0.5], [100, 50, 80], 'THz', 'K')
+
+        assert np.array_equal(curve.frequencies, [300, 400, 500])
+        assert curve(350) == 75
+        assert isinstance(curve(350), float)
+        # Frequencies outside the table use the nearest end
+        assert np.array_equal(curve(np.array([[200, 450], [500, 600]])),
+                              [[100, 65], [80, 80]])
+        assert not curve.temperatures.flags.writeable
+
+    @pytest.mark.parametrize(
+        'frequencies,values',
+        [
+            ([100, 200], [50]),
+            ([100], [50]),
+            ([200, 100], [50, 60]),
+            ([100, 100], [50, 60]),
+            ([100, np.nan], [50, 60]),
+        ]
+    )
+    def test_invalid_curve(self, frequencies, values):
+        with pytest.raises(ValueError):
+            ReceiverTemperatureCurve(frequencies, values)
+
+    def test_no_curve_by_default(self):
+        for instrument in InstrumentRegistry.create_instruments().values():
+            assert instrument.receiver_temperature_curve is None
+
+    def test_curve_replaces_yaml_values(self):
+        sepia = InstrumentRegistry.create_instruments()['Sepia']
+        tabulated = self.create_instrument('Sepia', self.SEPIA_CURVE)
+        obs_freq = np.linspace(272, 376, 27) * u.GHz
+
+        # The table reproduces the built-in ramp
+        assert tabulated.receiver_temperature(obs_freq).to_value(u.K) == \
+            pytest.approx(sepia.receiver_temperature(obs_freq).to_value(u.K), rel=1e-12)
+        assert tabulated.receiver_temperature_kernel(345e9) == \
+            pytest.approx(sepia.receiver_temperature(345 * u.GHz).value, rel=1e-12)
+
+    def test_measured_curve(self):
+        curve = {'frequencies': [460, 480, 500, 780, 800, 820],
+                 'values': [120, 90, 130, 250, 180, 260], 'unit': 'K'}
+        chai = self.create_instrument('Chai', curve)
+
+        assert chai.receiver_temperature(470 * u.GHz) == 105 * u.K
+        T_sys = chai.system_temperature(np.array([470, 790]) * u.GHz, 1 * u.GHz, 0.95,
+                                        270 * u.K, 20 * u.K, 0.9, 2)
+        expected = [chai.system_temperature(f * u.GHz, 1 * u.GHz, 0.95, 270 * u.K,
+                                            20 * u.K, 0.9, 2).value for f in (470, 790)]
+        assert T_sys.value == pytest.approx(expected, rel=1e-12)
+
+
+class TestInstrumentChannels:
+
+    def test_from_resolution(self):
+        channels = InstrumentChannels.from_resolution(np.array([[100.0, 110.0]]), 100)
+
+        assert channels.centres[0] == 100
+        assert channels.centres[-1] <= 110
+        assert channels.centres[-1] * 1.01 > 110
+        # Each channel is one width wide and spaced by one width
+        assert channels.widths == pytest.approx(channels.centres / 100, rel=1e-12)
+        assert np.diff(channels.centres) == pytest.approx(channels.widths[:-1], rel=1e-12)
+
+    def test_from_data(self):
+        channels = InstrumentChannels.from_data(
+            {'centres': [100, 100.5], 'widths': [500, 500], 'unit': 'MHz'},
+            np.array([[0.1, 0.2]]))
+        assert np.array_equal(channels.centres, [0.1, 0.1005])
+        assert np.array_equal(channels.widths, [0.5, 0.5])
+        assert not channels.centres.flags.writeable
+
+        channels = InstrumentChannels.from_data({'spectral_resolution': 10},
+                                                np.array([[100.0, 200.0]]))
+        assert len(channels) == 8
+
+    @pytest.mark.parametrize(
+        'centres,widths',
+        [([100, 200], [1]), ([], []), ([100, 200], [1, -1])]
+    )
+    def test_invalid_channels(self, centres, widths):
+        with pytest.raises(ValueError):
+            InstrumentChannels(centres, widths)
+        with pytest.raises(ValueError):
+            InstrumentChannels.from_resolution(np.array([[100.0, 200.0]]), 0)
+
+    def test_instrument_channels(self):
+        instruments = InstrumentRegistry.create_instruments()
+        # TIFUUN is a filterbank with a spectral resolution of 500
+        channels = instruments['Tifuun'].channels
+        assert channels.centres[0] == 90
+        assert channels.centres[-1] <= 360
+        assert channels.widths[0] == pytest.approx(0.18)
+        assert instruments['Sepia'].channels is None
@@ -0,0 +1,107 @@
+import dataclasses
+import pytest
+import astropy.units as u
+from atlast_sc.calculator import Calculator
+from atlast_sc.instrument import Instrument
+from atlast_sc.instruments.config import InstrumentConfig, InstrumentRegistry
+
+
+class TestInstrumentRegistry:
+
+    def test_instruments_loaded_once(self):
+        InstrumentRegistry.get()
+        load_count = InstrumentRegistry.load_count()
+
+        calculator_1 = Calculator()
+        calculator_2 = Calculator()
+        InstrumentConfig()
+
+        assert InstrumentRegistry.load_count() == load_count
+        assert set(InstrumentRegistry.get()) == \
+            {'Default', 'Chai', 'Finer', 'Muscat', 'Sepia', 'Tifuun'}
+
+        # Each calculator has its own instrument objects, sharing the parsed
+        # values and the range index
+        instruments_1 = calculator_1._param_setup.loaded_instruments
+        instruments_2 = calculator_2._param_setup.loaded_instruments
+        for name in instruments_1:
+            assert instruments_1[name] is not instruments_2[name]
+            assert instruments_1[name].data is not instruments_2[name].data
+            assert instruments_1[name].obs_freq_ranges is instruments_2[name].obs_freq_ranges
+            assert instruments_1[name].channels is instruments_2[name].channels
+        assert calculator_1._param_setup._instrument_range_index is \
+            calculator_2._param_setup._instrument_range_index
+
+    def test_instruments_not_populated_again(self, mocker):
+        InstrumentRegistry.get()
+        init_spy = mocker.spy(Instrument, '__init__')
+
+        calculator = Calculator()
+        calculator.clone(weather=30)
+
+        init_spy.assert_not_called()
+
+    def test_instruments_are_independent(self):
+        calculator_1 = Calculator()
+        calculator_2 = Calculator()
+
+        # Changing the state of one calculator's instrument does not affect
+        # the other calculators or the shared definitions
+        sepia = calculator_1._param_setup.loaded_instruments['Sepia']
+        # The values read from the YAML file are shared and read-only...
+        with pytest.raises(TypeError):
+            sepia.receiver_temp_options_and_unit['values'][0] = 1000.0
+        # ...but they can be replaced
+        sepia.receiver_temp_options_and_unit['values'] = [1000.0, 216.5]
+        calculator_1.user_input.obs_freq = 300 * u.GHz
+        calculator_1.user_input.bandwidth = 150 * u.MHz
+        calculator_2.user_input.obs_freq = 300 * u.GHz
+        calculator_2.user_input.bandwidth = 150 * u.MHz
+
+        assert calculator_1._param_setup.chosen_instrument.T_rx == 1000 * u.K
+        assert calculator_2._param_setup.chosen_instrument.T_rx == 90 * u.K
+        assert InstrumentRegistry.get()['Sepia'].data[
+                   'receiver_temperature']['values'][0] == 90.0
+        assert InstrumentRegistry.get()['Sepia'].instrument \
+            .receiver_temp_options_and_unit['values'][0] == 90.0
+
+    def test_definitions_are_read_only(self):
+        definition = InstrumentRegistry.get()['Default']
+
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            definition.name = 'Test'
+        with pytest.raises(TypeError):
+            definition.data['name'] = 'Test'
+        with pytest.raises(TypeError):
+            InstrumentRegistry.get()['Test'] = definition
+
+        # The nested data is read-only too
+        data = InstrumentRegistry.get()['Sepia'].data
+        with pytest.raises(TypeError):
+            data['receiver_temperature']['values'][0] = 999
+        with pytest.raises(TypeError):
+            data['receiver_temperature']['unit'] = 'mK'
+        # and the instruments get modifiable copies
+        sepia = InstrumentRegistry.get()['Sepia'].create_instrument()
+        assert isinstance(sepia.data.receiver_temperature['values'], list)
+
+    def test_refresh_and_invalidate(self):
+        original_definitions = InstrumentRegistry.get()
+        load_count = InstrumentRegistry.load_count()
+
+        refreshed_definitions = InstrumentRegistry.refresh()
+        assert InstrumentRegistry.load_count() == load_count + 1
+        assert refreshed_definitions is not original_definitions
+        assert InstrumentRegistry.get() is refreshed_definitions
+        assert refreshed_definitions['Finer'].data == \
+            original_definitions['Finer'].data
+
+        # Calculators created after the refresh use the new classes
+        calculator = Calculator()
+        finer = calculator._param_setup.loaded_instruments['Finer']
+        assert type(finer) is refreshed_definitions['Finer'].instrument_class
+
+        InstrumentRegistry.invalidate()
+        assert InstrumentRegistry.load_count() == load_count + 1
+        Calculator()
+        assert InstrumentRegistry.load_count() == load_count + 2
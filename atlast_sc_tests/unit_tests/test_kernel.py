@@ -0,0 +1,196 @@
+import pytest
+import numpy as np
+import astropy.units as u
+from atlast_sc import core, kernel
+from atlast_sc.derived_groups import AtmosphereParams, Efficiencies, noise_temperature
+from atlast_sc_tests.utils import reference_system_temperature
+
+INSTRUMENTS = ('Default', 'Chai', 'Finer', 'Muscat', 'Sepia', 'Tifuun')
+
+
+def random_points(instrument, size, seed=0):
+    """
+    Random observing frequencies (GHz), bandwidths (Hz), weathers,
+    elevations (deg) and numbers of polarisations, within the ranges of the
+    instrument.
+    """
+    rng = np.random.default_rng(seed)
+    obs_freq_ranges = instrument.obs_freq_ranges
+    low, upp = obs_freq_ranges[rng.integers(len(obs_freq_ranges), size=size)].T
+    obs_freq = rng.uniform(low, upp)
+    if len(instrument.bandwidth_ranges):
+        bandwidth = rng.uniform(*instrument.bandwidth_ranges[0], size=size)
+    else:
+        bandwidth = rng.uniform(1e6, 1e9, size=size)
+    weather = rng.uniform(5, 95, size=size)
+    elevation = rng.uniform(25, 85, size=size)
+    n_pol = rng.choice([1, 2], size=size)
+    return obs_freq, bandwidth, weather, elevation, n_pol
+
+
+@pytest.fixture(scope='module')
+def instruments():
+    return core.shared_instruments().instruments
+
+
+class TestSystemTemperatureKernel:
+
+    @pytest.mark.parametrize('name', INSTRUMENTS)
+    @pytest.mark.parametrize('size', [None, 25])
+    def test_matches_reference(self, instruments, name, size):
+        # The kernel agrees with the original Quantity formulas
+        instrument = instruments[name]
+        obs_freq, bandwidth, weather, elevation, n_pol = random_points(instrument, size)
+        transmittance, T_atm = kernel.atmosphere(obs_freq * 1e9, weather, elevation)
+        T_sky = kernel.sky_temperature(T_atm, transmittance, 2.726, obs_freq * 1e9)
+
+        T_sys = instrument.system_temperature_kernel(obs_freq * 1e9, bandwidth, 0.9, 270.0,
+                                                     T_sky, transmittance, n_pol)
+
+        assert np.shape(T_sys) == np.shape(obs_freq)
+        points = np.broadcast_arrays(obs_freq, bandwidth, T_sky, transmittance, n_pol)
+        expected = [reference_system_temperature(instrument, o * u.GHz, b * u.Hz, 0.9,
+                                                 270.0 * u.K, t * u.K, tr, n).to_value(u.K)
+                    for o, b, t, tr, n in zip(*(point.ravel() for point in points))]
+        assert np.ravel(T_sys) == pytest.approx(expected, rel=1e-12)
+
+    @pytest.mark.parametrize(
+        'name,obs_freq,bandwidth,eta_eff,T_amb,T_sky,transmittance,n_pol,expected',
+        [
+            # Values calculated with the original instrument classes
+            ('Default', 150, 1e8, 0.95, 270, 40, 0.8, 2, 114.88835680688305),
+            ('Default', 900, 1e8, 0.9, 280, 80, 0.5, 1, 697.4706272225155),
+            ('Chai', 480, 1e8, 0.95, 270, 40, 0.8, 2, 397.1902085640806),
+            ('Chai', 800, 1e8, 0.9, 280, 80, 0.5, 1, 1324.9962706803801),
+            ('Finer', 300, 1e8, 0.95, 270, 40, 0.8, 2, 165.9779679062419),
+            ('Finer', 150, 1e8, 0.9, 280, 80, 0.5, 1, 321.4257758290914),
+            ('Muscat', 270, 30e9, 0.95, 270, 40, 0.8, 2, 115.83557743206116),
+            ('Muscat', 290, 10e9, 0.9, 280, 80, 0.5, 1, 315.8983554975183),
+            ('Sepia', 350, 1e8, 0.95, 270, 40, 0.8, 2, 258.00581596344205),
+            ('Sepia', 300, 1e8, 0.9, 280, 80, 0.5, 1, 420.6361838877316),
+            ('Tifuun', 200, 5e9, 0.95, 270, 40, 0.8, 2, 124.70898202622159),
+            ('Tifuun', 350, 0.5e9, 0.9, 280, 80, 0.5, 1, 359.64396428260505),
+        ]
+    )
+    def test_original_values(self, instruments, name, obs_freq, bandwidth, eta_eff, T_amb,
+                             T_sky, transmittance, n_pol, expected):
+        instrument = instruments[name]
+        T_sys = instrument.system_temperature_kernel(obs_freq * 1e9, bandwidth, eta_eff, T_amb,
+                                                     T_sky, transmittance, n_pol)
+
+        assert T_sys == pytest.approx(expected, rel=1e-12)
+        assert reference_system_temperature(
+            instrument, obs_freq * u.GHz, bandwidth * u.Hz, eta_eff, T_amb * u.K, T_sky * u.K,
+            transmittance, n_pol).to_value(u.K) == pytest.approx(expected, rel=1e-12)
+
+    @pytest.mark.parametrize('name', INSTRUMENTS)
+    def test_quantity_wrapper_converts_units(self, instruments, name):
+        # system_temperature converts the Quantities and calls the kernel
+        instrument = instruments[name]
+        obs_freq, bandwidth, weather, elevation, n_pol = random_points(instrument, 5)
+        T_sys = instrument.system_temperature((obs_freq * u.GHz).to(u.MHz),
+                                              (bandwidth * u.Hz).to(u.GHz), 0.9,
+                                              (270 * u.K).to(u.mK), 50 * u.K, 0.8, n_pol)
+
+        assert T_sys.unit == u.K
+        assert T_sys.value == pytest.approx(instrument.system_temperature_kernel(
+            obs_freq * 1e9, bandwidth, 0.9, 270.0, 50.0, 0.8, n_pol), rel=1e-12)
+
+    def test_base_class_fallback(self, instruments):
+        # The base class converts the values to Quantities
+        instrument = instruments['Sepia']
+        T_sys = super(type(instrument), instrument).system_temperature_kernel(
+            300e9, 1e8, 0.9, 270.0, 50.0, 0.8, 2)
+
+        assert T_sys == pytest.approx(
+            instrument.system_temperature_kernel(300e9, 1e8, 0.9, 270.0, 50.0, 0.8, 2),
+            rel=1e-12)
+
+
+class TestKernelFunctions:
+
+    def test_noise_temperature(self):
+        frequency = np.array([35.0, 300.0, 950.0])
+        assert kernel.noise_temperature(2.726, frequency * 1e9) == pytest.approx(
+            noise_temperature(2.726 * u.K, frequency * u.GHz).to_value(u.K), rel=1e-12)
+
+    def test_dish_efficiency(self):
+        obs_freq = np.array([35.0, 300.0, 950.0])
+        expected = Efficiencies(obs_freq * u.GHz, 25 * u.micron, 0.8, 0.95, 0.99, 0.99).eta_a
+
+        assert kernel.dish_efficiency(obs_freq * 1e9, 25e-6, 0.8, 0.95, 0.99, 0.99) == \
+            pytest.approx(expected, rel=1e-12)
+
+    def test_atmosphere(self):
+        obs_freq = np.array([100.0, 406.0, 850.0])
+        weather = np.array([5.0, 25.0, 60.0])
+        elevation = np.array([30.0, 45.0, 80.0])
+        atm = AtmosphereParams()
+
+        transmittance, T_atm = kernel.atmosphere(obs_freq * 1e9, weather, elevation)
+
+        assert transmittance == pytest.approx(
+            atm.calculate_transmittance(obs_freq * u.GHz, weather, elevation * u.deg), rel=1e-12)
+        assert T_atm == pytest.approx(
+            atm.calculate_atmospheric_temperature(obs_freq * u.GHz, weather).to_value(u.K),
+            rel=1e-12)
+        # A single point gives floats
+        assert isinstance(kernel.atmosphere(100e9, 25, 45)[0], float)
+
+    def test_sefd(self):
+        T_sys = np.array([50.0, 150.0, 1000.0])
+        expected = core.calculate_sefd(T_sys * u.K, 0.7, 25 * u.m)
+
+        assert kernel.sefd(T_sys, 0.7, 25.0) == pytest.approx(expected.to_value(u.Jy),
+                                                              rel=1e-12)
+
+    def test_band_channels(self):
+        first, centres, widths = kernel.band_channels(np.array([100e9, 300e9]),
+                                                      np.array([15e6, 1e9]))
+
+        assert first.tolist() == [0, 2]
+        # The channels cover each band
+        assert widths[:2].sum() == pytest.approx(15e6)
+        assert widths[2:].sum() == pytest.approx(1e9)
+        assert centres[0] - widths[0] / 2 == pytest.approx(100e9 - 7.5e6)
+        assert centres[-1] + widths[-1] / 2 == pytest.approx(300.5e9)
+
+    @pytest.mark.parametrize('max_channels', [kernel.MAX_CHANNELS, 500])
+    def test_effective_sefds(self, instruments, monkeypatch, max_channels):
+        # Evaluated in several chunks with the smaller maximum
+        monkeypatch.setattr(kernel, 'MAX_CHANNELS', max_channels)
+        instrument = instruments['Default']
+        obs_freq = np.array([[150e9, 400e9, 850e9]])
+        bandwidth = np.array([[1e6], [1e9], [8e9]])
+
+        sefd = kernel.effective_sefds(instrument, obs_freq, bandwidth, 25, 45, 2.726, 270,
+                                      0.9, 2, 0.7, 25)
+
+        assert sefd.shape == (3, 3)
+        for index in np.ndindex(sefd.shape):
+            channel_T_sys = kernel.channel_system_temperatures(
+                instrument, obs_freq[0, index[1]], bandwidth[index[0], 0], 25, 45, 2.726,
+                270, 0.9, 2)
+            assert sefd[index] == pytest.approx(
+                kernel.effective_sefd(None, channel_T_sys, 0.7, bandwidth[index[0], 0], 25),
+                rel=1e-12)
+
+    def test_to_canonical(self):
+        assert kernel.to_canonical('obs_freq', 100 * u.GHz) == 1e11
+        assert kernel.to_canonical('elevation', np.pi / 4 * u.rad) == pytest.approx(45)
+        assert kernel.to_canonical('weather', 25) == 25
+
+
+class TestInputsCanonical:
+
+    def test_canonical_values(self):
+        inputs = core.Inputs(obs_freq=150 * u.GHz, bandwidth=8 * u.GHz, weather=50)
+        canonical = inputs.canonical()
+
+        assert canonical['obs_freq'] == 1.5e11
+        assert canonical['bandwidth'] == 8e9
+        assert canonical['weather'] == 50
+        assert not isinstance(canonical['dish_radius'], u.Quantity)
+        # Changing the returned values does not change the record
+        canonical['weather'] = 10
+        assert inputs.canonical()['weather'] == 50
@@ -0,0 +1,202 @@
+import pytest
+import numpy as np
+import astropy.units as u
+from atlast_sc.calculator import Calculator
+from atlast_sc.exceptions import UnitException
+from atlast_sc.sweep import permitted, spectrum_frequencies
+
+
+OBS_FREQS = np.linspace(50, 950, 50) * u.GHz
+BANDWIDTHS = np.geomspace(10, 20000, 20) * u.MHz
+WEATHERS = [5, 25, 50, 75, 95]
+ELEVATIONS = np.linspace(20, 90, 10) * u.deg
+
+
+@pytest.fixture(scope='module')
+def result():
+    calculator = Calculator()
+    return calculator.sweep(obs_freq=OBS_FREQS, bandwidth=BANDWIDTHS,
+                            weather=WEATHERS, elevation=ELEVATIONS)
+
+
+class TestSweep:
+
+    def test_labelled_result(self, result):
+        assert result.dims == ('obs_freq', 'bandwidth', 'weather', 'elevation')
+        assert result.shape == (50, 20, 5, 10)
+        assert result.target == 'sensitivity'
+        assert result.t_int is None
+        for name in ('sensitivity', 'T_sys', 'sefd', 'transmittance', 'T_atm',
+                     'instrument', 'valid'):
+            assert result[name].shape == result.shape
+        assert np.array_equal(result.axes['weather'], WEATHERS)
+        assert result.sensitivity.unit == u.mJy
+
+    @pytest.mark.parametrize('index', [(10, 5, 1, 3), (30, 10, 2, 7),
+                                       (45, 19, 4, 8), (2, 0, 3, 1)])
+    def test_matches_calculator(self, result, index):
+        calculator = Calculator()
+        calculator.user_input.update(obs_freq=OBS_FREQS[index[0]],
+                                     bandwidth=BANDWIDTHS[index[1]],
+                                     weather=WEATHERS[index[2]],
+                                     elevation=ELEVATIONS[index[3]])
+
+        assert result.valid[index]
+        assert result.instrument[index] == calculator.chosen_instrument
+        assert result.T_sys[index].to_value(u.K) == \
+            pytest.approx(calculator.derived_parameters.T_sys.to_value(u.K), rel=1e-10)
+        assert result.sefd[index].to_value(u.Jy) == \
+            pytest.approx(calculator.derived_parameters.sefd.to_value(u.Jy), rel=1e-10)
+        assert result.sensitivity[index].to_value(u.mJy) == \
+            pytest.approx(calculator.calculate_sensitivity().to_value(u.mJy), rel=1e-10)
+
+    def test_invalid_values_are_masked(self, result):
+        # Elevations of 20 and 90 deg are outside the permitted range
+        assert not result.valid[..., 0].any()
+        assert not result.valid[..., -1].any()
+        assert np.isnan(result.sensitivity[..., 0]).all()
+        assert (result.instrument[..., 0] == None).all()
+        assert result.valid[..., 1:-1].any()
+
+    def test_t_int(self):
+        calculator = Calculator()
+        result = calculator.sweep(obs_freq=[20, 100, 2000] * u.GHz, weather=[1, 50],
+                                  n_pol=[1, 2, 3], target='t_int')
+
+        assert result.dims == ('obs_freq', 'weather', 'n_pol')
+        assert result.sensitivity is None
+        # Only obs_freq=100 GHz, weather=50 and n_pol=1 or 2 are permitted
+        expected_valid = np.zeros((3, 2, 3), dtype=bool)
+        expected_valid[1, 1, :2] = True
+        assert np.array_equal(result.valid, expected_valid)
+
+        calculator.user_input.update(obs_freq=100 * u.GHz, weather=50, n_pol=1)
+        assert result.t_int[1, 1, 0].to_value(u.s) == \
+            pytest.approx(calculator.calculate_t_integration().to_value(u.s), rel=1e-10)
+        # The integration time is inversely proportional to n_pol
+        assert result.t_int[1, 1, 0].value == pytest.approx(2 * result.t_int[1, 1, 1].value)
+
+    def test_requested_instrument(self):
+        calculator = Calculator()
+        result = calculator.sweep(obs_freq=[100, 300, 700] * u.GHz, instrument='sepia')
+
+        assert np.array_equal(result.valid, [False, True, False])
+        assert list(result.instrument) == [None, 'Sepia', None]
+
+    def test_calculator_unchanged(self):
+        calculator = Calculator()
+        obs_freq = calculator.user_input.obs_freq
+        sefd = calculator.derived_parameters.sefd
+        instrument = calculator._param_setup.chosen_instrument
+        T_sys = instrument.T_sys
+
+        calculator.sweep(obs_freq=OBS_FREQS, bandwidth=BANDWIDTHS)
+
+        assert calculator.user_input.obs_freq == obs_freq
+        assert calculator.derived_parameters.sefd == sefd
+        assert calculator._param_setup.chosen_instrument is instrument
+        assert instrument.T_sys == T_sys
+
+    def test_finetune(self):
+        calculator = Calculator(finetune=True)
+        result = calculator.sweep(obs_freq=[150, 400] * u.GHz, bandwidth=[1, 8] * u.GHz)
+
+        for i, obs_freq in enumerate([150, 400] * u.GHz):
+            for j, bandwidth in enumerate([1, 8] * u.GHz):
+                finetuned = Calculator(finetune=True)
+                finetuned.user_input.update(obs_freq=obs_freq, bandwidth=bandwidth)
+                assert result.sefd[i, j].to_value(u.Jy) == \
+                    pytest.approx(finetuned.derived_parameters.sefd.to_value(u.Jy), rel=1e-10)
+
+    def test_invalid_sweep(self):
+        calculator = Calculator()
+        with pytest.raises(ValueError):
+            calculator.sweep(obs_freq=[100] * u.GHz, target='T_sys')
+        with pytest.raises(UnitException):
+            calculator.sweep(obs_freq=[100] * u.m)
+        with pytest.raises(ValueError):
+            calculator.sweep(weather=[[10, 20]])
+
+
+def test_permitted():
+    assert np.array_equal(permitted([1, 2, 3, np.nan], 'n_pol'), [True, True, False, False])
+    assert np.array_equal(permitted([4, 5, 95, 96], 'weather'), [False, True, True, False])
+    assert np.array_equal(permitted([0, 1] * u.MHz, 'bandwidth'), [False, True])
+
+
+class TestSensitivitySpectrum:
+
+    def test_instrument_range(self):
+        calculator = Calculator()
+        spectrum = calculator.sensitivity_spectrum(instrument='Chai')
+
+        # The frequencies of the atmosphere tables, 10 MHz apart, across the
+        # instrument range
+        obs_freq = spectrum.axes['obs_freq']
+        assert spectrum.dims == ('obs_freq',)
+        assert obs_freq[0] == 460 * u.GHz
+        assert obs_freq[-1] == 820 * u.GHz
+        assert np.diff(obs_freq.to_value(u.MHz)) == pytest.approx(10)
+        # Frequencies between the CHAI ranges are masked
+        between = (obs_freq > 500 * u.GHz) & (obs_freq < 780 * u.GHz)
+        assert not spectrum.valid[between].any()
+        assert spectrum.valid[~between].all()
+        assert set(spectrum.instrument[~between]) == {'Chai'}
+
+    @pytest.mark.parametrize('index', [0, 1234, 5200, -1])
+    def test_matches_calculator(self, index):
+        calculator = Calculator()
+        spectrum = calculator.sensitivity_spectrum(instrument='Sepia')
+
+        calculator.user_input.obs_freq = spectrum.axes['obs_freq'][index]
+        assert calculator.chosen_instrument == 'Sepia'
+        assert spectrum.sensitivity[index].to_value(u.mJy) == \
+            pytest.approx(calculator.calculate_sensitivity().to_value(u.mJy), rel=1e-10)
+
+    def test_resolution_and_target(self):
+        calculator = Calculator()
+        spectrum = calculator.sensitivity_spectrum(100 * u.GHz, 200 * u.GHz, 1 * u.GHz,
+                                                   target='t_int')
+
+        assert len(spectrum.axes['obs_freq']) == 101
+        assert spectrum.sensitivity is None
+        assert spectrum.t_int.unit == u.s
+        # The chosen (default) instrument covers all the frequencies
+        assert spectrum.valid.all()
+        assert set(spectrum.instrument) == {'Default'}
+
+        spectrum = calculator.sensitivity_spectrum(100 * u.GHz, 200 * u.GHz, 1 * u.GHz,
+                                                   instrument='Finer', target='t_int')
+        assert not spectrum.valid[:20].any()
+        assert spectrum.valid[20:].all()
+
+    def test_calculator_unchanged(self):
+        calculator = Calculator()
+        calculator.user_input.obs_freq = 300 * u.GHz
+        sefd = calculator.derived_parameters.sefd
+
+        calculator.sensitivity_spectrum(instrument='Default')
+
+        assert calculator.derived_parameters.sefd == sefd
+        assert calculator.chosen_instrument == 'Sepia'
+        assert calculator.user_input.obs_freq == 300 * u.GHz
+
+    def test_whole_range(self):
+        # The whole range of the default instrument, about 90000 frequencies
+        calculator = Calculator()
+        spectrum = calculator.sensitivity_spectrum(instrument='Default')
+        assert spectrum.shape == (91501,)
+
+
+def test_spectrum_frequencies():
+    frequencies = spectrum_frequencies(100 * u.GHz, 100.1 * u.GHz)
+    assert frequencies.unit == u.GHz
+    assert len(frequencies) == 11
+
+    frequencies = spectrum_frequencies(100 * u.GHz, 101000 * u.MHz, 250 * u.MHz)
+    assert np.allclose(frequencies.value, [100, 100.25, 100.5, 100.75, 101])
+
+    with pytest.raises(ValueError):
+        spectrum_frequencies(200 * u.GHz, 100 * u.GHz)
+    with pytest.raises(ValueError):
+        spectrum_frequencies(100 * u.GHz, 200 * u.GHz, 0 * u.GHz)
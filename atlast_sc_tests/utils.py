@@ -1,5 +1,8 @@
 from contextlib import contextmanager
 import re
+import numpy as np
+import astropy.units as u
+from astropy import constants
 from atlast_sc.utils import FileHelper
 
 from atlast_sc.instruments.config import InstrumentConfig
@@ -79,4 +82,60 @@ def find_chosen_instrument(obs_freq, bandwidth):
             chosen_inst_name = "Default"
         
         # Get the instrument module according to instrument name
-        return inst_modules[chosen_inst_name]
\ No newline at end of file
+        return inst_modules[chosen_inst_name]
+
+def reference_system_temperature(instrument, obs_freq, bandwidth, eta_eff,
+                                 T_amb, T_sky, transmittance, n_pol):
+    """
+    Reference system temperature of an instrument at a single point: the
+    astropy Quantity formulas of the original instrument classes, kept as a
+    test oracle for the float kernels. The instrument parameters are read
+    from its YAML data, not from the instrument object.
+    """
+    data = instrument.data
+    name = data.name
+
+    def noise_temperature(temperature, frequency):
+        ratio = (constants.h * frequency) / (constants.k_B * temperature)
+        return temperature * (ratio / np.expm1(ratio))
+
+    if name in ('Muscat', 'Tifuun'):
+        eta_chip = data.chip_efficiency['value']
+        eta_co = data.cold_optics_efficiency['value']
+        T_co = u.Quantity(data.cold_optics_temperature['value'],
+                          data.cold_optics_temperature['unit'])
+        delta_g = u.Quantity(float(data.band_gap['value']), data.band_gap['unit'])
+        eta_pb = data.pair_breaking_efficiency['value']
+
+        psdkid = constants.k_B * (eta_chip * (1 - eta_co) * noise_temperature(T_co, obs_freq) +
+                                  eta_chip * eta_co * (1 - eta_eff) * noise_temperature(T_amb, obs_freq) +
+                                  eta_chip * eta_co * eta_eff * T_sky)
+        pkid = psdkid * n_pol * bandwidth
+        nep = np.sqrt(2 * pkid * constants.h * obs_freq +
+                      2 * pkid**2 / (n_pol * bandwidth) +
+                      4 * delta_g * pkid / eta_pb)
+        return (nep / (constants.k_B * eta_eff * transmittance * eta_chip * eta_co *
+                       np.sqrt(2 * n_pol * bandwidth))).to(u.K)
+
+    if name == 'Default':
+        T_rx = (data.prefactor['value'] * constants.h * obs_freq / constants.k_B).to(u.K)
+    else:
+        temps = [float(temp) for temp in data.receiver_temperature['values']]
+        ranges = [[float(value) for value in re.findall(r"[\d.]+", freq_range)]
+                  for freq_range in data.allowed_ranges['observing_frequency']['ranges']]
+        freq = obs_freq.to_value(u.GHz)
+        T_rx = None
+        if name == 'Sepia':
+            if ranges[0][0] <= freq <= ranges[0][1]:
+                T_rx = temps[0] * u.K
+            elif ranges[1][0] < freq <= ranges[1][1]:
+                T_rx = (temps[0] + (temps[1] - temps[0]) * (freq - ranges[1][0])
+                        / (ranges[1][1] - ranges[1][0])) * u.K
+        else:
+            for index, (low, high) in enumerate(ranges):
+                if T_rx is None and low <= freq <= high:
+                    T_rx = temps[min(index, len(temps) - 1)] * u.K
+
+    sidebands = 1 + data.sideband_ratio['value'] if name == 'Chai' else 1
+    return (sidebands / (eta_eff * transmittance) *
+            (T_rx + eta_eff * T_sky + (1 - eta_eff) * noise_temperature(T_amb, obs_freq))).to(u.K)
@@ -0,0 +1,52 @@
+# flake8: noqa
+
+"""
+Benchmarks the uniform-grid atmosphere interpolator against scipy's
+RegularGridInterpolator, which the calculator used previously, on the
+atmosphere lookup tables. Checks that both give the same results.
+Not part of the test suite. Run with:
+
+    python dev_utils/benchmark_atmosphere.py
+"""
+import timeit
+import numpy as np
+from scipy.interpolate import RegularGridInterpolator
+from atlast_sc.atmosphere import AtmosphereTables, UniformGridInterpolator
+
+N_SINGLE = 2000
+N_BATCH = 1_000_000
+
+tables = AtmosphereTables.get()
+frequencies = tables.T_atm_table[:, 0]
+values = tables.T_atm_table[:, 1:]
+
+interpolators = {
+    'RegularGridInterpolator': RegularGridInterpolator(
+        (frequencies, tables.weather), values),
+    'UniformGridInterpolator': UniformGridInterpolator(
+        frequencies, tables.weather, values),
+}
+
+rng = np.random.default_rng(42)
+points = np.column_stack((rng.uniform(frequencies[0], frequencies[-1],
+                                      N_BATCH),
+                          rng.uniform(tables.weather[0], tables.weather[-1],
+                                      N_BATCH)))
+
+# Check the results agree
+reference, uniform = (interp(points) for interp in interpolators.values())
+max_rel_diff = np.max(np.abs(uniform - reference) / np.abs(reference))
+print(f"Maximum relative difference over {N_BATCH} points: "
+      f"{max_rel_diff:.2e}")
+assert np.allclose(uniform, reference, rtol=1e-12, atol=0)
+
+print(f"\n{'Interpolator':<25} {'per point (us)':>15} "
+      f"{'batch (Mpoints/s)':>18}")
+for name, interp in interpolators.items():
+    single_points = points[:N_SINGLE]
+    per_point = min(timeit.repeat(
+        lambda: [interp(point) for point in single_points],
+        number=1, repeat=3)) / N_SINGLE
+    batch = min(timeit.repeat(lambda: interp(points), number=1, repeat=3))
+    print(f"{name:<25} {per_point * 1e6:>15.1f} "
+          f"{N_BATCH / batch / 1e6:>18.2f}")
@@ -0,0 +1,31 @@
+# flake8: noqa
+
+"""
+Times the creation of calculators: a new calculator, a clone of a prototype
+calculator without overrides, and clones overriding a parameter that does
+not select the instrument again (the weather) and one that does (the
+observing frequency).
+Not part of the test suite. Run with:
+
+    python dev_utils/benchmark_clone.py
+"""
+import timeit
+import astropy.units as u
+from atlast_sc.calculator import Calculator
+
+NUMBER = 200
+
+prototype = Calculator()
+benchmarks = {
+    'Calculator()': Calculator,
+    'clone()': lambda: prototype.clone(),
+    'clone(weather=30)': lambda: prototype.clone(weather=30),
+    'clone(obs_freq=50 GHz)': lambda: prototype.clone(obs_freq=50 * u.GHz),
+}
+
+print(f"{'Creation':<30} {'time (ms)':>10} {'speed-up':>9}")
+reference = None
+for name, benchmark in benchmarks.items():
+    duration = min(timeit.repeat(benchmark, number=NUMBER, repeat=5)) / NUMBER * 1e3
+    reference = reference or duration
+    print(f"{name:<30} {duration:>10.3f} {reference / duration:>8.1f}x")
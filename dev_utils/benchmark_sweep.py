@@ -0,0 +1,34 @@
+# flake8: noqa
+
+"""
+Times the parameter sweeps of the calculator: a trade study over a
+50 x 20 x 5 x 10 grid of observing frequencies, bandwidths, weather and
+elevations, and a sensitivity spectrum over the whole range of the default
+instrument, with and without finetuning.
+Not part of the test suite. Run with:
+
+    python dev_utils/benchmark_sweep.py
+"""
+import timeit
+import numpy as np
+import astropy.units as u
+from atlast_sc.calculator import Calculator
+
+OBS_FREQS = np.linspace(50, 950, 50) * u.GHz
+BANDWIDTHS = np.geomspace(10, 20000, 20) * u.MHz
+WEATHERS = [5, 25, 50, 75, 95]
+ELEVATIONS = np.linspace(20, 90, 10) * u.deg
+
+print(f"{'Sweep':<30} {'finetune':>8} {'time (s)':>10}")
+for finetune in (False, True):
+    calculator = Calculator(finetune=finetune)
+    benchmarks = {
+        'Trade study': lambda: calculator.sweep(
+            obs_freq=OBS_FREQS, bandwidth=BANDWIDTHS, weather=WEATHERS,
+            elevation=ELEVATIONS),
+        'Sensitivity spectrum': lambda: calculator.sensitivity_spectrum(
+            instrument='Default'),
+    }
+    for name, benchmark in benchmarks.items():
+        duration = min(timeit.repeat(benchmark, number=1, repeat=3))
+        print(f"{name:<30} {str(finetune):>8} {duration:>10.3f}")
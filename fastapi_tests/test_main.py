@@ -1,6 +1,13 @@
+import asyncio
+import time
+import httpx
 import pytest
 from fastapi.testclient import TestClient
+from web_client import main
 from web_client.main import app
+from web_client.pool import CalculationPool
+from web_client.single_flight import SingleFlight
+from web_client.warmup import WarmUp
 from web_client.utils import version_num_for_url
 
 client = TestClient(app)
@@ -32,6 +39,42 @@ def test_calculate_sensitivity():
     assert pytest.approx(sensitivity['value'], 0.01) == 690.
 
 
+def test_server_timing():
+    # A result taken from the cache is not timed
+    main.calculator.response_cache.clear()
+    response = client.post(
+        f'/v{version}/sensitivity/',
+        json=user_input
+    )
+
+    assert response.headers['Server-Timing'].startswith('queue;dur=')
+    assert 'compute;dur=' in response.headers['Server-Timing']
+
+
+def test_overloaded(monkeypatch):
+    client.post(f'/v{version}/sensitivity/', json=user_input)
+
+    # A pool whose worker and queue are both taken
+    pool = CalculationPool(size=1, queue_depth=0)
+    pool._pending = 1
+    monkeypatch.setattr(main, 'calculation_pool', pool)
+
+    # Cached results do not need a worker
+    cached = client.post(f'/v{version}/sensitivity/', json=user_input)
+    assert cached.status_code == 200
+    assert cached.headers['Server-Timing'] == 'cache;desc=hit'
+
+    main.calculator.response_cache.clear()
+    response = client.post(
+        f'/v{version}/sensitivity/',
+        json=user_input
+    )
+
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+    pool.shutdown()
+
+
 def test_calculate_t_int():
     response = client.post(
         f'/v{version}/integration-time/',
@@ -45,6 +88,177 @@ def test_calculate_t_int():
     assert pytest.approx(integration_time['value'], 0.1) == 5.20
 
 
+def test_response_cache():
+    main.calculator.response_cache.clear()
+    hits = client.get('/cache-stats').json()['hits']
+
+    response = client.post(f'/v{version}/sensitivity/', json=user_input)
+    etag = response.headers['ETag']
+    # Clients do not cache the results of POST requests
+    assert 'Cache-Control' not in response.headers
+
+    # The same input in other units is taken from the cache
+    same_input = dict(user_input, bandwidth={'value': '0.1', 'unit': 'GHz'})
+    cached = client.post(f'/v{version}/sensitivity/', json=same_input)
+    assert cached.json() == response.json()
+    assert cached.headers['ETag'] == etag
+
+    # A POST request always gets the result
+    repeated = client.post(f'/v{version}/sensitivity/', json=user_input,
+                           headers={'If-None-Match': etag})
+    assert repeated.status_code == 200
+    assert repeated.json() == response.json()
+
+    stats = client.get('/cache-stats').json()
+    assert stats['hits'] == hits + 2
+    assert 0 < stats['hit_rate'] <= 1
+    assert set(stats['coalescing']) == {'calls', 'coalesced', 'in_flight'}
+
+
+def test_query():
+    main.calculator.response_cache.clear()
+    query = {name: param['value'] for name, param in user_input.items()}
+    query.update({f'{name}_unit': param['unit']
+                  for name, param in user_input.items() if param['unit']})
+
+    response = client.get(f'/v{version}/sensitivity', params=query)
+    assert response.status_code == 200
+    assert response.json() == client.post(f'/v{version}/sensitivity/', json=user_input).json()
+    etag = response.headers['ETag']
+    assert response.headers['Cache-Control'].startswith('private, max-age=')
+
+    t_int = client.get(f'/v{version}/integration-time', params=query)
+    assert t_int.json() == client.post(f'/v{version}/integration-time/', json=user_input).json()
+
+    # A client holding the result gets an empty 304 response
+    for if_none_match in (etag, f'"other", W/{etag}', '*'):
+        not_modified = client.get(f'/v{version}/sensitivity', params=query,
+                                  headers={'If-None-Match': if_none_match})
+        assert not_modified.status_code == 304
+        assert not_modified.content == b''
+        assert not_modified.headers['ETag'] == etag
+        assert not_modified.headers['Cache-Control'] == response.headers['Cache-Control']
+    # Other entity tags do not match, even if they contain the current one
+    other = client.get(f'/v{version}/sensitivity', params=query,
+                       headers={'If-None-Match': f'"x{etag[1:-1]}x"'})
+    assert other.status_code == 200
+    assert other.json() == response.json()
+
+    # Missing and invalid parameters are reported
+    del query['weather']
+    assert client.get(f'/v{version}/sensitivity', params=query).status_code == 422
+    query['weather'] = '100'
+    invalid = client.get(f'/v{version}/sensitivity', params=query)
+    assert invalid.status_code == 400
+    assert 'weather' in invalid.json()['detail']
+
+
+def test_coalescing(monkeypatch):
+    monkeypatch.setattr(main, 'calculation_flights', SingleFlight())
+    main.calculator.response_cache.clear()
+
+    async def post_concurrently():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://test') as async_client:
+            return await asyncio.gather(*[
+                async_client.post(f'/v{version}/sensitivity', json=user_input)
+                for _ in range(10)])
+
+    responses = asyncio.run(post_concurrently())
+
+    # The identical requests share one calculation
+    assert {response.status_code for response in responses} == {200}
+    assert len({response.text for response in responses}) == 1
+    assert main.calculation_flights.stats() == {'calls': 1, 'coalesced': 9, 'in_flight': 0}
+
+
+def test_batch():
+    invalid_input = dict(user_input, weather={'value': '100', 'unit': None})
+    rows = [
+        dict(user_input, calculation='sensitivity'),
+        dict(invalid_input, calculation='sensitivity'),
+        dict(user_input, calculation='integration_time'),
+        dict(user_input, calculation='sensitivity'),
+        dict(user_input, calculation='flux'),
+    ]
+
+    response = client.post(
+        f'/v{version}/batch/',
+        json={'rows': rows}
+    )
+
+    assert response.status_code == 200
+
+    # One result per row, in the order of the rows
+    results = response.json()['results']
+    assert len(results) == 5
+    assert results[0]['unit'] == 'uJy'
+    assert pytest.approx(results[0]['value'], 0.01) == 690.
+    assert results[1] == {
+        'error': "Value error, The parameter 'weather' must be in the range 5 to 95."}
+    assert results[2]['unit'] == 's'
+    assert pytest.approx(results[2]['value'], 0.1) == 5.20
+    assert results[3] == results[0]
+    assert 'error' in results[4]
+
+    # The results are the same as for single calculations
+    single = client.post(f'/v{version}/integration-time/', json=user_input).json()
+    assert results[2] == pytest.approx(single)
+
+
+def test_batch_calculation_fails():
+    # No atmospheric transmission: the calculation fails for this row only
+    failing_input = dict(user_input, obs_freq={'value': '553.22', 'unit': 'GHz'},
+                         bandwidth={'value': '1000', 'unit': 'MHz'},
+                         weather={'value': '95', 'unit': None},
+                         elevation={'value': '85', 'unit': 'deg'})
+    rows = [
+        dict(failing_input, calculation='sensitivity'),
+        dict(user_input, calculation='sensitivity'),
+        dict(failing_input, calculation='integration_time'),
+    ]
+
+    response = client.post(
+        f'/v{version}/batch/',
+        json={'rows': rows}
+    )
+
+    assert response.status_code == 200
+    results = response.json()['results']
+    assert results[0]['error'].startswith('The calculation failed')
+    assert results[1]['unit'] == 'uJy'
+    assert results[2] == results[0]
+
+
+def test_batch_too_large():
+    response = client.post(
+        f'/v{version}/batch/',
+        json={'rows': [dict(user_input, calculation='sensitivity')] * 1001}
+    )
+
+    assert response.status_code == 400
+
+
+def test_ready(monkeypatch):
+    monkeypatch.setattr(main, 'warm_up', WarmUp())
+    assert client.get('/ready').status_code == 503
+
+    # The warm-up runs when the application starts
+    with TestClient(app) as started_client:
+        for _ in range(100):
+            response = started_client.get('/ready')
+            if response.status_code == 200:
+                break
+            time.sleep(0.1)
+
+    assert response.status_code == 200
+    status = response.json()
+    assert status['ready']
+    assert status['warm_up_seconds'] > 0
+    assert status['error'] is None
+    assert status['max_rss_bytes'] > 0
+
+
 def test_param_values_units():
     response = client.get(
         f'/v{version}/param-values-units/'
@@ -0,0 +1,57 @@
+import asyncio
+import threading
+import pytest
+from web_client.pool import CalculationPool, PoolOverloadedError
+
+
+def test_run():
+    pool = CalculationPool(size=2, queue_depth=0)
+
+    result, timings = asyncio.run(pool.run(sum, [1, 2, 3]))
+
+    assert result == 6
+    assert timings.queue >= 0
+    assert timings.compute >= 0
+    assert timings.server_timing().startswith('queue;dur=')
+    assert pool.pending == 0
+    pool.shutdown()
+
+
+def test_overloaded():
+    pool = CalculationPool(size=1, queue_depth=1)
+    release = threading.Event()
+
+    async def run_calculations():
+        # One calculation runs and one waits for the worker; the third is
+        # rejected
+        tasks = [asyncio.create_task(pool.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(PoolOverloadedError):
+            await pool.run(release.wait)
+        release.set()
+        return await asyncio.gather(*tasks)
+
+    results = asyncio.run(run_calculations())
+
+    assert [result for result, _ in results] == [True, True]
+    # The second calculation waited for the first one
+    assert results[1][1].queue > 0
+    assert pool.pending == 0
+    pool.shutdown()
+
+
+def test_invalid_size():
+    with pytest.raises(ValueError):
+        CalculationPool(size=0)
+    with pytest.raises(ValueError):
+        CalculationPool(queue_depth=-1)
+
+
+def test_from_environment(monkeypatch):
+    monkeypatch.setenv('ATLAST_SC_POOL_SIZE', '3')
+    monkeypatch.setenv('ATLAST_SC_POOL_QUEUE_DEPTH', '5')
+
+    pool = CalculationPool.from_environment()
+
+    assert (pool.size, pool.queue_depth) == (3, 5)
+    pool.shutdown()
@@ -0,0 +1,74 @@
+from atlast_sc.cache import DerivedParamsCache
+from atlast_sc.instruments.config import InstrumentRegistry
+from web_client.response_cache import ResponseCache
+
+user_input = {
+    't_int': {'value': '100', 'unit': 's'},
+    'sensitivity': {'value': '3.0', 'unit': 'mJy'},
+    'bandwidth': {'value': '100', 'unit': 'MHz'},
+    'obs_freq': {'value': '100', 'unit': 'GHz'},
+    'elevation': {'value': '45', 'unit': 'deg'},
+    'weather': {'value': '25', 'unit': None},
+    'n_pol': {'value': '2', 'unit': None}
+}
+
+
+def test_key_unit_normalised():
+    cache = ResponseCache()
+    same_input = dict(user_input, bandwidth={'value': 0.1, 'unit': 'GHz'})
+
+    key = cache.key(user_input, 'sensitivity')
+
+    assert cache.key(same_input, 'sensitivity') == key
+    assert ResponseCache.etag(cache.key(same_input, 'sensitivity')) == ResponseCache.etag(key)
+    assert cache.key(user_input, 'integration_time') != key
+    # Input that cannot be parsed is not cached
+    assert cache.key(dict(user_input, weather={'value': 'abc', 'unit': None}),
+                     'sensitivity') is None
+
+
+def test_prepare():
+    cache = ResponseCache()
+    assert not cache.prepared
+
+    cache.prepare()
+
+    assert cache.prepared
+    assert cache.key(user_input, 'sensitivity')[0] == DerivedParamsCache.package_fingerprint()
+
+
+def test_get_and_put():
+    cache = ResponseCache()
+    key = cache.key(user_input, 'sensitivity')
+    assert cache.get(key) is None
+
+    cache.put(key, {'value': 690.0, 'unit': 'uJy'})
+    result = cache.get(key)
+    result['value'] = 0
+
+    assert cache.get(key) == {'value': 690.0, 'unit': 'uJy'}
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['hit_rate']) == (2, 1, 2 / 3)
+
+
+def test_invalidated(monkeypatch):
+    cache = ResponseCache()
+    key = cache.key(user_input, 'sensitivity')
+    cache.put(key, {'value': 690.0, 'unit': 'uJy'})
+
+    # Another version of the package uses other keys
+    monkeypatch.setattr(DerivedParamsCache, '_package_hash', 'other version')
+    assert ResponseCache().key(user_input, 'sensitivity') != key
+
+    # Loading the instruments for the first time does not clear the cache...
+    InstrumentRegistry.invalidate()
+    cache = ResponseCache()
+    cache.put(cache.key(user_input, 'sensitivity'), {'value': 690.0, 'unit': 'uJy'})
+    InstrumentRegistry.get()
+    assert cache.get(cache.key(user_input, 'sensitivity')) is not None
+
+    # ...but reloading them does
+    InstrumentRegistry.invalidate()
+    InstrumentRegistry.get()
+    cache.key(user_input, 'sensitivity')
+    assert cache.stats()['size'] == 0
@@ -0,0 +1,82 @@
+import asyncio
+import pytest
+from web_client.single_flight import SingleFlight
+
+
+def test_coalesced():
+    flights = SingleFlight()
+    calls = []
+
+    async def calculate():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {'value': 690.0}
+
+    async def run_requests():
+        return await asyncio.gather(*[flights.run('key', calculate) for _ in range(5)])
+
+    results = asyncio.run(run_requests())
+
+    # The requests share one calculation and its result
+    assert len(calls) == 1
+    assert results == [{'value': 690.0}] * 5
+    assert flights.stats() == {'calls': 1, 'coalesced': 4, 'in_flight': 0}
+
+    # Later requests start a new calculation
+    asyncio.run(flights.run('key', calculate))
+    assert len(calls) == 2
+
+
+def test_not_coalesced():
+    flights = SingleFlight()
+
+    async def calculate():
+        await asyncio.sleep(0.01)
+        return 1
+
+    async def run_requests():
+        return await asyncio.gather(flights.run('a', calculate), flights.run('b', calculate),
+                                    flights.run(None, calculate), flights.run(None, calculate))
+
+    assert asyncio.run(run_requests()) == [1, 1, 1, 1]
+    assert flights.stats()['calls'] == 4
+    assert flights.stats()['coalesced'] == 0
+
+
+def test_exception_shared():
+    flights = SingleFlight()
+
+    async def calculate():
+        await asyncio.sleep(0.01)
+        raise ValueError('invalid input')
+
+    async def run_requests():
+        return await asyncio.gather(*[flights.run('key', calculate) for _ in range(3)],
+                                    return_exceptions=True)
+
+    results = asyncio.run(run_requests())
+
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flights.stats()['calls'] == 1
+
+
+def test_cancelled_request():
+    flights = SingleFlight()
+
+    async def calculate():
+        await asyncio.sleep(0.02)
+        return 1
+
+    async def run_requests():
+        first = asyncio.create_task(flights.run('key', calculate))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(flights.run('key', calculate))
+        await asyncio.sleep(0)
+        # Cancelling the request that started the calculation does not
+        # cancel it for the other requests
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run_requests()) == 1
@@ -0,0 +1,27 @@
+from web_client import warmup
+from web_client.warmup import WarmUp
+
+
+def test_run():
+    warm_up = WarmUp()
+    assert not warm_up.ready
+
+    warm_up.run()
+
+    assert warm_up.ready
+    assert warm_up.status()['warm_up_seconds'] > 0
+
+
+def test_failure(monkeypatch):
+    def fail(*args):
+        raise RuntimeError('no atmosphere tables')
+
+    monkeypatch.setattr(warmup.calculator, 'do_calculation', fail)
+    warm_up = WarmUp()
+
+    warm_up.run()
+
+    # The failure is recorded, and the application is not ready
+    status = warm_up.status()
+    assert not status['ready']
+    assert status['error'] == 'no atmosphere tables'
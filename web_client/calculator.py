@@ -1,14 +1,66 @@
+import functools
 import json
+import logging
 import math
 from dataclasses import asdict
+from atlast_sc import core
 from atlast_sc.calculator import Calculator
 from pydantic import ValidationError
 from atlast_sc.data import Data
+from atlast_sc.models import UserInput
+
+from web_client.response_cache import ResponseCache
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of calculations in a batch
+MAX_BATCH_SIZE = 1000
+
+# Results of recent calculations
+response_cache = ResponseCache.from_environment()
 
 def do_calculation(user_input, calculation):
     """
     Perform the specified calculation (sensitivity or integration time)
     """
+    return do_cached_calculation(user_input, calculation)[0]
+
+
+def do_cached_calculation(user_input, calculation):
+    """
+    Perform the specified calculation (sensitivity or integration time),
+    taking the result from the response cache if the same calculation has
+    been done recently
+
+    :return: the result, and its entity tag (None if the result cannot be
+        cached)
+    :rtype: tuple(dict, str)
+    """
+    key = response_cache.key(user_input, calculation)
+    result = response_cache.get(key)
+    if result is None:
+        result = calculate_and_cache(user_input, calculation, key)
+
+    return result, None if key is None else ResponseCache.etag(key)
+
+
+def calculate_and_cache(user_input, calculation, key):
+    """
+    Perform the specified calculation (sensitivity or integration time),
+    and store the result in the response cache
+
+    :param key: cache key of the calculation (see
+        :meth:`ResponseCache.key`), already looked up by the caller
+    """
+    result = _calculate(user_input, calculation)
+    response_cache.put(key, result)
+    return result
+
+
+def _calculate(user_input, calculation):
+    """
+    Perform the specified calculation with a new calculator
+    """
     try:
         calculator = _create_calculator(user_input)
     except UserInputError as e:
@@ -32,6 +84,62 @@ def do_calculation(user_input, calculation):
     return {"value": value, "unit": unit}
 
 
+def do_batch_calculation(rows):
+    """
+    Perform several calculations (sensitivity or integration time), each
+    with its own user input.
+
+    Identical user inputs are evaluated once, whatever the calculation
+    requested, and the calculations are evaluated by the stateless
+    calculation core with the shared instruments and atmosphere tables,
+    rather than by a new calculator for each row.
+
+    :param rows: user input and calculation name of each row
+    :type rows: list[tuple(dict, str)]
+    :return: result of each row, in the order of the rows: the value and
+        unit of the calculated parameter, or an error message if the input
+        is invalid or the calculation fails
+    :rtype: list[dict]
+    """
+    evaluated = {}
+    results = []
+    for user_input, calculation in rows:
+        if calculation not in ("sensitivity", "integration_time"):
+            results.append({"error": f'"{calculation}" is not a valid calculation'})
+            continue
+
+        key = json.dumps(user_input, sort_keys=True)
+        if key not in evaluated:
+            try:
+                evaluated[key] = _evaluate(user_input)
+            except UserInputError as e:
+                evaluated[key] = e.message
+            except Exception as e:
+                # A calculation that fails (e.g. with no atmospheric
+                # transmission) only fails the rows with the same input
+                logger.exception("Batch calculation failed for %s", key)
+                evaluated[key] = _failure_message(e)
+
+        # The result of the calculation, or an error message
+        result = evaluated[key]
+        if isinstance(result, str):
+            results.append({"error": result})
+            continue
+
+        try:
+            if calculation == "sensitivity":
+                calculated_param = Calculator.sensitivity_in_convenient_units(result.sensitivity)
+            else:
+                calculated_param = Calculator.t_int_in_convenient_units(result.t_int)
+        except Exception as e:
+            logger.exception("Batch calculation failed for %s", key)
+            results.append({"error": _failure_message(e)})
+            continue
+        results.append({"value": calculated_param.value, "unit": str(calculated_param.unit)})
+
+    return results
+
+
 def get_param_values_units():
     """
     Return the values, units, data conversion factors, etc. for each of the
@@ -65,6 +173,44 @@ def _create_calculator(user_input):
     return calculator
 
 
+def _evaluate(user_input):
+    """
+    Validate the user input as the calculator does, and evaluate it with the
+    calculation core
+    """
+    try:
+        model = UserInput(**user_input)
+    except ValidationError as e:
+        message = json.loads(e.json())[0]["msg"]
+        raise UserInputError(message)
+
+    # Only the user input is validated; the telescope and environment
+    # parameters take their (already validated) default values
+    try:
+        inputs = _default_inputs().replace(
+            **{name: value.value for name, value in model})
+    except ValueError as e:
+        # Reported as by the validation of the calculator models
+        raise UserInputError(f"Value error, {e}")
+
+    return core.evaluate(inputs)
+
+
+def _failure_message(error):
+    """
+    Return the error reported for a calculation that failed
+    """
+    return f"The calculation failed: {error or type(error).__name__}"
+
+
+@functools.cache
+def _default_inputs():
+    """
+    The default calculation inputs, shared by every calculation
+    """
+    return core.Inputs()
+
+
 class UserInputError(ValueError):
 
     def __init__(self, message):
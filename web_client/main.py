@@ -1,28 +1,59 @@
+import asyncio
 import os
+import re
+from contextlib import asynccontextmanager
 import uvicorn
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
-from web_client.schemas import APIUserInput
+from web_client.schemas import APIUserInput, APIBatchInput
 from web_client import utils, calculator
+from web_client.pool import CalculationPool, PoolOverloadedError
+from web_client.single_flight import SingleFlight
+from web_client.warmup import WarmUp
 import web_client.context_processors as cp
 
 os.chdir(os.path.dirname(__file__))
 
+# Preloads the calculator data and runs a few calculations at startup
+warm_up = WarmUp()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # The warm-up runs in the background: the application starts serving
+    # at once, and reports itself ready (see /ready) once it has completed
+    warm_up_task = asyncio.create_task(asyncio.to_thread(warm_up.run))
+    yield
+    await warm_up_task
+
+
 app = FastAPI(
     title="AtLast Sensitivity Calculator",
     version=utils.VERSION,
-    swagger_ui_parameters={"defaultModelsExpandDepth": -1}
+    swagger_ui_parameters={"defaultModelsExpandDepth": -1},
+    lifespan=lifespan
 )
 
 version = f'v{utils.version_num_for_url()}'
 paths = {
     'sensitivity': f'/{version}/sensitivity',
     'integration_time': f'/{version}/integration-time',
+    'batch': f'/{version}/batch',
     'param_values_units': f'/{version}/param-values-units'
 }
 
+# Calculations run on a bounded pool of worker threads, so that a slow
+# calculation does not block the event loop
+calculation_pool = CalculationPool.from_environment()
+
+# Identical calculations requested at the same time are only done once
+calculation_flights = SingleFlight()
+
+# An entity tag in an If-None-Match header, e.g. "abc" or W/"abc"
+_ENTITY_TAG = re.compile(r'(?:W/)?"[^"]*"')
+
 templates = Jinja2Templates(directory="templates",
                             context_processors=[cp.invalid_message_processor,
                                                 cp.default_values_processor,
@@ -42,25 +73,79 @@ async def sensitivity_calculator(request: Request):
 
 
 @app.post(paths['sensitivity'])
-async def sensitivity(api_user_input: APIUserInput):
+async def sensitivity(api_user_input: APIUserInput, request: Request, response: Response):
 
     user_input = _unpack_api_user_input(api_user_input)
 
-    try:
-        return calculator.do_calculation(user_input, "sensitivity")
-    except calculator.UserInputError as e:
-        raise HTTPException(status_code=400, detail=e.message)
+    return await _calculate(request, response, user_input, "sensitivity")
+
+
+@app.get(paths['sensitivity'])
+async def sensitivity_query(request: Request, response: Response):
+    """
+    The sensitivity for the user input given in the query string, e.g.
+    ``?t_int=100&t_int_unit=s&obs_freq=100&obs_freq_unit=GHz&weather=25...``.
+    The response may be cached by the client, and revalidated with its
+    entity tag.
+    """
+    user_input = _query_user_input(request)
+
+    return await _calculate(request, response, user_input, "sensitivity")
 
 
 @app.post(paths['integration_time'])
-async def t_int(api_user_input: APIUserInput):
+async def t_int(api_user_input: APIUserInput, request: Request, response: Response):
 
     user_input = _unpack_api_user_input(api_user_input)
 
-    try:
-        return calculator.do_calculation(user_input, "integration_time")
-    except calculator.UserInputError as e:
-        raise HTTPException(status_code=400, detail=e.message)
+    return await _calculate(request, response, user_input, "integration_time")
+
+
+@app.get(paths['integration_time'])
+async def t_int_query(request: Request, response: Response):
+    """
+    The integration time for the user input given in the query string (see
+    the sensitivity). The response may be cached by the client, and
+    revalidated with its entity tag.
+    """
+    user_input = _query_user_input(request)
+
+    return await _calculate(request, response, user_input, "integration_time")
+
+
+@app.post(paths['batch'])
+async def batch(api_batch_input: APIBatchInput, response: Response):
+
+    if len(api_batch_input.rows) > calculator.MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f'A batch cannot contain more than {calculator.MAX_BATCH_SIZE} rows')
+
+    rows = [(_unpack_api_user_input(row), row.calculation)
+            for row in api_batch_input.rows]
+
+    results = await _run_calculation(response, calculator.do_batch_calculation, rows)
+    return {"results": results}
+
+
+@app.get("/ready", include_in_schema=False)
+async def ready():
+    """
+    Readiness probe: 200 once the warm-up has completed, 503 before
+    """
+    status = warm_up.status()
+    return JSONResponse(content=status, status_code=200 if status["ready"] else 503)
+
+
+@app.get("/cache-stats", include_in_schema=False)
+async def cache_stats():
+    """
+    Hit rate and size of the response cache, and number of requests
+    coalesced with an identical calculation in flight
+    """
+    stats = calculator.response_cache.stats()
+    stats["coalescing"] = calculation_flights.stats()
+    return JSONResponse(content=stats)
 
 
 @app.get(paths['param_values_units'])
@@ -68,6 +153,110 @@ async def param_values_units():
     return JSONResponse(content=calculator.get_param_values_units())
 
 
+async def _run_calculation(response, func, *args, key=None):
+    """
+    Run a calculation on the calculation pool, and report the time it
+    waited for a worker and took to compute in the Server-Timing header.
+    Concurrent calls with the same key (other than None) share a single
+    calculation.
+    """
+    try:
+        result, timings = await calculation_flights.run(
+            key, lambda: calculation_pool.run(func, *args))
+    except PoolOverloadedError as e:
+        raise HTTPException(status_code=503, detail=e.message,
+                            headers={"Retry-After": "1"})
+
+    response.headers["Server-Timing"] = timings.server_timing()
+    return result
+
+
+async def _calculate(request, response, user_input, calculation):
+    """
+    Run a sensitivity or integration time calculation, reporting invalid
+    user input as a 400 error
+    """
+    try:
+        return await _run_cached_calculation(request, response, user_input, calculation)
+    except calculator.UserInputError as e:
+        raise HTTPException(status_code=400, detail=e.message)
+
+
+async def _run_cached_calculation(request, response, user_input, calculation):
+    """
+    Run a calculation through the response cache. The result is returned
+    with its entity tag. The result of a GET request may also be kept by the
+    client for the time to live of the cache, and a GET request already
+    holding the result (with a matching If-None-Match header) gets an empty
+    304 response. The results of POST requests are not cached by clients,
+    so their entity tag is for information only.
+
+    Once the warm-up has computed the fingerprint of the calculator, the
+    cache key is computed, and the cache looked up, on the event loop, so
+    that only cache misses take a worker. Before that, the whole lookup
+    runs on the calculation pool.
+    """
+    cache = calculator.response_cache
+    if cache.prepared:
+        key = cache.key(user_input, calculation)
+        result = cache.get(key)
+        if result is None:
+            # Identical requests arriving together wait for the first one
+            result = await _run_calculation(response, calculator.calculate_and_cache,
+                                            user_input, calculation, key, key=key)
+        else:
+            response.headers["Server-Timing"] = "cache;desc=hit"
+        etag = None if key is None else cache.etag(key)
+    else:
+        result, etag = await _run_calculation(response, calculator.do_cached_calculation,
+                                              user_input, calculation)
+    if etag is None:
+        return result
+
+    response.headers["ETag"] = etag
+    if request.method != "GET":
+        return result
+
+    response.headers["Cache-Control"] = f"private, max-age={int(cache.ttl)}"
+    if _etag_matches(request.headers.get("If-None-Match"), etag):
+        return Response(status_code=304, headers={
+            name: response.headers[name]
+            for name in ("ETag", "Cache-Control", "Server-Timing")})
+
+    return result
+
+
+def _etag_matches(if_none_match, etag):
+    """
+    Return True if an If-None-Match header matches the entity tag: the
+    header is "*" or a comma-separated list of entity tags, compared with
+    the weak comparison of RFC 9110 (a "W/" prefix is ignored)
+    """
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = _ENTITY_TAG.findall(if_none_match)
+    return any(tag.removeprefix("W/") == etag.removeprefix("W/") for tag in tags)
+
+
+def _query_user_input(request):
+    """
+    Return the user input given in the query string of a request: the value
+    of each parameter, and its unit (if any) in <parameter>_unit
+    """
+    user_input = {}
+    for name in APIUserInput.model_fields:
+        value = request.query_params.get(name)
+        if value is None:
+            raise HTTPException(status_code=422,
+                                detail=f"The query parameter '{name}' is missing")
+        user_input[name] = {"value": value,
+                            "unit": request.query_params.get(f"{name}_unit")}
+
+    return user_input
+
+
 def _unpack_api_user_input(api_user_input):
     return {
         "t_int": api_user_input.t_int,
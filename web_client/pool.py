@@ -0,0 +1,117 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+# Environment variables setting the size of the calculation pool
+POOL_SIZE_ENV = "ATLAST_SC_POOL_SIZE"
+QUEUE_DEPTH_ENV = "ATLAST_SC_POOL_QUEUE_DEPTH"
+DEFAULT_POOL_SIZE = 4
+DEFAULT_QUEUE_DEPTH = 16
+
+
+@dataclass(frozen=True)
+class Timings:
+    """
+    Time (in seconds) a calculation waited for a worker, and took to compute
+    """
+    queue: float
+    compute: float
+
+    def server_timing(self):
+        """
+        Return the timings as the value of a Server-Timing header (in ms)
+        """
+        return f"queue;dur={self.queue * 1e3:.3f}, compute;dur={self.compute * 1e3:.3f}"
+
+
+class PoolOverloadedError(RuntimeError):
+
+    def __init__(self, message):
+        self.message = message
+
+        super().__init__(message)
+
+
+class CalculationPool:
+    """
+    Bounded pool of worker threads running the calculations, so that they do
+    not block the event loop.
+
+    At most `size` calculations run at the same time, and at most
+    `queue_depth` more wait for a worker. Further calculations are rejected
+    with a PoolOverloadedError rather than queued.
+    """
+
+    def __init__(self, size=DEFAULT_POOL_SIZE, queue_depth=DEFAULT_QUEUE_DEPTH):
+        if size < 1:
+            raise ValueError("The pool must have at least one worker")
+        if queue_depth < 0:
+            raise ValueError("The queue depth must not be negative")
+        self.size = size
+        self.queue_depth = queue_depth
+        self._executor = ThreadPoolExecutor(max_workers=size,
+                                            thread_name_prefix="calculation")
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    @classmethod
+    def from_environment(cls):
+        """
+        Create a pool sized from the ATLAST_SC_POOL_SIZE and
+        ATLAST_SC_POOL_QUEUE_DEPTH environment variables
+        """
+        return cls(int(os.environ.get(POOL_SIZE_ENV, DEFAULT_POOL_SIZE)),
+                   int(os.environ.get(QUEUE_DEPTH_ENV, DEFAULT_QUEUE_DEPTH)))
+
+    @property
+    def pending(self):
+        """
+        Number of calculations running or waiting for a worker
+        """
+        return self._pending
+
+    async def run(self, func, *args):
+        """
+        Run func(*args) on a worker thread
+
+        :return: the result of the function and the timings of the call
+        :rtype: tuple(object, Timings)
+        :raises PoolOverloadedError: if all the workers are busy and the
+            queue is full
+        """
+        with self._lock:
+            if self._pending >= self.size + self.queue_depth:
+                raise PoolOverloadedError("The server is busy. Please try again later.")
+            self._pending += 1
+
+        submitted = time.perf_counter()
+        started = finished = None
+
+        def call():
+            nonlocal started, finished
+            started = time.perf_counter()
+            try:
+                return func(*args)
+            finally:
+                finished = time.perf_counter()
+
+        # The slot is released when the worker finishes, even if the
+        # request has been cancelled in the meantime
+        future = self._executor.submit(call)
+        future.add_done_callback(self._release)
+        result = await asyncio.wrap_future(future)
+
+        return result, Timings(queue=started - submitted, compute=finished - started)
+
+    def _release(self, future):
+        with self._lock:
+            self._pending -= 1
+
+    def shutdown(self):
+        """
+        Wait for the running calculations and stop the workers
+        """
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,147 @@
+import hashlib
+import os
+import threading
+from pydantic import ValidationError
+from atlast_sc import kernel
+from atlast_sc.cache import DerivedParamsCache, LRUCache
+from atlast_sc.instruments.config import InstrumentRegistry
+from atlast_sc.models import UserInput
+
+# Environment variables setting the size and time to live of the cache
+SIZE_ENV = "ATLAST_SC_RESPONSE_CACHE_SIZE"
+TTL_ENV = "ATLAST_SC_RESPONSE_CACHE_TTL"
+DEFAULT_SIZE = 4096
+DEFAULT_TTL = 3600
+
+
+class ResponseCache:
+    """
+    Cache of the results of the calculation endpoints, keyed on the
+    calculation and the user input converted to canonical units, so that
+    e.g. 100 MHz and 0.1 GHz share an entry.
+
+    The keys include a fingerprint of the package version, source and data
+    files, and the cache is cleared when the instruments are reloaded, so
+    that results are never served from another version of the calculator.
+    Computing the fingerprint loads the atmosphere tables and hashes the
+    files, so it is computed once, by :meth:`prepare` (e.g. during the
+    warm-up of the application) or by the first key.
+
+    :param maxsize: maximum number of entries. 0 disables the cache
+    :type maxsize: int
+    :param ttl: time to live of the entries, in seconds
+    :type ttl: float
+    """
+
+    def __init__(self, maxsize=DEFAULT_SIZE, ttl=DEFAULT_TTL):
+        self._cache = LRUCache(maxsize, ttl)
+        self._lock = threading.Lock()
+        self._load_count = None
+        self._fingerprint = None
+
+    @classmethod
+    def from_environment(cls):
+        """
+        Create a cache sized from the ATLAST_SC_RESPONSE_CACHE_SIZE and
+        ATLAST_SC_RESPONSE_CACHE_TTL environment variables
+        """
+        return cls(int(os.environ.get(SIZE_ENV, DEFAULT_SIZE)),
+                   float(os.environ.get(TTL_ENV, DEFAULT_TTL)))
+
+    @property
+    def ttl(self):
+        """
+        Time to live of the entries, in seconds
+        """
+        return self._cache.ttl
+
+    @property
+    def prepared(self):
+        """
+        True once the fingerprint of the calculator has been computed, so
+        that keys are cheap to compute
+        """
+        return self._fingerprint is not None
+
+    def prepare(self):
+        """
+        Compute the fingerprint of the calculator used in the keys
+        """
+        if self._fingerprint is None:
+            self._fingerprint = DerivedParamsCache.package_fingerprint()
+
+    def key(self, user_input, calculation):
+        """
+        Return the cache key of a calculation, or None if the user input
+        cannot be parsed (the calculation then reports the error)
+        """
+        try:
+            model = UserInput(**user_input)
+        except ValidationError:
+            return None
+
+        self.prepare()
+        self._check_instruments()
+        values = tuple(sorted((name, float(kernel.to_canonical(name, value.value)))
+                              for name, value in model))
+        return self._fingerprint, calculation, values
+
+    @staticmethod
+    def etag(key):
+        """
+        Return the entity tag of the result of a calculation
+        """
+        return '"' + hashlib.sha256(repr(key).encode()).hexdigest()[:32] + '"'
+
+    def get(self, key):
+        """
+        Return a copy of the cached result for `key`, or None
+        """
+        if key is None:
+            return None
+        result = self._cache.get(key)
+        return None if result is None else dict(result)
+
+    def put(self, key, result):
+        """
+        Store a copy of the result for `key`
+        """
+        if key is not None:
+            self._cache.put(key, dict(result))
+
+    def clear(self):
+        """
+        Remove all the entries
+        """
+        self._cache.clear()
+
+    def stats(self):
+        """
+        Return the statistics of the cache, with its hit rate
+        """
+        stats = self._cache.stats()
+        lookups = stats.hits + stats.misses
+        return {
+            "hits": stats.hits,
+            "misses": stats.misses,
+            "hit_rate": stats.hits / lookups if lookups else None,
+            "evictions": stats.evictions,
+            "expirations": stats.expirations,
+            "size": stats.size,
+            "maxsize": stats.maxsize,
+            "ttl": self.ttl,
+        }
+
+    def _check_instruments(self):
+        """
+        Clear the cache if the instruments have been reloaded
+        """
+        # Load the instruments first, so that only reloads clear the cache,
+        # and not the first load in the process
+        InstrumentRegistry.get()
+        load_count = InstrumentRegistry.load_count()
+        if load_count != self._load_count:
+            with self._lock:
+                if load_count != self._load_count:
+                    self._cache.clear()
+                    self._load_count = load_count
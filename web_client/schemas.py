@@ -50,3 +50,20 @@ class APIUserInput(BaseModel):
                 },
             }
         }
+
+
+class APIBatchRow(APIUserInput):
+    """
+    User input of one calculation in a batch, with the calculation to
+    perform ("sensitivity" or "integration_time").
+    """
+
+    calculation: str
+
+
+class APIBatchInput(BaseModel):
+    """
+    A batch of calculations, each with its own user input.
+    """
+
+    rows: list[APIBatchRow]
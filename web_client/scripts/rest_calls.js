@@ -23,12 +23,21 @@ const geParamValuesUnits = () => {
 const calculate = (inputData, targetPath) => {
     const version = apiVersion();
 
+    // The input is sent in the query string, so that the browser can keep
+    //  the results and revalidate them with their entity tags
+    const queryParams = {};
+    for (const param in inputData) {
+        queryParams[param] = inputData[param].value;
+        if (inputData[param].unit) {
+            queryParams[`${param}_unit`] = inputData[param].unit;
+        }
+    }
+
     return new Promise((resolve, reject) => {
         $.ajax({
             url: `/${version}/${targetPath}`,
-            type: 'POST',
-            data: JSON.stringify(inputData),
-            contentType: 'application/json',
+            type: 'GET',
+            data: queryParams,
             success: function(data) {
                 resolve(data);
             },
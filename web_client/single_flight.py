@@ -0,0 +1,54 @@
+import asyncio
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent calculations: while a calculation is in
+    flight, requests for the same key wait for it and share its result (or
+    exception) instead of starting their own.
+
+    The calculation runs in its own task, so that it completes for the
+    other requests even if the request that started it is cancelled. Used
+    from the event loop only.
+    """
+
+    def __init__(self):
+        self._in_flight = {}
+        self._calls = 0
+        self._coalesced = 0
+
+    async def run(self, key, func):
+        """
+        Return the result of func(), or of the in-flight call with the same
+        key. A key of None is never coalesced.
+
+        :param key: key identifying the calculation
+        :type key: hashable
+        :param func: coroutine function performing the calculation
+        :type func: callable
+        """
+        if key is None:
+            self._calls += 1
+            return await func()
+
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+            self._calls += 1
+        else:
+            self._coalesced += 1
+
+        return await asyncio.shield(task)
+
+    def stats(self):
+        """
+        Return the number of calculations performed, of requests coalesced
+        with an in-flight calculation, and of calculations in flight
+        """
+        return {
+            "calls": self._calls,
+            "coalesced": self._coalesced,
+            "in_flight": len(self._in_flight),
+        }
@@ -0,0 +1,112 @@
+import logging
+import threading
+import time
+from atlast_sc import core
+from atlast_sc.atmosphere import AtmosphereTables
+from atlast_sc.data import Data
+from atlast_sc.instruments.config import InstrumentRegistry
+from web_client import calculator
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Observing frequencies (GHz) and bandwidths (MHz) of the calculations run
+# during the warm-up, covering the instruments and the default input
+WARM_UP_POINTS = [(406, 100), (100, 100), (183, 8000), (300, 100), (460, 100), (850, 100)]
+
+
+class WarmUp:
+    """
+    Preloads the atmosphere tables and instruments, computes the fingerprint
+    of the response cache, and runs a few representative calculations, so
+    that the first requests do not pay for them. Records whether the warm-up
+    has completed, and how long it took.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._duration = None
+        self._error = None
+
+    @property
+    def ready(self):
+        """
+        True once the warm-up has completed successfully
+        """
+        return self._duration is not None
+
+    def run(self):
+        """
+        Run the warm-up. Errors are logged and recorded rather than raised.
+        """
+        started = time.perf_counter()
+        try:
+            AtmosphereTables.get()
+            InstrumentRegistry.get()
+            core.shared_instruments()
+            # Computed once, so that the event loop can build the keys
+            # of the response cache
+            calculator.response_cache.prepare()
+
+            rows = [(_user_input(obs_freq, bandwidth), calculation)
+                    for obs_freq, bandwidth in WARM_UP_POINTS
+                    for calculation in ("sensitivity", "integration_time")]
+            for user_input, calculation in rows:
+                calculator.do_calculation(user_input, calculation)
+            calculator.do_batch_calculation(rows)
+        except Exception as e:
+            logger.exception("Warm-up failed")
+            with self._lock:
+                self._error = str(e)
+            return
+
+        with self._lock:
+            self._duration = time.perf_counter() - started
+            self._error = None
+
+    def status(self):
+        """
+        Return the state of the warm-up, its duration (in seconds) and the
+        peak memory used by the process (in bytes)
+        """
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "warm_up_seconds": self._duration,
+                "error": self._error,
+                "max_rss_bytes": _max_rss_bytes(),
+            }
+
+
+def _user_input(obs_freq, bandwidth):
+    """
+    Return the default user input, with the given observing frequency (GHz)
+    and bandwidth (MHz)
+    """
+    return {
+        "t_int": {"value": Data.integration_time.default_value,
+                  "unit": Data.integration_time.default_unit},
+        "sensitivity": {"value": Data.sensitivity.default_value,
+                        "unit": Data.sensitivity.default_unit},
+        "bandwidth": {"value": bandwidth, "unit": "MHz"},
+        "obs_freq": {"value": obs_freq, "unit": "GHz"},
+        "elevation": {"value": Data.elevation.default_value,
+                      "unit": Data.elevation.default_unit},
+        "weather": {"value": Data.weather.default_value, "unit": None},
+        "n_pol": {"value": Data.n_pol.default_value, "unit": None},
+    }
+
+
+def _max_rss_bytes():
+    """
+    Return the peak resident memory of the process, or None if it is not
+    available
+    """
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024